@@ -4,23 +4,49 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_migrate import Migrate  
 import os
+import time
 from .config import config
+from .utils.cache import ResultCache
+from .utils.passwords import PasswordHasher
+from .utils.log import configure_logging
+from .utils.json_provider import make_json_provider
+from .middleware.metrics import RequestMetrics
+from .middleware.compression import Compression
+from .utils.slow_queries import SlowQueryLog
+from .utils.db_routing import DatabaseRouting, RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 migrate = Migrate()
+cache = ResultCache()
+hasher = PasswordHasher()
+metrics = RequestMetrics()
+slow_queries = SlowQueryLog()
+routing = DatabaseRouting()
+compression = Compression()
 
-def create_app(config_name=None):
+def create_app(config_name=None, seed=None):
+    started = time.perf_counter()
     app = Flask(__name__)
 
     # === Выбираем конфиг из переменной окружения Render ===
     config_name = config_name or os.getenv('FLASK_ENV', 'production')
     app.config.from_object(config.get(config_name, config['default']))
+    configure_logging(app)
+    app.json = make_json_provider(app)
     
     # === Инициализация расширений ===
+    # Метрики и параметры пула до db.init_app: класс пула с замером ожидания
+    # соединения, размеры пула и реплики попадают в параметры движков
+    metrics.init_app(app)
+    routing.init_app(app)
     db.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
+    cache.init_app(app)
+    hasher.init_app(app)
+    slow_queries.init_app(app)
+    compression.init_app(app)
 
     # === CORS: разрешаем доступ фронтенду ===
     frontend_origin = os.getenv("FRONTEND_URL", "http://localhost:5173")
@@ -36,38 +62,27 @@ def create_app(config_name=None):
     # === Регистрация Blueprint'ов ===
     from .controllers.auth import auth
     from .controllers.products import products
+    from .controllers.admin import admin
     
     app.register_blueprint(auth, url_prefix='/api/auth')
     app.register_blueprint(products, url_prefix='/api/products')
+    app.register_blueprint(admin, url_prefix='/api/admin')
     
-    # === Инициализация базовой структуры ===
-    with app.app_context():
-        try:
-            init_categories()
-        except Exception as e:
-            print("init_categories() skipped:", e)
+    # === Базовые данные ===
+    # По умолчанию create_app не обращается к БД: воркеры и тесты стартуют без
+    # запросов. Категории добавляет миграция или `flask seed-categories`;
+    # seed=True (или SEED_ON_STARTUP) — для локального запуска на пустой базе
+    from .utils.seed import seed_categories, seed_categories_command
+    app.cli.add_command(seed_categories_command)
 
-    return app
+    if app.config['SEED_ON_STARTUP'] if seed is None else seed:
+        with app.app_context():
+            try:
+                seed_categories()
+            except Exception as e:
+                app.logger.warning("seed_categories() skipped: %s", e)
 
+    app.extensions['startup_seconds'] = time.perf_counter() - started
+    app.logger.info("App created in %.1f ms", app.extensions['startup_seconds'] * 1000)
+    return app
 
-def init_categories():  
-    from app.models.product import Category  
-    
-    categories = [
-        "Электроника",  
-        "Одежда",  
-        "Обувь",  
-        "Аксессуары",  
-        "Книги",  
-        "Продукты питания",  
-        "Бытовая техника",  
-        "Мебель",  
-        "Спортивные товары"
-    ]  
-    
-    for cat_name in categories:  
-        if not Category.query.filter_by(name=cat_name).first():  
-            db.session.add(Category(name=cat_name))  
-    
-    db.session.commit()  
-    print("Базовые категории созданы")
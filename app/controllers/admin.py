@@ -0,0 +1,40 @@
+import time
+from flask import Blueprint, request, jsonify, current_app
+from ..middleware.auth import admin_required
+from ..utils.slow_queries import slow_query_store
+
+
+admin = Blueprint('admin', __name__)
+
+
+# Самые дорогие медленные запросы: сгруппированы по отпечатку SQL, с примером плана и фильтра
+@admin.route('/slow-queries', methods=['GET'])
+@admin_required
+def get_slow_queries():
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    order_by = request.args.get('sort', 'total')
+    if order_by not in ('total', 'max', 'count', 'avg'):
+        return jsonify({'msg': 'sort должен быть одним из: total, max, count, avg'}), 400
+
+    # ?hours=24 — только записи за последние N часов
+    hours = request.args.get('hours', type=float)
+    since = time.time() - hours * 3600 if hours else None
+
+    try:
+        queries = slow_query_store().top(limit=limit, order_by=order_by,
+                                         endpoint=request.args.get('endpoint'), since=since)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({
+        'enabled': current_app.config['SLOW_QUERY_ENABLED'],
+        'threshold_ms': current_app.config['SLOW_QUERY_THRESHOLD_MS'],
+        'queries': queries
+    }), 200
+
+
+@admin.route('/slow-queries', methods=['DELETE'])
+@admin_required
+def clear_slow_queries():
+    slow_query_store().clear()
+    return jsonify({'msg': 'Журнал медленных запросов очищен'}), 200
@@ -1,51 +1,63 @@
 import logging  
 from flask import Blueprint, request, jsonify  
+from sqlalchemy import update  
 from flask_jwt_extended import (  
     create_access_token,  
     create_refresh_token,  
     jwt_required,  
-    get_jwt_identity  
+    get_jwt_identity,  
+    get_jwt  
 )  
 from ..models.user import User  
-from .. import db  
+from ..middleware.auth import load_user_state, token_is_current  
+from ..utils.passwords import HasherBusy, HasherTimeout  
+from ..utils.db_routing import read_only  
+from .. import db, hasher  
 
-# Настраиваем базовый логгер (можно перенести в точку старта приложения)  
-logging.basicConfig(  
-    level=logging.DEBUG,  
-    format='%(asctime)s %(levelname)s [%(name)s] %(message)s'  
-)  
+# Логирование настраивается в create_app (app/utils/log.py): очередь, JSON, маскирование  
 logger = logging.getLogger('auth')  
 
 auth = Blueprint('auth', __name__)  
 
+
+@auth.errorhandler(HasherBusy)  
+def hasher_busy(e):  
+    # Очередь хэширования заполнена: быстро отказываем, а не держим воркер  
+    logger.warning("Password hashing queue is full")  
+    return jsonify({'msg': 'Сервер перегружен, повторите попытку позже'}), 429, {'Retry-After': '1'}  
+
+
+@auth.errorhandler(HasherTimeout)  
+def hasher_timeout(e):  
+    logger.error("Password hashing timed out")  
+    return jsonify({'msg': 'Сервис временно недоступен, повторите попытку позже'}), 503, {'Retry-After': '5'}  
+
 @auth.route('/register', methods=['POST'])  
 def register():  
-    logger.info("ENTER /register")  
+    logger.debug("ENTER /register")  
     data = request.get_json()  
-    logger.debug("Request JSON: %s", data)  
 
     # Проверка наличия необходимых полей  
     if not data or not data.get('email') or not data.get('password'):  
-        logger.warning("Missing fields in register: %s", data)  
+        logger.warning("Missing fields in register", extra={'fields': sorted(data or {})})  
         return jsonify({'msg': 'Отсутствуют необходимые поля: email, password'}), 400  
 
     # Проверка на уникальность email  
     exists = User.query.filter_by(email=data['email']).first()  
-    logger.debug("Email exists? %s", bool(exists))  
     if exists:  
         logger.warning("Attempt to register existing email: %s", data['email'])  
         return jsonify({'msg': 'Пользователь с таким email уже существует'}), 409  
 
     # Определяем username  
     username = data.get('username') or data['email'].split('@')[0]  
-    logger.debug("Resolved username: %s", username)  
 
     new_user = User(  
         username=username,  
         email=data['email'],  
-        password=data['password'],  
         role=data.get('role', 'buyer')  
     )  
+    # Хэш считается в пуле процессов, поток запроса только ждёт результат  
+    new_user.password_hash = hasher.hash(data['password'])  
 
     try:  
         db.session.add(new_user)  
@@ -64,28 +76,29 @@ def register():
 
 @auth.route('/login', methods=['POST'])  
 def login():  
-    logger.info("ENTER /login")  
+    logger.debug("ENTER /login")  
     data = request.get_json()  
-    logger.debug("Request JSON: %s", data)  
 
     if not data or not data.get('email') or not data.get('password'):  
-        logger.warning("Missing fields in login: %s", data)  
+        logger.warning("Missing fields in login", extra={'fields': sorted(data or {})})  
         return jsonify({'msg': 'Отсутствуют необходимые поля: email, password'}), 400  
 
     user = User.query.filter_by(email=data['email']).first()  
-    logger.debug("User fetched: %s", user)  
 
-    if not user or not user.verify_password(data['password']):  
+    if not user or not hasher.verify(user.password_hash, data['password']):  
         logger.warning("Invalid credentials for email: %s", data.get('email'))  
         return jsonify({'msg': 'Неверный email или пароль'}), 401  
 
-    # Логируем тип и значение identity  
+    if hasher.needs_rehash(user.password_hash):  
+        _rehash_password(user, data['password'])  
+
     identity = str(user.id)  
-    logger.debug("Identity for tokens – type: %s, value: %s", type(identity), identity)  
 
     try:  
-        access_token = create_access_token(identity=identity)  
-        refresh_token = create_refresh_token(identity=identity)  
+        # Роль и версия пользователя в claims: admin_required и /me не читают пользователя из БД  
+        claims = user.token_claims()  
+        access_token = create_access_token(identity=identity, additional_claims=claims)  
+        refresh_token = create_refresh_token(identity=identity, additional_claims=claims)  
         logger.info("Tokens created for user id=%s", identity)  
     except Exception as e:  
         logger.exception("Error creating JWT tokens")  
@@ -100,13 +113,20 @@ def login():
 @auth.route('/refresh', methods=['POST'])  
 @jwt_required(refresh=True)  
 def refresh():  
-    logger.info("ENTER /refresh")  
+    logger.debug("ENTER /refresh")  
     current_user_id = get_jwt_identity()  
-    logger.debug("Current user identity from refresh token – type: %s, value: %s",  
-                 type(current_user_id), current_user_id)  
+
+    # Refresh-токен недействителен после смены роли/пароля или удаления пользователя  
+    state = load_user_state(current_user_id)  
+    if not token_is_current(get_jwt(), state):  
+        logger.warning("Stale refresh token for user id=%s", current_user_id)  
+        return jsonify({'msg': 'Токен отозван, войдите заново'}), 401  
 
     try:  
-        access_token = create_access_token(identity=current_user_id)  
+        access_token = create_access_token(  
+            identity=current_user_id,  
+            additional_claims={'role': state['role'], 'ver': state['ver']}  
+        )  
         logger.info("New access token issued for user id=%s", current_user_id)  
     except Exception as e:  
         logger.exception("Error refreshing access token")  
@@ -115,25 +135,42 @@ def refresh():
     return jsonify({'access_token': access_token}), 200  
 
 @auth.route('/me', methods=['GET'])  
+@read_only  
 @jwt_required()  
 def get_user_info():  
-    logger.info("ENTER /me")  
+    logger.debug("ENTER /me")  
     current_user_id = get_jwt_identity()  
-    logger.debug("Current user identity: %s (type: %s)",  
-                 current_user_id, type(current_user_id))  
 
-    user = User.query.get(current_user_id)  
-    logger.debug("User fetched by id: %s", user)  
+    user = load_user_state(current_user_id)  
 
     if not user:  
         logger.warning("User not found for id: %s", current_user_id)  
         return jsonify(message="User not found"), 404  
 
-    logger.info("Returning profile for user id=%s", current_user_id)  
+    if not token_is_current(get_jwt(), user):  
+        logger.warning("Stale access token for user id=%s", current_user_id)  
+        return jsonify({'msg': 'Токен отозван, войдите заново'}), 401  
+
+    logger.debug("Returning profile for user id=%s", current_user_id)  
     return jsonify(  
-        id=user.id,  
-        username=user.username,  
-        email=user.email,  
-        role=user.role,  
+        id=user['id'],  
+        username=user['username'],  
+        email=user['email'],  
+        role=user['role'],  
         # created_at=user.created_at.isoformat() if present  
-    ), 200
\ No newline at end of file
+    ), 200
+
+def _rehash_password(user, plaintext):  
+    # Пароль прежний, меняется только стоимость хэша: пишем в обход ORM,  
+    # чтобы не сдвигать token_version и не отзывать токены на других устройствах  
+    try:  
+        password_hash = hasher.hash(plaintext)  
+        db.session.execute(update(User).where(User.id == user.id).values(password_hash=password_hash))  
+        db.session.commit()  
+        logger.info("Password rehashed for user id=%s", user.id)  
+    except (HasherBusy, HasherTimeout):  
+        # Перехэшируем при следующем входе  
+        logger.info("Password rehash postponed for user id=%s", user.id)  
+    except Exception:  
+        db.session.rollback()  
+        logger.exception("DB error on password rehash")  
@@ -1,142 +1,173 @@
-from flask import Blueprint, request, jsonify, current_app  
-from sqlalchemy import case, cast, String, or_, desc    
+import click  
+from flask import Blueprint, request, jsonify, current_app, stream_with_context  
 from flask_jwt_extended import jwt_required  
 from ..models.product import Product, Category  # Добавлен импорт Category  
 from ..middleware.auth import admin_required  
-from .. import db  
+from ..utils.filters import FilterError, normalize_filters, build_product_query  
+from ..utils.listing import build_listing_query, listing_reads_enabled, prune_listing, refresh_listing  
+from ..utils.columnar import columnar_products  
+from ..utils.pagination import CursorError, paginate_keyset  
+from ..utils.facets import product_facets  
+from ..utils.fields import FieldsError, parse_fields, product_load_options  
+from ..utils.slow_queries import note_filters  
+from ..utils.db_routing import read_only  
+from ..middleware.compression import precompressed  
+from ..utils.bulk import BulkError, bulk_update, bulk_delete  
+from ..utils.exporter import EXPORT_FORMATS, encode_export, gzip_chunks, iter_export_rows  
+from ..utils.importer import IMPORT_FORMATS, IMPORT_METHODS, ProductImporter, detect_format, iter_rows, open_text_stream  
+from ..utils.http_cache import (  
+    cache_entry,  
+    content_etag,  
+    product_etag,  
+    is_not_modified,  
+    not_modified_response,  
+    conditional_response  
+)  
+from .. import db, cache  
 
 
 products = Blueprint('products', __name__)  
+
+
+def _load_product(product_id, fields=None):  
+    # Товар вместе с категорией одним запросом (без ленивой подгрузки в to_dict);  
+    # с набором полей — только нужные колонки  
+    return Product.query.options(*product_load_options(fields)).filter(Product.id == product_id).first()  
+
+
+def _product_cache_entry(product, fields=None):  
+    # Запись кэша карточки: тело ответа и валидаторы (общая для карточки и batch)  
+    if fields is None:  
+        return cache_entry({'product': product.to_dict()}, product_etag(product), product.updated_at)  
+    # Неполная карточка: updated_at и категория могли не загружаться, ETag — по содержимому  
+    body = {'product': product.to_dict(fields)}  
+    return cache_entry(body, content_etag(body), product.updated_at if 'updated_at' in fields else None)  
+
  
 @products.route('/get-products', methods=['POST'])  
+@read_only  
 def get_products():  
     try:  
         # Получение параметров пагинации из query-параметров  
         page = request.args.get('page', 1, type=int)  
-        limit = request.args.get('limit', 10, type=int)  
-        
-        # Получение параметров фильтрации из тела запроса  
-        filter_data = request.json or {}  
-        
-        # Извлечение параметров фильтрации  
-        search_query = filter_data.get('search_query', '').strip()  
-        min_price = filter_data.get('min_price')  
-        max_price = filter_data.get('max_price')  
-        category_id = filter_data.get('category_id')  
-        in_stock = filter_data.get('in_stock')  
-        sort_by = filter_data.get('sort_by')  
-        sort_order = filter_data.get('sort_order', 'asc')  
-        
-        # Добавляем параметры фильтрации по дате создания  
-        created_from = filter_data.get('created_from')  
-        created_to = filter_data.get('created_to')  
-        
-        # Базовый запрос  
-        query = Product.query  
-        
-        # Применяем фильтр поиска, если поисковый запрос содержит хотя бы 2 символа  
-        if search_query and len(search_query) >= 2:  
-            # Проверяем, является ли запрос числом  
-            is_numeric = search_query.isdigit()  
-            
-            if is_numeric:  
-                # Создаем выражение для определения приоритета сортировки  
-                search_priority = case(  
-                    # 1-й приоритет: точное совпадение по ID  
-                    (Product.id == int(search_query), 1),  
-                    # 2-й приоритет: частичное совпадение по ID (преобразуем ID в строку)  
-                    else_=case(  
-                        (cast(Product.id, String).like(f'%{search_query}%'), 2),  
-                        # 3-й приоритет: совпадение в названии  
-                        else_=3  
-                    )  
-                ).label('search_priority')  
-                
-                # Применяем фильтр для поиска (только ID и название)  
-                query = query.filter(  
-                    or_(  
-                        Product.id == int(search_query),  
-                        cast(Product.id, String).like(f'%{search_query}%'),  
-                        Product.name.ilike(f'%{search_query}%')  
-                    )  
-                )  
-                
-                # Добавляем сортировку по приоритету  
-                query = query.order_by(search_priority)  
-            else:  
-                # Если запрос не числовой, ищем только по названию  
-                query = query.filter(Product.name.ilike(f'%{search_query}%'))  
-
-        # Применение других фильтров  
-        if min_price is not None:  
-            query = query.filter(Product.price >= float(min_price))  
-
-        if max_price is not None:  
-            query = query.filter(Product.price <= float(max_price))  
-            
-        if category_id is not None:  
-            query = query.filter(Product.category_id == category_id)  
-            
-        if in_stock is not None:  
-            query = query.filter(Product.in_stock == bool(in_stock))  
-        
-        # Добавляем фильтр по дате создания  
-        if created_from is not None:  
-            from datetime import datetime  
-            created_from_date = datetime.fromisoformat(created_from)  
-            query = query.filter(Product.created_at >= created_from_date)  
-            
-        if created_to is not None:  
-            from datetime import datetime  
-            created_to_date = datetime.fromisoformat(created_to)  
-            query = query.filter(Product.created_at <= created_to_date)  
-        
-        # # Применяем дополнительную сортировку, если не было поиска по числовому запросу  
-        # if sort_by and (not search_query or not search_query.isdigit()):  
-        #     sort_attr = getattr(Product, sort_by, None)  
-        #     if sort_attr:  
-        #         query = query.order_by(desc(sort_attr) if sort_order == 'desc' else sort_attr)  
-              
-        # Применяем сортировку по категории или другим полям  
-        if sort_by:  
-            if sort_by == 'category.name':  # Сортируем по имени категории  
-                query = query.join(Product.category).order_by(  
-                    Category.name.asc() if sort_order == 'asc' else Category.name.desc()  
-                )  
-            else:  
-                sort_attr = getattr(Product, sort_by, None)  
-                if sort_attr:  
-                    query = query.order_by(desc(sort_attr) if sort_order == 'desc' else sort_attr)  
-                  
-        # Предварительно проверяем общее количество записей для корректной пагинации  
-        total_count = query.count()  
-        max_pages = (total_count + limit - 1) // limit  # Вычисляем максимальное количество страниц  
-        
-        # Проверяем, не превышает ли запрошенная страница максимальное количество страниц  
-        if max_pages > 0 and page > max_pages:  
-            page = max_pages  # Устанавливаем последнюю доступную страницу  
+        limit = max(request.args.get('limit', 10, type=int), 1)  
 
-        # Получение результатов с пагинацией  
-        pagination = query.paginate(page=page, per_page=limit, error_out=False)  
-        products = pagination.items  
+        # Keyset-режим включается явно: ?pagination=cursor или ?cursor=<курсор>  
+        cursor = request.args.get('cursor')  
+        cursor_mode = cursor is not None or request.args.get('pagination') == 'cursor'  
+        with_total = request.args.get('with_total', 'false').lower() in ('1', 'true', 'yes')  
+        # Разреженный набор полей: ?fields=id,name,price или ?fields=list  
+        fields = parse_fields(request.args.get('fields'))  
 
-        return jsonify({  
-            'products': [product.to_dict() for product in products],  
-            'total': pagination.total,  
-            'pages': pagination.pages,  
-            'current_page': pagination.page  
-        }), 200  
+        # Получение и нормализация параметров фильтрации из тела запроса  
+        filters = normalize_filters(request.json or {})  
+        note_filters(filters)  
+
+        # Ключ кэша берём до запроса к БД: если каталог изменится во время  
+        # выполнения, результат ляжет под старую версию и не будет прочитан  
+        cache_key = cache.make_key('products', filters, page, limit, cursor_mode, cursor, with_total, fields)  
+        result = cache.get(cache_key)  
+        if result is not None:  
+            return precompressed(jsonify(result), cache_key), 200  
+
+        # Колоночный каталог в памяти воркера (COLUMNAR_CATALOG): фильтр, сортировка и  
+        # подсчёт без SQL; None — запрос ему не по силам (поиск и т.п.), идём в базу  
+        result = columnar_products(filters, page, limit, cursor_mode, cursor, with_total, fields)  
+        if result is not None:  
+            cache.set(cache_key, result)  
+            return precompressed(jsonify(result), cache_key), 200  
+
+        # Витрина product_listings (LISTING_READ_MODEL=on): без join к категориям  
+        if listing_reads_enabled():  
+            query, keys = build_listing_query(filters, fields=fields)  
+        else:  
+            query, keys = build_product_query(filters, fields=fields)  
+
+        if cursor_mode:  
+            # Без OFFSET и без COUNT: следующая страница ищется по (ключ сортировки, id)  
+            items, next_cursor = paginate_keyset(query, keys, filters, cursor, limit)  
+            result = {  
+                'products': [product.to_dict(fields) for product in items],  
+                'next_cursor': next_cursor,  
+                'limit': limit  
+            }  
+            if with_total:  
+                result['total'] = query.order_by(None).count()  
+        else:  
+            # Общее количество считаем один раз и используем его же для страниц  
+            total_count = query.order_by(None).count()  
+            max_pages = (total_count + limit - 1) // limit  # Вычисляем максимальное количество страниц  
+
+            # Проверяем, не превышает ли запрошенная страница максимальное количество страниц  
+            page = max(page, 1)  
+            if max_pages > 0 and page > max_pages:  
+                page = max_pages  # Устанавливаем последнюю доступную страницу  
+
+            products = query.limit(limit).offset((page - 1) * limit).all()  
+            result = {  
+                'products': [product.to_dict(fields) for product in products],  
+                'total': total_count,  
+                'pages': max_pages,  
+                'current_page': page  
+            }  
+
+        cache.set(cache_key, result)  
+        return precompressed(jsonify(result), cache_key), 200  
+    except (FilterError, CursorError, FieldsError) as e:  
+        return jsonify({'msg': str(e)}), 400  
     except Exception as e:  
         # Обработка исключений  
         return jsonify({'error': str(e)}), 500
 
+# Фасеты для боковой панели фильтров: тот же фильтр, что и у get-products  
+@products.route('/facets', methods=['POST'])  
+def get_facets():  
+    try:  
+        filter_data = request.json or {}  
+        filters = normalize_filters(filter_data)  
+        note_filters(filters)  
+
+        bucket_size = filter_data.get('price_bucket', current_app.config['FACET_PRICE_BUCKET'])  
+        try:  
+            bucket_size = float(bucket_size)  
+        except (TypeError, ValueError):  
+            bucket_size = 0  
+        if bucket_size <= 0:  
+            return jsonify({'msg': 'price_bucket должен быть положительным числом'}), 400  
+
+        cache_key = cache.make_key('facets', filters, bucket_size)  
+        result = cache.get(cache_key)  
+        if result is None:  
+            result = product_facets(filters, bucket_size)  
+            cache.set(cache_key, result)  
+
+        return jsonify(result), 200  
+    except FilterError as e:  
+        return jsonify({'msg': str(e)}), 400  
+    except Exception as e:  
+        return jsonify({'error': str(e)}), 500
+
 # Добавляем новый метод для получения всех категорий  
 @products.route('/categories', methods=['GET'])  
+@read_only  
 def get_categories():  
-    categories = Category.query.all()  
-    return jsonify({  
-        'categories': [category.to_dict() for category in categories]  
-    }), 200  
+    cache_control = current_app.config['CATEGORIES_CACHE_CONTROL']  
+
+    # Ключ привязан к версии категорий: меняется при любом изменении справочника  
+    cache_key = cache.make_key('categories', version='categories')  
+    entry = cache.get(cache_key)  
+    if entry is not None and is_not_modified(entry):  
+        return not_modified_response(entry, cache_control)  
+
+    if entry is None:  
+        categories = Category.query.all()  
+        body = {  
+            'categories': [category.to_dict() for category in categories]  
+        }  
+        entry = cache_entry(body, content_etag(body))  
+        cache.set(cache_key, entry)  
+
+    return precompressed(conditional_response(entry, cache_control), cache_key)  
 
     # Создание нового товара 
 @products.route('/create', methods=['OPTIONS'])  
@@ -174,8 +205,13 @@ def create_product():
     )  
 
     db.session.add(new_product)  
+    db.session.flush()  
+    product_id = new_product.id  
     db.session.commit()  
 
+    # После commit объект просрочен: перечитываем его вместе с категорией одним запросом  
+    new_product = _load_product(product_id)  
+
     return jsonify({  
         'msg': 'Товар успешно создан',  
         'product': new_product.to_dict()  
@@ -183,25 +219,96 @@ def create_product():
 
     # Получение товара по id
 @products.route('/<int:product_id>', methods=['GET'])  
+@read_only  
 def get_product(product_id):  
     try:  
-        product = Product.query.get(product_id)  
+        cache_control = current_app.config['PRODUCT_CACHE_CONTROL']  
+        fields = parse_fields(request.args.get('fields'))  
 
-        if not product:  
-            return jsonify({'msg': 'Товар не найден'}), 404  
+        # Валидатор из кэша позволяет ответить 304, не читая строку из БД.  
+        # Полная карточка лежит под общим с batch ключом, неполная — отдельно на набор полей  
+        cache_parts = (product_id,) if fields is None else (product_id, fields)  
+        cache_key = cache.make_key('product', *cache_parts)  
+        entry = cache.get(cache_key)  
+        if entry is not None and is_not_modified(entry):  
+            return not_modified_response(entry, cache_control)  
 
-        return jsonify({  
-            'product': product.to_dict()  
-        }), 200  
+        if entry is None:  
+            product = _load_product(product_id, fields)  
+
+            if not product:  
+                return jsonify({'msg': 'Товар не найден'}), 404  
+
+            entry = _product_cache_entry(product, fields)  
+            cache.set(cache_key, entry)  
+
+        return precompressed(conditional_response(entry, cache_control), cache_key)  
+    except FieldsError as e:  
+        return jsonify({'msg': str(e)}), 400  
     except Exception as e:  
         # Обработка исключений  
         return jsonify({'error': str(e)}), 500 
 
+    # Получение нескольких товаров одним запросом (корзина, избранное, «недавно смотрели») 
+@products.route('/batch', methods=['GET', 'POST'])  
+def get_products_batch():  
+    if request.method == 'POST':  
+        raw_ids = (request.get_json(silent=True) or {}).get('ids') or []  
+    else:  
+        raw_ids = [value for value in request.args.get('ids', '').split(',') if value.strip()]  
+
+    try:  
+        if not isinstance(raw_ids, list):  
+            raise ValueError  
+        # Дубликаты убираем, сохраняя порядок первого появления  
+        ids = list(dict.fromkeys(int(value) for value in raw_ids))  
+    except (TypeError, ValueError):  
+        return jsonify({'msg': 'ids должен быть списком целых чисел'}), 400  
+
+    try:  
+        fields = parse_fields(request.args.get('fields'))  
+    except FieldsError as e:  
+        return jsonify({'msg': str(e)}), 400  
+
+    max_ids = current_app.config['BATCH_MAX_IDS']  
+    if len(ids) > max_ids:  
+        return jsonify({'msg': f'Можно запросить не более {max_ids} товаров за раз'}), 400  
+
+    try:  
+        # Сначала кэш карточек (версия каталога читается один раз на весь запрос),  
+        # остальное — одним IN-запросом вместе с категориями  
+        keys = cache.make_keys('product', ids)  
+        found = {}  
+        for product_id in ids:  
+            entry = cache.get(keys[product_id])  
+            if entry is not None:  
+                card = entry['body']['product']  
+                found[product_id] = card if fields is None else {field: card[field] for field in fields}  
+
+        missing_ids = [product_id for product_id in ids if product_id not in found]  
+        if missing_ids:  
+            rows = Product.query.options(*product_load_options(fields)).filter(Product.id.in_(missing_ids)).all()  
+            for product in rows:  
+                if fields is not None:  
+                    # Неполные строки в кэш карточек не кладём  
+                    found[product.id] = product.to_dict(fields)  
+                    continue  
+                entry = _product_cache_entry(product)  
+                cache.set(keys[product.id], entry)  
+                found[product.id] = entry['body']['product']  
+
+        return jsonify({  
+            'products': [found[product_id] for product_id in ids if product_id in found],  
+            'missing': [product_id for product_id in ids if product_id not in found]  
+        }), 200  
+    except Exception as e:  
+        return jsonify({'error': str(e)}), 500  
+
     # Обновление данных товара 
 @products.route('/<int:product_id>', methods=['PUT'])  
 @admin_required  
 def update_product(product_id):  
-    product = Product.query.get(product_id)  
+    product = _load_product(product_id)  
 
     if not product:  
         return jsonify({'msg': 'Товар не найден'}), 404  
@@ -233,6 +340,7 @@ def update_product(product_id):
             product.category_id = None  # Разрешаем сбрасывать категорию  
 
     db.session.commit()  
+    product = _load_product(product_id)  
 
     return jsonify({  
         'msg': 'Товар успешно обновлен',  
@@ -252,3 +360,141 @@ def delete_product(product_id):
     db.session.commit()  
 
     return jsonify({'msg': 'Товар успешно удален'}), 200
+
+
+    # Массовое изменение товаров одним UPDATE (по списку ids или фильтру get-products) 
+@products.route('/bulk-update', methods=['POST'])  
+@admin_required  
+def bulk_update_products():  
+    try:  
+        updated = bulk_update(request.get_json(silent=True) or {})  
+        db.session.commit()  
+    except BulkError as e:  
+        db.session.rollback()  
+        return jsonify({'msg': str(e)}), 400  
+    except Exception as e:  
+        db.session.rollback()  
+        return jsonify({'error': str(e)}), 500  
+
+    return jsonify({'msg': 'Товары обновлены', 'updated': updated}), 200  
+
+    # Массовое удаление товаров одним DELETE 
+@products.route('/bulk-delete', methods=['POST'])  
+@admin_required  
+def bulk_delete_products():  
+    try:  
+        deleted = bulk_delete(request.get_json(silent=True) or {})  
+        db.session.commit()  
+    except BulkError as e:  
+        db.session.rollback()  
+        return jsonify({'msg': str(e)}), 400  
+    except Exception as e:  
+        db.session.rollback()  
+        return jsonify({'error': str(e)}), 500  
+
+    return jsonify({'msg': 'Товары удалены', 'deleted': deleted}), 200  
+
+
+    # Потоковая выгрузка каталога (NDJSON / CSV) 
+@products.route('/export', methods=['POST'])  
+@admin_required  
+def export_products():  
+    fmt = request.args.get('format', 'ndjson')  
+    if fmt not in EXPORT_FORMATS:  
+        return jsonify({'msg': f'Неизвестный формат: {fmt}. Допустимые: {", ".join(EXPORT_FORMATS)}'}), 400  
+    use_gzip = request.args.get('gzip', 'false').lower() in ('1', 'true', 'yes')  
+
+    try:  
+        filters = normalize_filters(request.get_json(silent=True) or {})  
+    except FilterError as e:  
+        return jsonify({'msg': str(e)}), 400  
+
+    # Генератор читает строки серверным курсором и отдаёт их кусками по мере готовности  
+    chunks = encode_export(iter_export_rows(filters, current_app.config['EXPORT_YIELD_PER']), fmt)  
+    filename = f'products.{fmt}'  
+    mimetype = f'{EXPORT_FORMATS[fmt]}; charset=utf-8'  
+    if use_gzip:  
+        chunks = gzip_chunks(chunks)  
+        filename += '.gz'  
+        mimetype = 'application/gzip'  
+
+    response = current_app.response_class(stream_with_context(chunks), mimetype=mimetype)  
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'  
+    return response  
+
+
+    # Массовый импорт товаров из CSV / NDJSON 
+@products.route('/import', methods=['POST'])  
+@admin_required  
+def import_products():  
+    # Файл можно прислать телом запроса или полем file в multipart-форме  
+    upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None  
+    if upload is not None:  
+        stream, content_type, filename = upload.stream, upload.mimetype, upload.filename  
+    else:  
+        stream, content_type, filename = request.stream, request.mimetype, None  
+
+    fmt = detect_format(request.args.get('format'), content_type, filename)  
+    if fmt not in IMPORT_FORMATS:  
+        return jsonify({'msg': f'Неизвестный формат: {fmt}. Допустимые: {", ".join(IMPORT_FORMATS)}'}), 400  
+
+    method = request.args.get('method', 'insert')  
+    if method not in IMPORT_METHODS:  
+        return jsonify({'msg': f'Неизвестный метод: {method}. Допустимые: {", ".join(IMPORT_METHODS)}'}), 400  
+    try:  
+        batch_size = int(request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE']))  
+    except ValueError:  
+        batch_size = 0  
+    if batch_size < 1:  
+        return jsonify({'msg': 'batch_size должен быть положительным целым числом'}), 400  
+
+    try:  
+        importer = ProductImporter(  
+            batch_size=batch_size,  
+            upsert=request.args.get('upsert', 'false').lower() in ('1', 'true', 'yes'),  
+            method=method,  
+            max_errors=current_app.config['IMPORT_MAX_ERRORS']  
+        )  
+        report = importer.run(iter_rows(open_text_stream(stream), fmt))  
+    except Exception as e:  
+        db.session.rollback()  
+        return jsonify({'error': str(e)}), 500  
+
+    return jsonify(report), 200  
+
+
+@products.cli.command('import')  
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))  
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), help='Формат файла (по умолчанию по расширению)')  
+@click.option('--upsert', is_flag=True, help='Обновлять существующие товары по external_id')  
+@click.option('--method', type=click.Choice(IMPORT_METHODS), default='insert', help='copy — COPY FROM STDIN на Postgres')  
+@click.option('--batch-size', type=click.IntRange(min=1), default=None, help='Размер пачки (по умолчанию IMPORT_BATCH_SIZE)')  
+def import_products_command(path, fmt, upsert, method, batch_size):  
+    """Импорт товаров из CSV или NDJSON файла."""  
+    importer = ProductImporter(  
+        batch_size=batch_size or current_app.config['IMPORT_BATCH_SIZE'],  
+        upsert=upsert,  
+        method=method,  
+        max_errors=current_app.config['IMPORT_MAX_ERRORS']  
+    )  
+    with open(path, 'rb') as f:  
+        report = importer.run(iter_rows(open_text_stream(f), detect_format(fmt, filename=path)))  
+
+    click.echo(f"Строк: {report['rows']}, записано: {report['written']}, ошибок: {report['failed']}, "  
+               f"{report['rows_per_sec']} строк/с")  
+    for error in report['errors']:  
+        click.echo(f"  строка {error['row']}: {error['error']}", err=True)  
+
+
+@products.cli.command('rebuild-listing')  
+@click.option('--since', type=click.DateTime(), help='Только товары, изменённые с этого момента (UTC)')  
+def rebuild_listing_command(since):  
+    """Пересобирает витрину product_listings (целиком или инкрементально)."""  
+    refreshed = refresh_listing(db.session.connection(), since=since)  
+    # Инкрементально: ещё и строки товаров, удалённых в обход витрины  
+    pruned = prune_listing(db.session.connection()) if refreshed is not None else 0  
+    db.session.commit()  
+    if refreshed is None:  
+        click.echo('Витрина пересобрана целиком')  
+    else:  
+        click.echo(f'Обновлено товаров: {refreshed}, удалено строк: {pruned}')
@@ -1,16 +1,82 @@
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask import jsonify, current_app, has_app_context
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from sqlalchemy import event
+from .. import db
 from ..models.user import User
+from ..utils.cache import MemoryBackend
+
+
+def _user_cache():
+    # Небольшой LRU/TTL-кэш состояния пользователей на процесс
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        cache = MemoryBackend(
+            max_entries=current_app.config.get('USER_CACHE_MAX_ENTRIES', 10000),
+            ttl=current_app.config.get('USER_CACHE_TTL', 30)
+        )
+        current_app.extensions['user_cache'] = cache
+    return cache
+
+
+def load_user_state(user_id, fresh=False):
+    """Роль, версия токенов и профиль пользователя: из кэша или одним запросом к БД.
+
+    fresh=True читает БД в обход кэша (и обновляет его). Возвращает None,
+    если пользователь удалён.
+    """
+    cache = _user_cache()
+    key = str(user_id)
+    state = None if fresh else cache.get(key)
+    if state is None:
+        user = db.session.get(User, int(user_id))
+        if user is None:
+            return None
+        state = {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'role': user.role,
+            'ver': user.token_version,
+        }
+        cache.set(key, state)
+    return state
+
+
+def token_is_current(claims, state):
+    """Токен выдан для текущей версии пользователя (роль/пароль не менялись)."""
+    if state is None:
+        return False
+    # Старые токены без claims проверяются только по существованию пользователя
+    return 'ver' not in claims or claims['ver'] == state['ver']
+
+
+def _evict_user(mapper, connection, target):
+    # Изменение или удаление пользователя сбрасывает его запись в кэше этого процесса;
+    # остальные воркеры увидят новую версию не позднее чем через USER_CACHE_TTL.
+    # Права администратора это не задерживает: admin_required кэш не читает
+    if has_app_context() and 'user_cache' in current_app.extensions:
+        current_app.extensions['user_cache'].delete(str(target.id))
+
+
+event.listen(User, 'after_update', _evict_user)
+event.listen(User, 'after_delete', _evict_user)
+
 
 def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         verify_jwt_in_request()
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        claims = get_jwt()
+
+        # Роль в токене: покупателю отказываем без обращения к БД
+        if claims.get('role', 'admin') != 'admin':
+            return jsonify({"msg": "Доступ запрещен. Требуются права администратора"}), 403
 
-        if not user or not user.is_admin():
+        # Роль и версию проверяем по БД, а не по кэшу процесса: снятие прав или удаление
+        # администратора действует сразу во всех воркерах (один запрос по первичному ключу)
+        state = load_user_state(get_jwt_identity(), fresh=True)
+        if not token_is_current(claims, state) or state['role'] != 'admin':
             return jsonify({"msg": "Доступ запрещен. Требуются права администратора"}), 403
 
         return fn(*args, **kwargs)
@@ -0,0 +1,133 @@
+import base64
+import gzip
+import zlib
+from flask import current_app, request
+from ..utils.http_cache import encoded_etag
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli необязателен
+    brotli = None
+
+DEFAULT_MIMETYPES = ('application/json', 'text/plain', 'text/csv', 'text/html', 'application/x-ndjson')
+
+
+def available_encodings():
+    """Поддерживаемые кодировки в порядке предпочтения сервера."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESSION_BROTLI_QUALITY'])
+    # mtime=0: одинаковые байты во всех воркерах и при каждом сжатии
+    return gzip.compress(data, compresslevel=config['COMPRESSION_GZIP_LEVEL'], mtime=0)
+
+
+def precompressed(response, cache_key):
+    """Помечает ответ из кэша результатов: сжатые байты лягут в кэш рядом с ним.
+
+    Ключ версионирован так же, как запись кэша, поэтому сжатая копия устаревает вместе с ней.
+    """
+    response.compression_cache_key = cache_key
+    return response
+
+
+def _negotiate():
+    # При равном q выбирается первая в списке сервера (br сжимает JSON лучше gzip)
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def _compressible(response, config):
+    if response.direct_passthrough or response.is_streamed:
+        # Потоковые ответы (выгрузка каталога) сжимаются сами или идут как есть
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    return response.mimetype in config['COMPRESSION_MIMETYPES']
+
+
+def _result_cache():
+    return current_app.extensions['result_cache']['cache']
+
+
+def _cached_payload(key, body):
+    entry = _result_cache().get(key)
+    # Контрольная сумма защищает от сжатой копии другого тела под тем же ключом
+    if entry is not None and entry['crc'] == zlib.crc32(body):
+        return base64.b64decode(entry['data'])
+    return None
+
+
+def _store_payload(key, body, data):
+    # base64: бэкенды кэша хранят JSON-совместимые значения
+    _result_cache().set(key, {'crc': zlib.crc32(body), 'data': base64.b64encode(data).decode('ascii')})
+
+
+def _not_modified_etag(response):
+    # 304 подтверждает то представление, которое есть у клиента: если это
+    # сжатая копия, возвращаем её ETag, а не ETag несжатого тела
+    etag, weak = response.get_etag()
+    encoding = _negotiate()
+    if etag and not weak and encoding and request.if_none_match.contains(encoded_etag(etag, encoding)):
+        response.set_etag(encoded_etag(etag, encoding))
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def _compress_response(response):
+    config = current_app.config
+    if response.status_code == 304:
+        return _not_modified_etag(response)
+    if not _compressible(response, config):
+        return response
+    # Ответ зависит от Accept-Encoding — и для CDN, даже если этот клиент получил его несжатым
+    response.vary.add('Accept-Encoding')
+
+    encoding = _negotiate()
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < config['COMPRESSION_MIN_SIZE']:
+        return response
+
+    cache_key = getattr(response, 'compression_cache_key', None)
+    data = None
+    if cache_key is not None:
+        cache_key = f'{cache_key}:{encoding}'
+        data = _cached_payload(cache_key, body)
+    if data is None:
+        data = compress(body, encoding, config)
+        if cache_key is not None:
+            _store_payload(cache_key, body, data)
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # У сжатого представления свой ETag: другие байты, тот же ресурс
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(encoded_etag(etag, encoding))
+    return response
+
+
+class Compression:
+    """Сжатие ответов gzip/br по Accept-Encoding в after_request.
+
+    Ответы меньше COMPRESSION_MIN_SIZE байт и потоковые ответы не сжимаются.
+    brotli используется, если установлен пакет brotli.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESSION_ENABLED', True)
+        app.config.setdefault('COMPRESSION_MIN_SIZE', 1024)
+        app.config.setdefault('COMPRESSION_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESSION_BROTLI_QUALITY', 5)
+        app.config.setdefault('COMPRESSION_MIMETYPES', DEFAULT_MIMETYPES)
+        if app.config['COMPRESSION_ENABLED']:
+            app.after_request(_compress_response)
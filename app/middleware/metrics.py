@@ -0,0 +1,413 @@
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - не POSIX
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+# Описание метрик: тип, подсказка и корзины для гистограмм
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP-запросы по эндпоинту и коду ответа', None),
+    'http_request_duration_seconds': ('histogram', 'Время обработки запроса', LATENCY_BUCKETS),
+    'db_statements_per_request': ('histogram', 'SQL-запросов на HTTP-запрос', STATEMENT_BUCKETS),
+    'db_statements_total': ('counter', 'Выполненные SQL-запросы', None),
+    'db_statement_duration_seconds_total': ('counter', 'Суммарное время SQL-запросов', None),
+    'db_pool_checkout_wait_seconds': ('histogram', 'Ожидание соединения из пула', WAIT_BUCKETS),
+    'db_pool_checked_out': ('gauge', 'Соединения, выданные из пула', None),
+    'db_pool_size': ('gauge', 'Размер пула соединений', None),
+    'password_hash_total': ('counter', 'Операции хэширования паролей', None),
+    'password_hash_seconds_total': ('counter', 'Суммарное время хэширования паролей', None),
+    'password_hash_rejected_total': ('counter', 'Отказы из-за переполненной очереди хэширования', None),
+    'password_hash_in_flight': ('gauge', 'Операции хэширования в работе', None),
+    'app_startup_seconds': ('gauge', 'Время создания приложения (create_app)', None),
+}
+
+
+class MetricsRegistry:
+    """Метрики процесса: счётчики, гистограммы и gauge с метками.
+
+    В многопроцессном gunicorn каждый процесс периодически сбрасывает снимок в
+    свой файл в METRICS_MULTIPROC_DIR, а /metrics суммирует файлы всех процессов
+    (gauge — только живых). Снимки завершившихся процессов при опросе сворачиваются
+    в один файл metrics-archive.json, чтобы их не накапливалось при перезапуске воркеров.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.gauges = {}
+            self.token = uuid.uuid4().hex
+            self.flushed_at = 0.0
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, labels=None, value=1):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        key = self._key(name, labels)
+        buckets = METRICS[name][2]
+        with self._lock:
+            state = self.histograms.get(key)
+            if state is None:
+                state = self.histograms[key] = [0] * len(buckets) + [0, 0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def set(self, name, value, labels=None):
+        """Gauge или счётчик, который процесс уже ведёт сам (абсолютное значение)."""
+        key = self._key(name, labels)
+        with self._lock:
+            if METRICS[name][0] == 'gauge':
+                self.gauges[key] = value
+            else:
+                self.counters[key] = value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(state)] for (name, labels), state in self.histograms.items()],
+                'gauges': [[name, list(labels), value] for (name, labels), value in self.gauges.items()],
+            }
+
+
+registry = MetricsRegistry()
+
+
+def _after_fork():
+    # Дочерний процесс начинает с нуля и пишет в свой файл: счётчики родителя уже учтены в его файле
+    registry._lock = threading.Lock()
+    registry.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool, который замеряет ожидание свободного соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            registry.observe('db_pool_checkout_wait_seconds', time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('query_started')
+    if not stack:
+        return
+    started = stack.pop()
+    if has_request_context() and 'metrics_started' in g:
+        g.metrics_statements += 1
+        g.metrics_statement_time += time.perf_counter() - started
+
+
+def _handle_error(context):
+    # Упавший запрос не доходит до after_cursor_execute: снимаем его отметку времени
+    stack = context.connection.info.get('query_started') if context.connection is not None else None
+    if stack:
+        stack.pop()
+
+
+def _labels():
+    return {
+        'blueprint': request.blueprint or '',
+        # Для несуществующих URL — одна метка, чтобы не плодить ряды
+        'endpoint': request.endpoint or 'unmatched',
+        'method': request.method,
+    }
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_statements = 0
+    g.metrics_statement_time = 0.0
+    g.metrics_recorded = False
+
+
+def _record(status):
+    if 'metrics_started' not in g or g.metrics_recorded:
+        return
+    g.metrics_recorded = True
+    labels = _labels()
+    registry.inc('http_requests_total', dict(labels, status=str(status)))
+    registry.observe('http_request_duration_seconds', time.perf_counter() - g.metrics_started, labels)
+    db_labels = {'endpoint': labels['endpoint']}
+    registry.observe('db_statements_per_request', g.metrics_statements, db_labels)
+    registry.inc('db_statements_total', db_labels, g.metrics_statements)
+    registry.inc('db_statement_duration_seconds_total', db_labels, g.metrics_statement_time)
+
+
+def _after_request(response):
+    _record(response.status_code)
+    _maybe_flush()
+    return response
+
+
+def _teardown_request(exc):
+    if exc is not None:
+        _record(500)
+
+
+def _collect_process_metrics():
+    """Gauge пула, время старта и счётчики хэширования паролей, которые ведутся вне реестра."""
+    from .. import db
+    for bind, engine in db.engines.items():
+        pool = engine.pool
+        labels = {'bind': bind or 'default'}
+        if hasattr(pool, 'checkedout'):
+            registry.set('db_pool_checked_out', pool.checkedout(), labels)
+        if hasattr(pool, 'size'):
+            registry.set('db_pool_size', pool.size(), labels)
+
+    if 'startup_seconds' in current_app.extensions:
+        registry.set('app_startup_seconds', current_app.extensions['startup_seconds'])
+
+    hasher = current_app.extensions.get('password_hasher')
+    if hasher is not None:
+        stats = hasher.stats()
+        for kind in ('hash', 'verify'):
+            registry.set('password_hash_total', stats[f'{kind}_count'], {'operation': kind})
+            registry.set('password_hash_seconds_total', stats[f'{kind}_seconds'], {'operation': kind})
+        registry.set('password_hash_rejected_total', stats['rejected'])
+        registry.set('password_hash_in_flight', stats['in_flight'])
+
+
+def _write_json(path, payload):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _snapshot_path(directory):
+    return os.path.join(directory, f'metrics-{os.getpid()}-{registry.token}.json')
+
+
+def flush(directory=None):
+    """Сбрасывает снимок метрик процесса в его файл (атомарно, через rename)."""
+    directory = directory or current_app.config.get('METRICS_MULTIPROC_DIR')
+    if not directory:
+        return
+    _collect_process_metrics()
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory)
+    _write_json(path, registry.snapshot())
+    registry.flushed_at = time.monotonic()
+
+
+def _maybe_flush():
+    config = current_app.config
+    if config.get('METRICS_MULTIPROC_DIR') and \
+            time.monotonic() - registry.flushed_at >= config.get('METRICS_FLUSH_INTERVAL', 5):
+        flush()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _snapshot_pid(path):
+    # metrics-<pid>-<token>.json; у архива pid нет
+    try:
+        return int(os.path.basename(path).split('-')[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _read_snapshot(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # Файл удалили или он дописывается: учтём при следующем опросе
+        return None
+
+
+def _compact(directory):
+    """Переносит счётчики и гистограммы завершившихся процессов в архив и удаляет их файлы.
+
+    Суммы при этом не меняются (счётчики не «сбрасываются» для Prometheus), а gauge
+    умерших процессов и так не выводятся. Опросы из разных воркеров сериализуются flock.
+    """
+    with open(os.path.join(directory, 'metrics.lock'), 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        dead = [path for path in glob.glob(os.path.join(directory, 'metrics-*.json'))
+                if _snapshot_pid(path) not in (None, os.getpid()) and not _pid_alive(_snapshot_pid(path))]
+        if not dead:
+            return
+        archive_path = os.path.join(directory, 'metrics-archive.json')
+        snapshots = [snapshot for snapshot in map(_read_snapshot, [archive_path] + dead) if snapshot]
+        counters, histograms, _ = _merge([dict(snapshot, gauges=[]) for snapshot in snapshots])
+        _write_json(archive_path, {
+            'pid': None,
+            'counters': [[name, [list(label) for label in labels], value]
+                         for (name, labels), value in counters.items()],
+            'histograms': [[name, [list(label) for label in labels], state]
+                           for (name, labels), state in histograms.items()],
+            'gauges': [],
+        })
+        for path in dead:
+            os.remove(path)
+
+
+def collect():
+    """Снимки всех процессов: из METRICS_MULTIPROC_DIR или только текущего процесса."""
+    directory = current_app.config.get('METRICS_MULTIPROC_DIR')
+    if not directory:
+        _collect_process_metrics()
+        return [registry.snapshot()]
+
+    flush(directory)
+    _compact(directory)
+    return [snapshot for snapshot in map(_read_snapshot, glob.glob(os.path.join(directory, 'metrics-*.json')))
+            if snapshot]
+
+
+def _merge(snapshots):
+    counters, histograms, gauges = {}, {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, state in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [0] * len(state))
+            for i, value in enumerate(state):
+                merged[i] += value
+        # Gauge умершего процесса больше не отражает ничего реального
+        if snapshot['pid'] is not None and (snapshot['pid'] == os.getpid() or _pid_alive(snapshot['pid'])):
+            for name, labels, value in snapshot['gauges']:
+                key = (name, tuple(map(tuple, labels)) + (('pid', str(snapshot['pid'])),))
+                gauges[key] = value
+    return counters, histograms, gauges
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshots):
+    """Текстовый формат Prometheus 0.0.4."""
+    counters, histograms, gauges = _merge(snapshots)
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        source = {'counter': counters, 'gauge': gauges, 'histogram': histograms}[kind]
+        series = sorted((key, value) for key, value in source.items() if key[0] == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (_, labels), value in series:
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            # Корзины уже накопительные: observe() учитывает значение во всех корзинах с bound >= value
+            for bound, count in zip(buckets, value):
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", _format_value(float(bound)))])} {count}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {value[-2]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(float(value[-1]))}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value[-2]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token and current_app.config.get('METRICS_REQUIRE_TOKEN'):
+        # Без токена эндпоинт раскрыл бы имена эндпоинтов, состояние пулов и очередей
+        return Response('METRICS_TOKEN is not configured\n', status=403, mimetype='text/plain')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(render(collect()), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+class RequestMetrics:
+    """Метрики запросов, SQL и пула соединений с выдачей на /metrics.
+
+    init_app нужно вызывать до db.init_app: пул с замером ожидания
+    задаётся через SQLALCHEMY_ENGINE_OPTIONS.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_MULTIPROC_DIR', None)
+        app.config.setdefault('METRICS_FLUSH_INTERVAL', 5)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.config.setdefault('METRICS_REQUIRE_TOKEN', False)
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        # Копия: словарь из класса конфига общий для всех приложений процесса
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        # In-memory SQLite Flask-SQLAlchemy всё равно переводит на StaticPool
+        options.setdefault('poolclass', TimedQueuePool)
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+        app.teardown_request(_teardown_request)
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
+        app.extensions['metrics'] = registry
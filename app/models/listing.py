@@ -0,0 +1,71 @@
+from datetime import datetime
+from .. import db
+
+
+class ProductListing(db.Model):
+    """Денормализованная витрина каталога для get-products (миграция a7c2e4f6b8d0).
+
+    Строка на товар: колонки товара под теми же именами плюс имя категории,
+    поэтому список и сортировка по category.name обходятся без join. На PostgreSQL
+    у таблицы есть генерируемая колонка search_vector с GIN-индексом, как у products.
+    Заполняется из путей записи товаров и категорий (app/utils/listing.py).
+    """
+    __tablename__ = 'product_listings'
+    # Индекс под каждую сортировку get-products (все заканчиваются на id) и под фильтры
+    __table_args__ = (
+        db.Index('ix_product_listings_category_stock_price', 'category_id', 'in_stock', 'price'),
+        db.Index('ix_product_listings_price_id', 'price', 'id'),
+        db.Index('ix_product_listings_name_id', 'name', 'id'),
+        db.Index('ix_product_listings_created_at_id', 'created_at', 'id'),
+        db.Index('ix_product_listings_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_product_listings_category_name_id', 'category_name', 'id'),
+        db.Index('ix_product_listings_in_stock_price_id', 'price', 'id',
+                 postgresql_where=db.text('in_stock'), sqlite_where=db.text('in_stock = 1')),
+    )
+
+    id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True,
+                   autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    image_url = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    in_stock = db.Column(db.Boolean)
+    external_id = db.Column(db.String(64), nullable=True)
+    category_id = db.Column(db.Integer, nullable=True)
+    category_name = db.Column(db.String(100), nullable=True)
+
+    def __repr__(self):
+        return f'<ProductListing {self.id}>'
+
+    def category_dict(self):
+        # category_name пуст, если категории нет или она удалена — как product.category is None
+        if self.category_name is None:
+            return None
+        return {'id': self.category_id, 'name': self.category_name}
+
+    def to_dict(self, fields=None):
+        """Тот же ответ, что и Product.to_dict(fields)."""
+        if fields is not None:
+            return {field: self._field_value(field) for field in fields}
+        return {
+            'id': self.id,
+            'name': self.name,
+            'price': self.price,
+            'description': self.description,
+            'category': self.category_dict(),
+            'image_url': self.image_url,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'in_stock': self.in_stock,
+            'external_id': self.external_id,
+        }
+
+    def _field_value(self, field):
+        if field == 'category':
+            return self.category_dict()
+        value = getattr(self, field)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
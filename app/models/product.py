@@ -1,6 +1,10 @@
 from datetime import datetime
 from .. import db
 
+# Поля ответа товара в порядке to_dict(); из них выбирается разреженный набор ?fields=
+PRODUCT_FIELDS = ('id', 'name', 'price', 'description', 'category', 'image_url',
+                  'created_at', 'updated_at', 'in_stock', 'external_id')
+
 class Category(db.Model):  
     __tablename__ = 'categories'  
     
@@ -19,27 +23,47 @@ class Category(db.Model):
 
 class Product(db.Model):  
     __tablename__ = 'products'  
+    # Индексы под фильтры и сортировки get-products (миграция c4d8e2f1a9b3).  
+    # Каждая сортировка заканчивается на id, поэтому id — последняя колонка индекса  
+    __table_args__ = (  
+        db.Index('ix_products_category_stock_price', 'category_id', 'in_stock', 'price'),  
+        db.Index('ix_products_price_id', 'price', 'id'),  
+        db.Index('ix_products_name_id', 'name', 'id'),  
+        db.Index('ix_products_created_at_id', 'created_at', 'id'),  
+        db.Index('ix_products_updated_at_id', 'updated_at', 'id'),  
+        # Витрина почти всегда показывает только товары в наличии.  
+        # Условие записано так, как фильтр in_stock == True компилируется в каждой СУБД  
+        db.Index('ix_products_in_stock_price_id', 'price', 'id',  
+                 postgresql_where=db.text('in_stock'), sqlite_where=db.text('in_stock = 1')),  
+        db.UniqueConstraint('external_id', name='uq_products_external_id'),  
+    )  
 
     id = db.Column(db.Integer, primary_key=True)  
     name = db.Column(db.String(100), nullable=False)  
     price = db.Column(db.Float, nullable=False)  
     description = db.Column(db.Text, nullable=True)  
     image_url = db.Column(db.String(255), nullable=True)  
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)  
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)  
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))  
     category = db.relationship('Category', backref='products')  
     in_stock = db.Column(db.Boolean, default=True)  # Добавляем новую колонку с дефолтным значением True  
+    external_id = db.Column(db.String(64), nullable=True)  # Ключ товара у поставщика (для импорта)  
 
-    def __init__(self, name, price, description=None, image_url=None, category_id=None, in_stock=True):  
+    def __init__(self, name, price, description=None, image_url=None, category_id=None, in_stock=True,  
+                 external_id=None):  
         self.name = name  
         self.price = price  
         self.description = description  
         self.image_url = image_url  
         self.category_id = category_id  
         self.in_stock = in_stock  # Инициализируем in_stock  
+        self.external_id = external_id  
 
-    def to_dict(self):  
+    def to_dict(self, fields=None):  
+        if fields is not None:  
+            # Разреженный набор: читаем только запрошенные атрибуты, остальные могут быть не загружены  
+            return {field: self._field_value(field) for field in fields}  
         return {  
             'id': self.id,  
             'name': self.name,  
@@ -50,7 +74,16 @@ class Product(db.Model):
             'created_at': self.created_at.isoformat(),  
             'updated_at': self.updated_at.isoformat(),  
             'in_stock': self.in_stock,  # Добавляем in_stock в выходной словарь  
+            'external_id': self.external_id,  
         }
+
+    def _field_value(self, field):  
+        value = getattr(self, field)  
+        if field == 'category':  
+            return value.to_dict() if value else None  
+        if isinstance(value, datetime):  
+            return value.isoformat()  
+        return value
         
         
         
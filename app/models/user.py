@@ -1,7 +1,12 @@
 from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
 from werkzeug.security import generate_password_hash, check_password_hash
 from .. import db
 
+# Изменение этих полей отзывает ранее выданные токены пользователя
+TOKEN_SENSITIVE_FIELDS = ('role', 'password_hash', 'email')
+
 class User(db.Model):
     __tablename__ = 'users'
 
@@ -12,6 +17,8 @@ class User(db.Model):
     role = db.Column(db.String(20), default='buyer')  # buyer или admin
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Версия для проверки JWT: растёт при смене роли, пароля или email
+    token_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     def __init__(self, email=None, password=None, username=None, role='buyer'):  
         if email is None:  
@@ -31,7 +38,9 @@ class User(db.Model):
 
     @password.setter  
     def password(self, plaintext):  
-        self.password_hash = generate_password_hash(plaintext)  
+        # Синхронный путь (скрипты, тесты); запросы хэшируют через hasher в пуле процессов  
+        method = current_app.config['PASSWORD_HASH_METHOD'] if has_app_context() else 'pbkdf2:sha256:600000'  
+        self.password_hash = generate_password_hash(plaintext, method=method)  
 
     def verify_password(self, plaintext):  
         return check_password_hash(self.password_hash, plaintext)  
@@ -39,6 +48,10 @@ class User(db.Model):
     def is_admin(self):  
         return self.role == 'admin'  
 
+    def token_claims(self):  
+        # Дополнительные claims JWT: роль и версия, чтобы не читать пользователя на каждый запрос  
+        return {'role': self.role, 'ver': self.token_version or 1}  
+
     def to_dict(self):  
         return {  
             'id': self.id,  
@@ -47,4 +60,11 @@ class User(db.Model):
             'role': self.role,  
             'created_at': self.created_at.isoformat(),  
             'updated_at': self.updated_at.isoformat()  
-        }  
\ No newline at end of file
+        }
+
+
+@event.listens_for(User, 'before_update')
+def bump_token_version(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in TOKEN_SENSITIVE_FIELDS):
+        target.token_version = (target.token_version or 1) + 1
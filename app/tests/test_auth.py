@@ -1,5 +1,6 @@
 import unittest
 import json
+from sqlalchemy import event
 from app import create_app, db
 from app.models.user import User
 
@@ -49,3 +50,70 @@ class AuthTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue('access_token' in data)
         self.assertTrue('refresh_token' in data)
+
+    def _login(self, email='test@example.com', password='password'):
+        response = self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': email, 'password': password}),
+            content_type='application/json'
+        )
+        return json.loads(response.data.decode())
+
+    def test_me_served_from_token_and_cache(self):
+        """/me после первого запроса не обращается к БД"""
+        token = self._login()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+        self.client.get('/api/auth/me', headers=headers)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = self.client.get('/api/auth/me', headers=headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data.decode())['email'], 'test@example.com')
+        self.assertEqual(statements, [])
+
+    def test_role_change_revokes_tokens(self):
+        """Смена роли отзывает выданные токены"""
+        tokens = self._login()
+        user = User.query.filter_by(email='test@example.com').first()
+        user.role = 'admin'
+        db.session.commit()
+
+        response = self.client.get('/api/auth/me',
+                                   headers={'Authorization': f'Bearer {tokens["access_token"]}'})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post('/api/auth/refresh',
+                                    headers={'Authorization': f'Bearer {tokens["refresh_token"]}'})
+        self.assertEqual(response.status_code, 401)
+
+        tokens = self._login()
+        response = self.client.post('/api/auth/refresh',
+                                    headers={'Authorization': f'Bearer {tokens["refresh_token"]}'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_demotion_applies_despite_user_cache(self):
+        """Снятие прав администратора в другом процессе действует сразу, несмотря на кэш пользователей"""
+        user = User.query.filter_by(email='test@example.com').first()
+        user.role = 'admin'
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {self._login()["access_token"]}'}
+        self.assertEqual(self.client.get('/api/auth/me', headers=headers).status_code, 200)
+        response = self.client.get('/api/admin/slow-queries', headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        # UPDATE в обход ORM, как из другого воркера: запись в кэше этого процесса не сброшена
+        db.session.execute(User.__table__.update().where(User.__table__.c.id == user.id)
+                           .values(role='buyer', token_version=User.__table__.c.token_version + 1))
+        db.session.commit()
+        response = self.client.get('/api/admin/slow-queries', headers=headers)
+        self.assertEqual(response.status_code, 403)
+
+    def test_buyer_token_rejected_by_admin_endpoint(self):
+        """Токен покупателя отклоняется admin_required по claims"""
+        token = self._login()['access_token']
+        response = self.client.delete('/api/products/1', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,84 @@
+import unittest
+import json
+from unittest.mock import patch
+from sqlalchemy import event
+from app import create_app, db, cache
+from app.models.product import Product, Category
+
+class BatchLookupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['RESULT_CACHE_BACKEND'] = 'memory'
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        books = Category(name='Книги')
+        db.session.add(books)
+        db.session.flush()
+        self.products = [Product(name=f'Product {i}', price=float(i), category_id=books.id) for i in range(5)]
+        db.session.add_all(self.products)
+        db.session.commit()
+        self.ids = [p.id for p in self.products]
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._count)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._count)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_post_preserves_order_and_reports_missing(self):
+        """Порядок запроса сохраняется, отсутствующие ID перечислены отдельно"""
+        ids = [self.ids[3], 999, self.ids[0], self.ids[3]]
+        response = self.client.post('/api/products/batch', data=json.dumps({'ids': ids}),
+                                    content_type='application/json')
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in data['products']], [self.ids[3], self.ids[0]])
+        self.assertEqual(data['missing'], [999])
+        self.assertEqual(data['products'][0]['category']['name'], 'Книги')
+        self.assertEqual(len(self.statements), 1)
+
+    def test_get_uses_product_cache(self):
+        """Уже загруженные карточки берутся из кэша, а не из БД"""
+        self.client.get(f'/api/products/{self.ids[1]}')
+
+        del self.statements[:]
+        response = self.client.get(f'/api/products/batch?ids={self.ids[1]},{self.ids[2]}')
+        self.assertEqual([p['id'] for p in json.loads(response.data.decode())['products']],
+                         [self.ids[1], self.ids[2]])
+        self.assertEqual(len(self.statements), 1)
+
+        del self.statements[:]
+        self.client.get(f'/api/products/batch?ids={self.ids[2]},{self.ids[1]}')
+        self.assertEqual(self.statements, [])
+
+    def test_catalog_version_read_once(self):
+        """Версия каталога для ключей кэша читается один раз на запрос, а не на каждый id"""
+        self.client.get(f'/api/products/{self.ids[0]}')
+        query = ','.join(str(product_id) for product_id in self.ids)
+        with patch.object(cache, 'version', wraps=cache.version) as version:
+            response = self.client.get(f'/api/products/batch?ids={query}')
+        self.assertEqual(len(json.loads(response.data.decode())['products']), len(self.ids))
+        self.assertEqual(version.call_count, 1)
+
+        # Карточки, положенные batch-запросом, читаются по тем же ключам, что и карточка товара
+        del self.statements[:]
+        self.client.get(f'/api/products/{self.ids[4]}')
+        self.assertEqual(self.statements, [])
+
+    def test_limits_and_validation(self):
+        """Слишком много ID или нечисловые значения дают 400"""
+        self.app.config['BATCH_MAX_IDS'] = 2
+        self.assertEqual(self.client.get('/api/products/batch?ids=1,2,3').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/batch?ids=1,abc').status_code, 400)
+        response = self.client.post('/api/products/batch', data=json.dumps({'ids': 'oops'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,85 @@
+import unittest
+import random
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, func
+from app import create_app, db
+from app.models.product import Product, Category
+from app.models.user import User
+from app.utils.seed import seed_categories
+from benchmarks.generator import ADMIN_EMAIL, CATEGORY_NAMES, generate_catalog
+from benchmarks.runner import percentile, run_scenario
+from benchmarks.scenarios import BenchContext, build_scenarios
+
+
+class BenchmarkSuiteTestCase(unittest.TestCase):
+    """Генератор каталога и сценарии бенчмарка работают на маленькой базе"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _catalog(self):
+        return [(p.name, p.price, p.category_id, p.in_stock)
+                for p in Product.query.order_by(Product.id)]
+
+    def test_generator_is_deterministic(self):
+        """Одинаковый seed даёт одинаковый каталог"""
+        summary = generate_catalog(products=120, users=5, seed=7, batch_size=50, log=lambda *a: None)
+        self.assertEqual(summary['products'], 120)
+        self.assertEqual(summary['users'], 6)
+        first = self._catalog()
+
+        db.drop_all()
+        db.create_all()
+        generate_catalog(products=120, users=5, seed=7, batch_size=50, log=lambda *a: None)
+        self.assertEqual(self._catalog(), first)
+        self.assertEqual(User.query.filter_by(role='admin').count(), 1)
+
+    def test_generator_after_seed_migration(self):
+        """Генератор дополняет базовые категории, уже добавленные миграцией, а не падает на дублях"""
+        seed_categories()
+        summary = generate_catalog(products=30, users=2, seed=3, batch_size=10, log=lambda *a: None)
+        self.assertEqual(summary['categories'], len(CATEGORY_NAMES))
+        self.assertEqual(Category.query.count(), len(CATEGORY_NAMES))
+
+    def test_percentile(self):
+        """Перцентиль по ближайшему рангу"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([5], 95), 5)
+        self.assertIsNone(percentile([], 50))
+
+    def test_scenarios_run(self):
+        """Каждый сценарий отвечает ожидаемым статусом и считает SQL-запросы"""
+        generate_catalog(products=60, users=3, seed=1, log=lambda *a: None)
+        product_ids = tuple(db.session.query(func.min(Product.id), func.max(Product.id)).one())
+        category_ids = [row[0] for row in db.session.query(Category.id)]
+        admin = User.query.filter_by(email=ADMIN_EMAIL).one()
+        token = create_access_token(identity=str(admin.id), additional_claims=admin.token_claims())
+
+        statements = [0]
+
+        def count_statement(*args):
+            statements[0] += 1
+
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        try:
+            ctx = BenchContext(self.app.test_client(), random.Random(1), product_ids, category_ids, 3, token)
+            for scenario in build_scenarios():
+                result = run_scenario(scenario, ctx, statements, requests=2, warmup=0)
+                self.assertEqual(result['errors'], 0, scenario.name)
+                self.assertGreater(result['queries_per_request'], 0, scenario.name)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import json
+from datetime import datetime
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.product import Product, Category
+
+class BulkOperationsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.admin = User(email='admin@example.com', password='adminpass', role='admin')
+        self.books = Category(name='Книги')
+        db.session.add_all([self.admin, self.books])
+        db.session.flush()
+        self.products = [
+            Product(name=f'Product {i}', price=100.0 * (i + 1),
+                    category_id=self.books.id if i < 3 else None)
+            for i in range(5)
+        ]
+        for product in self.products:
+            product.updated_at = datetime(2020, 1, 1)
+        db.session.add_all(self.products)
+        db.session.commit()
+        self.ids = [p.id for p in self.products]
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.admin.id))}'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _post(self, url, body):
+        response = self.client.post(url, data=json.dumps(body), content_type='application/json',
+                                    headers=self.headers)
+        return response, json.loads(response.data.decode())
+
+    def _prices(self):
+        db.session.expire_all()
+        return [p.price for p in Product.query.order_by(Product.id)]
+
+    def test_patch_by_ids(self):
+        """Поля меняются одним UPDATE по списку ids, updated_at обновляется"""
+        response, data = self._post('/api/products/bulk-update',
+                                    {'ids': self.ids[:2], 'set': {'in_stock': False}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['updated'], 2)
+        db.session.expire_all()
+        stock = [p.in_stock for p in Product.query.order_by(Product.id)]
+        self.assertEqual(stock, [False, False, True, True, True])
+        self.assertGreater(db.session.get(Product, self.ids[0]).updated_at, datetime(2020, 1, 1))
+
+    def test_price_adjust_by_filter(self):
+        """Процентная корректировка цены по фильтру get-products"""
+        _, data = self._post('/api/products/bulk-update',
+                             {'filter': {'category_id': self.books.id, 'min_price': 200},
+                              'price_adjust': {'percent': -10}})
+        self.assertEqual(data['updated'], 2)
+        self.assertEqual(self._prices(), [100.0, 180.0, 270.0, 400.0, 500.0])
+
+        self._post('/api/products/bulk-update', {'ids': self.ids[:1], 'price_adjust': {'delta': -500}})
+        self.assertEqual(self._prices()[0], 0)
+
+    def test_delete_by_filter(self):
+        """Удаление по фильтру возвращает число строк"""
+        _, data = self._post('/api/products/bulk-delete', {'filter': {'max_price': 250}})
+        self.assertEqual(data['deleted'], 2)
+        self.assertEqual(Product.query.count(), 3)
+
+    def test_rejects_unsafe_or_invalid_bodies(self):
+        """Пустой фильтр, неизвестные поля, неверные типы и длины, конфликт price/price_adjust дают 400"""
+        for url, body in [
+            ('/api/products/bulk-delete', {'filter': {}}),
+            ('/api/products/bulk-delete', {}),
+            ('/api/products/bulk-update', {'ids': self.ids, 'set': {'id': 1}}),
+            ('/api/products/bulk-update', {'ids': self.ids, 'set': {'price': 1}, 'price_adjust': {'delta': 1}}),
+            ('/api/products/bulk-update', {'ids': self.ids, 'set': {'category_id': 999}}),
+            ('/api/products/bulk-update', {'ids': self.ids}),
+            ('/api/products/bulk-update', {'ids': self.ids, 'set': {'name': 123}}),
+            ('/api/products/bulk-update', {'ids': self.ids, 'set': {'name': 'x' * 101}}),
+            ('/api/products/bulk-update', {'ids': self.ids, 'set': {'description': ['a']}}),
+            ('/api/products/bulk-update', {'ids': self.ids, 'set': {'image_url': 'x' * 256}}),
+            ('/api/products/bulk-update', {'ids': self.ids, 'set': {'category_id': 'books'}}),
+            ('/api/products/bulk-update', {'ids': self.ids, 'set': {'in_stock': 'false'}}),
+            ('/api/products/bulk-update', {'ids': self.ids, 'set': {'price': -1}}),
+        ]:
+            with self.subTest(url=url, body=body):
+                response, _ = self._post(url, body)
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(Product.query.count(), 5)
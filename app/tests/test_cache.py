@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+import json
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app, db, cache
+from app.models.user import User
+from app.models.product import Product, Category
+from app.utils.cache import MemoryBackend, SQLiteBackend
+
+class MemoryBackendTestCase(unittest.TestCase):
+    def test_lru_eviction(self):
+        """При переполнении вытесняется давно не читанная запись"""
+        backend = MemoryBackend(max_entries=2, ttl=60)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('c'), 3)
+
+    def test_ttl_expiry(self):
+        """Просроченная запись не возвращается"""
+        backend = MemoryBackend(max_entries=10, ttl=60)
+        backend.set('a', 1, ttl=-1)
+        self.assertIsNone(backend.get('a'))
+
+    def test_shared_versions(self):
+        """Записи остаются в процессе, а счётчики версий общие для воркеров через файл"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite3')
+            first = MemoryBackend(path=path, shared_versions=True)
+            second = MemoryBackend(path=path, shared_versions=True)
+            first.set('key', 1)
+            self.assertIsNone(second.get('key'))
+            first.incr('version:catalog')
+            self.assertEqual(second.counter('version:catalog'), 1)
+            self.assertEqual(second.incr('version:catalog'), 2)
+            self.assertEqual(first.counter('version:catalog'), 2)
+
+            local = MemoryBackend(path=path)
+            self.assertEqual(local.counter('version:catalog'), 0)
+
+
+class SQLiteBackendTestCase(unittest.TestCase):
+    def test_shared_between_instances(self):
+        """Записи и счётчики версий видны всем экземплярам на одном файле"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite3')
+            first, second = SQLiteBackend(path), SQLiteBackend(path)
+            first.set('key', {'products': [1, 2]})
+            self.assertEqual(second.get('key'), {'products': [1, 2]})
+            first.incr('version:catalog')
+            self.assertEqual(second.counter('version:catalog'), 1)
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['RESULT_CACHE_BACKEND'] = 'memory'
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.admin = User(email='admin@example.com', password='adminpass', role='admin')
+        self.category = Category(name='Книги')
+        db.session.add_all([self.admin, self.category])
+        db.session.flush()
+        self.product = Product(name='Test Product', price=100.0, category_id=self.category.id)
+        db.session.add(self.product)
+        db.session.commit()
+        self.admin_token = create_access_token(identity=str(self.admin.id))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _list(self, body):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = self.client.post('/api/products/get-products',
+                                        data=json.dumps(body), content_type='application/json')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return json.loads(response.data.decode()), len(statements)
+
+    def test_repeated_listing_is_served_from_cache(self):
+        """Повтор того же фильтра (в любом порядке ключей) не идёт в БД"""
+        first, queries = self._list({'in_stock': True, 'category_id': self.category.id})
+        self.assertGreater(queries, 0)
+        second, queries = self._list({'category_id': self.category.id, 'in_stock': True})
+        self.assertEqual(queries, 0)
+        self.assertEqual(first, second)
+
+    def test_writes_invalidate_listing(self):
+        """create/update/delete сдвигают версию каталога"""
+        headers = {'Authorization': f'Bearer {self.admin_token}'}
+        data, _ = self._list({})
+        self.assertEqual(data['total'], 1)
+
+        version = cache.version()
+        self.client.post('/api/products/create', data=json.dumps({'name': 'New', 'price': 1}),
+                         content_type='application/json', headers=headers)
+        self.assertEqual(cache.version(), version + 1)
+        data, _ = self._list({})
+        self.assertEqual(data['total'], 2)
+
+        self.client.put(f'/api/products/{self.product.id}', data=json.dumps({'name': 'Renamed'}),
+                        content_type='application/json', headers=headers)
+        data, _ = self._list({})
+        self.assertIn('Renamed', [p['name'] for p in data['products']])
+
+        self.client.delete(f'/api/products/{self.product.id}', headers=headers)
+        data, _ = self._list({})
+        self.assertEqual(data['total'], 1)
+
+    def test_unrelated_commit_keeps_cache(self):
+        """Commit без изменений каталога не сбрасывает кэш"""
+        version = cache.version()
+        db.session.add(User(email='other@example.com', password='x'))
+        db.session.commit()
+        self.assertEqual(cache.version(), version)
@@ -0,0 +1,157 @@
+import unittest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import create_app, db
+from app.models.product import Product, Category
+from app.models.user import User
+from app.utils.columnar import columnar_catalog, np
+
+# Фильтры и сортировки, на которых колоночный каталог должен отвечать как SQL
+COLUMNAR_BODIES = [
+    {},
+    {'sort_by': 'id', 'sort_order': 'desc'},
+    {'sort_by': 'price'},
+    {'sort_by': 'price', 'sort_order': 'desc', 'in_stock': True},
+    {'sort_by': 'name'},
+    {'sort_by': 'name', 'sort_order': 'desc', 'in_stock': False},
+    {'sort_by': 'category.name'},
+    {'sort_by': 'category.name', 'sort_order': 'desc', 'min_price': 200},
+    {'sort_by': 'created_at', 'sort_order': 'desc', 'min_price': 150},
+    {'sort_by': 'updated_at', 'created_from': '2024-01-02T00:00:00', 'created_to': '2024-01-05T12:00:00'},
+    {'category_id': 1, 'max_price': 500},
+    {'category_id': 999},
+]
+
+COLUMNAR_QUERIES = ['?limit=5', '?limit=5&page=2', '?limit=5&page=99', '?limit=4&pagination=cursor',
+                    '?limit=4&pagination=cursor&with_total=true', '?fields=list', '?fields=id,category']
+
+
+@unittest.skipIf(np is None, 'numpy не установлен')
+class ColumnarCatalogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.admin = User(email='admin@example.com', password='adminpass', role='admin')
+        self.books = Category(name='Книги')
+        self.tech = Category(name='Электроника')
+        db.session.add_all([self.admin, self.books, self.tech])
+        db.session.flush()
+        started = datetime(2024, 1, 1)
+        for i in range(15):
+            # Повторяющиеся цены, имена и даты проверяют разрешение равенств по id
+            product = Product(name=f'Товар {i % 4}', price=100.0 * (i % 5 + 1), description='Описание',
+                              in_stock=[True, False, None][i % 3],
+                              category_id=[self.books.id, self.tech.id, None][i % 3 if i % 7 else 2])
+            product.created_at = started + timedelta(days=i % 6, hours=i)
+            product.updated_at = started + timedelta(days=i)
+            db.session.add(product)
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.admin.id))}'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _list(self, body, columnar, query='?limit=5'):
+        self.app.config['COLUMNAR_CATALOG'] = columnar
+        response = self.client.post(f'/api/products/get-products{query}', json=body)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.get_json()
+
+    def _assert_parity(self, body, query='?limit=5'):
+        self.assertEqual(self._list(body, True, query), self._list(body, False, query))
+
+    def _walk(self, body, columnar, limit=4):
+        # Все страницы keyset-пагинации подряд
+        pages, cursor = [], None
+        while True:
+            query = f'?limit={limit}&cursor={cursor}' if cursor else f'?limit={limit}&pagination=cursor'
+            result = self._list(body, columnar, query)
+            pages.append(result)
+            cursor = result['next_cursor']
+            if cursor is None:
+                return pages
+
+    def test_parity_with_sql(self):
+        """Фильтры, сортировки, страницы и наборы полей совпадают с ответом SQL"""
+        for body in COLUMNAR_BODIES:
+            for query in COLUMNAR_QUERIES:
+                with self.subTest(body=body, query=query):
+                    self._assert_parity(body, query)
+
+    def test_cursor_walk_parity(self):
+        """Курсоры каталога проходят выдачу так же, как SQL, и взаимозаменяемы с ними"""
+        for body in COLUMNAR_BODIES:
+            with self.subTest(body=body):
+                self.assertEqual(self._walk(body, True), self._walk(body, False))
+
+        first = self._list({'sort_by': 'created_at'}, True, '?limit=3&pagination=cursor')
+        cursor_query = f'?limit=3&cursor={first["next_cursor"]}'
+        self.assertEqual(self._list({'sort_by': 'created_at'}, False, cursor_query),
+                         self._list({'sort_by': 'created_at'}, True, cursor_query))
+
+    def test_counts_and_pages_without_sql(self):
+        """После загрузки каталога запрос страницы — один SELECT по первичному ключу"""
+        self._list({'sort_by': 'price'}, True)
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            self._list({'sort_by': 'price', 'in_stock': True}, True, '?limit=5&page=2')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(len(statements), 1, statements)
+        self.assertNotIn('count(', statements[0].lower())
+
+    def test_unsupported_filters_fall_back_to_sql(self):
+        """Поиск и category_id не целым числом обрабатывает SQL"""
+        for body in ({'search_query': 'Товар 1'}, {'category_id': '1'}):
+            with self.subTest(body=body):
+                self._assert_parity(body)
+
+    def test_incremental_refresh(self):
+        """Изменения через ORM, массовые операции и переименование категории видны сразу"""
+        body = {'sort_by': 'price', 'sort_order': 'desc'}
+        self._assert_parity(body)
+        catalog = columnar_catalog()
+        loaded = catalog.snapshot
+
+        product = db.session.get(Product, 3)
+        product.price = 10000.0
+        db.session.add(Product(name='Новый', price=5000.0, category_id=self.tech.id))
+        db.session.commit()
+        self._assert_parity(body)
+        self.assertIsNot(catalog.snapshot, loaded)
+        self.assertEqual(self._list(body, True)['products'][0]['id'], 3)
+
+        response = self.client.post('/api/products/bulk-update', headers=self.headers,
+                                    json={'ids': [1, 2], 'price_adjust': {'percent': 50}})
+        self.assertEqual(response.status_code, 200, response.data)
+        self._assert_parity(body)
+
+        response = self.client.post('/api/products/bulk-delete', headers=self.headers, json={'ids': [3, 4]})
+        self.assertEqual(response.status_code, 200, response.data)
+        self._assert_parity(body)
+        self.assertEqual(len(catalog.snapshot), Product.query.count())
+
+        self.books.name = 'Аудиокниги'
+        db.session.commit()
+        self._assert_parity({'sort_by': 'category.name'})
+
+    def test_refresh_is_idempotent(self):
+        """Повторное обновление без изменений оставляет прежний снимок с его сортировками"""
+        self._list({'sort_by': 'name'}, True)
+        catalog = columnar_catalog()
+        snapshot = catalog.snapshot
+        catalog.refresh(lag=3600 * 24 * 365)
+        self.assertIs(catalog.snapshot, snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
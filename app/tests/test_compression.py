@@ -0,0 +1,97 @@
+import unittest
+import gzip
+import json
+from unittest.mock import patch
+from app import create_app, db
+from app.middleware import compression
+from app.models.product import Product, Category
+
+
+class CompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['RESULT_CACHE_BACKEND'] = 'memory'
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        category = Category(name='Книги')
+        db.session.add(category)
+        db.session.flush()
+        self.products = [
+            Product(name=f'Товар {i}', price=100.0 + i, category_id=category.id,
+                    description='Подробное описание товара с характеристиками. ' * 10)
+            for i in range(20)
+        ]
+        db.session.add_all(self.products)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _list(self, encoding='gzip'):
+        headers = {'Accept-Encoding': encoding} if encoding else {}
+        return self.client.post('/api/products/get-products?limit=20', json={}, headers=headers)
+
+    def test_gzip_listing(self):
+        """Листинг сжимается gzip и распаковывается в тот же JSON"""
+        plain = self._list(encoding=None)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        response = self._list()
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertLess(len(response.data), len(plain.data))
+        self.assertEqual(json.loads(gzip.decompress(response.data)), plain.get_json())
+
+    def test_negotiation(self):
+        """gzip;q=0 и неизвестные кодировки — ответ без сжатия"""
+        self.assertNotIn('Content-Encoding', self._list('gzip;q=0').headers)
+        self.assertNotIn('Content-Encoding', self._list('compress').headers)
+        self.assertEqual(self._list('deflate, gzip;q=0.5').headers['Content-Encoding'], 'gzip')
+
+    def test_small_response_not_compressed(self):
+        """Ответы короче COMPRESSION_MIN_SIZE не сжимаются"""
+        response = self.client.get('/api/products/categories', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_cached_payload_reused(self):
+        """Повторный запрос из кэша отдаёт уже сжатые байты"""
+        with patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            first = self._list()
+            second = self._list()
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.data, second.data)
+
+        # Изменение каталога сдвигает версию: сжатая копия старой страницы больше не находится
+        self.products[0].name = 'Переименованный'
+        db.session.commit()
+        with patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            third = self._list()
+        self.assertEqual(compress.call_count, 1)
+        self.assertIn('Переименованный', gzip.decompress(third.data).decode())
+
+    def test_etag_of_compressed_representation(self):
+        """Сжатая карточка получает свой ETag, и он даёт 304"""
+        url = f'/api/products/{self.products[0].id}'
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        etag = response.headers['ETag']
+        self.assertTrue(etag.endswith('-gzip"'))
+
+        cached = self.client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.headers['ETag'], etag)
+
+        plain = self.client.get(url)
+        self.assertFalse(plain.headers['ETag'].endswith('-gzip"'))
+
+
+if __name__ == '__main__':
+    unittest.main()
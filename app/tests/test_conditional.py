@@ -0,0 +1,83 @@
+import unittest
+import json
+from sqlalchemy import event
+from app import create_app, db
+from app.models.product import Product, Category
+
+class ConditionalGetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['RESULT_CACHE_BACKEND'] = 'memory'
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.category = Category(name='Книги')
+        db.session.add(self.category)
+        db.session.flush()
+        self.product = Product(name='Test Product', price=100.0, category_id=self.category.id)
+        db.session.add(self.product)
+        db.session.commit()
+        self.url = f'/api/products/{self.product.id}'
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._count)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._count)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_product_etag_and_304_without_db(self):
+        """Карточка отдаёт ETag, Last-Modified и 304 из кэша без запроса к БД"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertIn('Last-Modified', response.headers)
+        self.assertIn('max-age', response.headers['Cache-Control'])
+
+        del self.statements[:]
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(self.statements, [])
+
+    def test_product_etag_changes_with_product_and_category(self):
+        """ETag меняется при изменении товара и при переименовании его категории"""
+        etag = self.client.get(self.url).headers['ETag']
+
+        self.category.name = 'Журналы'
+        db.session.commit()
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(json.loads(response.data.decode())['product']['category']['name'], 'Журналы')
+
+    def test_304_without_cache(self):
+        """Без кэша условный запрос тоже получает 304 (после чтения строки)"""
+        self.app.config['RESULT_CACHE_BACKEND'] = 'null'
+        self.app.extensions['result_cache']['backend'] = None
+        etag = self.client.get(self.url).headers['ETag']
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_categories_etag(self):
+        """Справочник категорий отдаёт стабильный ETag и 304"""
+        response = self.client.get('/api/products/categories')
+        etag = response.headers['ETag']
+        self.assertEqual(self.client.get('/api/products/categories').headers['ETag'], etag)
+
+        del self.statements[:]
+        response = self.client.get('/api/products/categories', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.statements, [])
+
+        db.session.add(Category(name='Обувь'))
+        db.session.commit()
+        response = self.client.get('/api/products/categories', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
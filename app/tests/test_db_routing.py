@@ -0,0 +1,122 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.config import TestingConfig, config
+from app.models.product import Product
+from app.models.user import User
+from app.utils.db_routing import STICKY_COOKIE, engine_options
+
+
+class DatabaseRoutingTestCase(unittest.TestCase):
+    """Чтения read_only-эндпоинтов уходят на реплику; после записи — на основную базу"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        class ReplicaConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(self.tmpdir, 'primary.sqlite3')
+            DATABASE_REPLICA_URLS = 'sqlite:///' + os.path.join(self.tmpdir, 'replica.sqlite3')
+
+        with patch.dict(config, {'replica-testing': ReplicaConfig}):
+            self.app = create_app('replica-testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        # Две независимые базы с одинаковой схемой: отличие данных показывает, откуда читали
+        self.replica = self.app.extensions['db_routing']['replicas'][0]
+        db.create_all()
+        db.metadata.create_all(self.replica)
+        self.admin = User(email='admin@example.com', password='secret', username='admin', role='admin')
+        db.session.add_all([self.admin, Product(name='Основная', price=100.0)])
+        db.session.commit()
+        with self.replica.begin() as conn:
+            conn.execute(Product.__table__.insert().values(id=1, name='Реплика', price=100.0))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.replica.dispose()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _headers(self):
+        token = create_access_token(identity=str(self.admin.id), additional_claims=self.admin.token_claims())
+        return {'Authorization': f'Bearer {token}'}
+
+    def test_reads_go_to_replica(self):
+        """Карточка и список читаются с реплики"""
+        response = self.client.get('/api/products/1')
+        self.assertEqual(response.get_json()['product']['name'], 'Реплика')
+        response = self.client.post('/api/products/get-products', json={})
+        self.assertEqual([p['name'] for p in response.get_json()['products']], ['Реплика'])
+        self.assertIsNone(self.client.get_cookie(STICKY_COOKIE))
+
+    def test_read_your_writes(self):
+        """После записи клиент читает с основной базы, другие клиенты — с реплики"""
+        response = self.client.put('/api/products/1', json={'name': 'Обновлённая'}, headers=self._headers())
+        self.assertEqual(response.status_code, 200)
+        # Сама запись и перечитывание после неё — в основной базе
+        self.assertEqual(response.get_json()['product']['name'], 'Обновлённая')
+        self.assertIsNotNone(self.client.get_cookie(STICKY_COOKIE))
+
+        response = self.client.get('/api/products/1')
+        self.assertEqual(response.get_json()['product']['name'], 'Обновлённая')
+
+        other = self.app.test_client()
+        self.assertEqual(other.get('/api/products/1').get_json()['product']['name'], 'Реплика')
+
+    def test_replica_reads_not_cached_right_after_change(self):
+        """Чтение с отстающей реплики сразу после изменения каталога не попадает в кэш результатов"""
+        self.app.config['RESULT_CACHE_BACKEND'] = 'memory'
+        self.app.extensions['result_cache']['backend'] = None
+        response = self.client.put('/api/products/1', json={'name': 'Обновлённая'}, headers=self._headers())
+        self.assertEqual(response.status_code, 200)
+
+        other = self.app.test_client()
+        self.assertEqual(other.get('/api/products/1').get_json()['product']['name'], 'Реплика')
+        with self.replica.begin() as conn:
+            conn.execute(Product.__table__.update().values(name='Обновлённая'))
+        # Старая строка с реплики не закэширована под новой версией
+        self.assertEqual(other.get('/api/products/1').get_json()['product']['name'], 'Обновлённая')
+
+        # Вне окна отставания реплики чтения с неё кэшируются как обычно
+        self.app.config['DB_REPLICA_STICKY_SECONDS'] = 0
+        other.get('/api/products/1')
+        with self.replica.begin() as conn:
+            conn.execute(Product.__table__.update().values(name='Из кэша не видно'))
+        self.assertEqual(other.get('/api/products/1').get_json()['product']['name'], 'Обновлённая')
+
+    def test_sticky_window_expires(self):
+        """Просроченная cookie больше не держит клиента на основной базе"""
+        self.client.set_cookie(STICKY_COOKIE, '1')
+        response = self.client.get('/api/products/1')
+        self.assertEqual(response.get_json()['product']['name'], 'Реплика')
+
+    def test_writes_outside_read_only_use_primary(self):
+        """Эндпоинты без read_only работают с основной базой"""
+        response = self.client.post('/api/products/batch', json={'ids': [1]})
+        self.assertEqual(response.get_json()['products'][0]['name'], 'Основная')
+
+    def test_engine_options(self):
+        """Параметры пула берутся из конфига; in-memory SQLite — без размеров очереди"""
+        options = engine_options(self.app.config, 'postgresql://u@localhost/db')
+        self.assertEqual(options['pool_size'], self.app.config['DB_POOL_SIZE'])
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertNotIn('pool_size', engine_options(self.app.config, 'sqlite://'))
+
+        self.app.config['DB_STATEMENT_TIMEOUT_MS'] = 5000
+        options = engine_options(self.app.config, 'postgresql://u@localhost/db')
+        self.assertEqual(options['connect_args'], {'options': '-c statement_timeout=5000'})
+        self.assertNotIn('connect_args', engine_options(self.app.config, 'sqlite:///x.db'))
+
+        pool = self.replica.pool
+        self.assertEqual(pool.size(), self.app.config['DB_POOL_SIZE'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import csv
+import gzip
+import io
+import unittest
+import json
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.product import Product, Category
+
+class ExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['EXPORT_YIELD_PER'] = 2
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.admin = User(email='admin@example.com', password='adminpass', role='admin')
+        books = Category(name='Книги')
+        db.session.add_all([self.admin, books])
+        db.session.flush()
+        for i in range(5):
+            db.session.add(Product(name=f'Product {i}', price=float(i * 10),
+                                   category_id=books.id if i % 2 else None))
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.admin.id))}'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _export(self, query, body=None):
+        response = self.client.post(f'/api/products/export{query}', data=json.dumps(body or {}),
+                                    content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        return response
+
+    def test_ndjson_export_with_filters(self):
+        """NDJSON-выгрузка учитывает фильтры get-products"""
+        response = self._export('?format=ndjson', {'min_price': 20, 'sort_by': 'price', 'sort_order': 'desc'})
+        rows = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([r['price'] for r in rows], [40.0, 30.0, 20.0])
+        self.assertEqual(rows[1]['category_name'], 'Книги')
+        self.assertIn('products.ndjson', response.headers['Content-Disposition'])
+
+    def test_csv_gzip_export(self):
+        """CSV сжимается в gzip на лету"""
+        response = self._export('?format=csv&gzip=1')
+        self.assertEqual(response.mimetype, 'application/gzip')
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.data).decode())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['name'], 'Product 0')
+
+    def test_empty_csv_has_header(self):
+        """Пустая выгрузка CSV содержит только заголовок"""
+        response = self._export('?format=csv', {'min_price': 1000})
+        self.assertEqual(response.data.decode().splitlines()[0].split(',')[:2], ['id', 'name'])
+
+    def test_requires_admin(self):
+        """Выгрузка доступна только администратору"""
+        response = self.client.post('/api/products/export', data='{}', content_type='application/json')
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,69 @@
+import unittest
+import json
+from sqlalchemy import event
+from app import create_app, db
+from app.models.product import Product, Category
+
+class FacetsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.books = Category(name='Книги')
+        self.shoes = Category(name='Обувь')
+        db.session.add_all([self.books, self.shoes])
+        db.session.flush()
+        db.session.add_all([
+            Product(name='Book 1', price=150.0, category_id=self.books.id),
+            Product(name='Book 2', price=950.0, category_id=self.books.id, in_stock=False),
+            Product(name='Boots', price=2500.0, category_id=self.shoes.id),
+            Product(name='Misc', price=1200.0),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _facets(self, body):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = self.client.post('/api/products/facets', data=json.dumps(body),
+                                        content_type='application/json')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return response, json.loads(response.data.decode()), len(statements)
+
+    def test_facets_single_query(self):
+        """Счётчики категорий, наличия и гистограмма — одним запросом"""
+        response, data, queries = self._facets({})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 1)
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(data['in_stock'], 3)
+        self.assertEqual(data['price'], {'min': 150.0, 'max': 2500.0})
+
+        categories = {c['name']: (c['count'], c['in_stock']) for c in data['categories']}
+        self.assertEqual(categories, {'Книги': (2, 1), 'Обувь': (1, 1), None: (1, 1)})
+        self.assertEqual(data['price_histogram'], [
+            {'from': 0.0, 'to': 1000.0, 'count': 2},
+            {'from': 1000.0, 'to': 2000.0, 'count': 1},
+            {'from': 2000.0, 'to': 3000.0, 'count': 1},
+        ])
+
+    def test_facets_apply_listing_filters(self):
+        """Фасеты учитывают тот же фильтр, что и get-products"""
+        _, data, _ = self._facets({'in_stock': True, 'max_price': 2000, 'price_bucket': 500})
+        self.assertEqual(data['total'], 2)
+        self.assertEqual([b['from'] for b in data['price_histogram']], [0.0, 1000.0])
+
+    def test_invalid_bucket(self):
+        """Неположительная ширина корзины отклоняется"""
+        response, _, _ = self._facets({'price_bucket': 0})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,141 @@
+import unittest
+import json
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import create_app, db
+from app.models.product import Product, Category
+from app.utils.fields import FieldsError, parse_fields
+
+
+class SparseFieldsTestCase(unittest.TestCase):
+    """Параметр fields: проекция колонок в SQL и урезанный ответ"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['RESULT_CACHE_BACKEND'] = 'memory'
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        categories = [Category(name='Электроника'), Category(name='Книги')]
+        db.session.add_all(categories)
+        db.session.flush()
+        for i in range(6):
+            db.session.add(Product(name=f'Товар {i}', price=float(i * 10), description='Длинное описание ' * 50,
+                                   image_url=f'/img/{i}.jpg', category_id=categories[i % 2].id))
+        db.session.commit()
+        self.product_ids = [p.id for p in Product.query.order_by(Product.id)]
+        db.session.remove()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @contextmanager
+    def capture_sql(self):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    def test_parse_fields(self):
+        """Разбор fields: порядок, обязательный id, наборы и ошибки"""
+        self.assertIsNone(parse_fields(None))
+        self.assertEqual(parse_fields('price,name'), ('id', 'name', 'price'))
+        self.assertEqual(parse_fields('list'), ('id', 'name', 'price', 'image_url', 'in_stock'))
+        self.assertIsNone(parse_fields(','.join(['id', 'name', 'price', 'description', 'category', 'image_url',
+                                                 'created_at', 'updated_at', 'in_stock', 'external_id'])))
+        with self.assertRaises(FieldsError):
+            parse_fields('name,password_hash')
+
+    def test_list_projection(self):
+        """Список с fields=list не читает description и не присоединяет категории"""
+        with self.capture_sql() as statements:
+            response = self.client.post('/api/products/get-products?fields=list&limit=3', json={})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+        self.assertEqual(len(data['products']), 3)
+        for product in data['products']:
+            self.assertEqual(set(product), {'id', 'name', 'price', 'image_url', 'in_stock'})
+
+        page_sql = statements[-1].lower()
+        self.assertNotIn('description', page_sql)
+        self.assertNotIn('categories', page_sql)
+        self.assertIn('image_url', page_sql)
+
+    def test_list_cursor_and_category_sort(self):
+        """Проекция работает с keyset-пагинацией и сортировкой по категории"""
+        body = {'sort_by': 'category.name', 'sort_order': 'asc'}
+        response = self.client.post('/api/products/get-products?fields=name&pagination=cursor&limit=4', json=body)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+        self.assertEqual([set(p) for p in data['products']], [{'id', 'name'}] * 4)
+        self.assertIsNotNone(data['next_cursor'])
+
+        response = self.client.post('/api/products/get-products?fields=name,category&limit=6', json=body)
+        names = [p['category']['name'] for p in json.loads(response.data.decode())['products']]
+        self.assertEqual(names, sorted(names))
+
+    def test_full_and_sparse_lists_cached_separately(self):
+        """Полный и урезанный список не смешиваются в кэше"""
+        sparse = self.client.post('/api/products/get-products?fields=list', json={})
+        full = self.client.post('/api/products/get-products', json={})
+        self.assertNotIn('description', json.loads(sparse.data.decode())['products'][0])
+        self.assertIn('description', json.loads(full.data.decode())['products'][0])
+
+    def test_unknown_field_rejected(self):
+        """Неизвестное поле — 400 на всех эндпоинтах"""
+        self.assertEqual(self.client.post('/api/products/get-products?fields=secret', json={}).status_code, 400)
+        self.assertEqual(self.client.get(f'/api/products/{self.product_ids[0]}?fields=secret').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/batch?ids=1&fields=secret').status_code, 400)
+
+    def test_detail_projection(self):
+        """Карточка с fields читает только нужные колонки и поддерживает ETag"""
+        url = f'/api/products/{self.product_ids[0]}?fields=name,price'
+        with self.capture_sql() as statements:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data.decode())['product'], {'id': self.product_ids[0],
+                                                                          'name': 'Товар 0', 'price': 0.0})
+        self.assertNotIn('description', statements[-1].lower())
+
+        response = self.client.get(url, headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        full = self.client.get(f'/api/products/{self.product_ids[0]}')
+        self.assertIn('description', json.loads(full.data.decode())['product'])
+
+    def test_batch_projection(self):
+        """Batch с fields урезает и карточки из кэша, и прочитанные из БД"""
+        cached_id, fresh_id = self.product_ids[0], self.product_ids[1]
+        self.client.get(f'/api/products/{cached_id}')
+
+        with self.capture_sql() as statements:
+            response = self.client.get(f'/api/products/batch?ids={cached_id},{fresh_id}&fields=name,category')
+        data = json.loads(response.data.decode())
+        self.assertEqual([p['id'] for p in data['products']], [cached_id, fresh_id])
+        for product in data['products']:
+            self.assertEqual(set(product), {'id', 'name', 'category'})
+        self.assertNotIn('description', statements[-1].lower())
+
+        # Неполная карточка не должна попасть в кэш полной
+        full = self.client.get(f'/api/products/{fresh_id}')
+        self.assertIn('description', json.loads(full.data.decode())['product'])
+
+    def test_category_in_sparse_product(self):
+        """Категория в разреженном наборе полей — тот же объект, что и в полном ответе"""
+        product = db.session.get(Product, self.product_ids[0])
+        self.assertEqual(product.category.to_dict(), {'id': product.category_id, 'name': 'Электроника'})
+        self.assertEqual(product.to_dict(['category'])['category'], product.to_dict()['category'])
+
+
+if __name__ == '__main__':
+    unittest.main()
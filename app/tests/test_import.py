@@ -0,0 +1,105 @@
+import io
+import os
+import tempfile
+import unittest
+import json
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.product import Product, Category
+
+CSV_FEED = '''name,price,category,in_stock,external_id,description
+Book,100,Книги,true,SKU-1,First
+Boots,2500,Обувь,0,SKU-2,
+Broken,abc,Книги,true,SKU-3,
+Ghost,10,Неизвестная,true,SKU-4,
+Lamp,30,,yes,SKU-5,
+'''
+
+class ImportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.admin = User(email='admin@example.com', password='adminpass', role='admin')
+        db.session.add_all([self.admin, Category(name='Книги'), Category(name='Обувь')])
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.admin.id))}'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _import(self, body, query='', content_type='text/csv'):
+        response = self.client.post(f'/api/products/import{query}', data=body,
+                                    content_type=content_type, headers=self.headers)
+        return response, json.loads(response.data.decode())
+
+    def test_csv_import_reports_row_errors(self):
+        """CSV импортируется пачками, ошибочные строки попадают в отчёт"""
+        response, report = self._import(CSV_FEED.encode(), '?batch_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(report['rows'], 5)
+        self.assertEqual(report['written'], 3)
+        self.assertEqual([e['row'] for e in report['errors']], [4, 5])
+        self.assertIn('rows_per_sec', report)
+
+        boots = Product.query.filter_by(external_id='SKU-2').one()
+        self.assertEqual(boots.category.name, 'Обувь')
+        self.assertFalse(boots.in_stock)
+
+    def test_invalid_method_and_batch_size(self):
+        """Неизвестный метод и непозитивный размер пачки отклоняются до импорта"""
+        for query in ('?method=bulk', '?batch_size=0', '?batch_size=-5', '?batch_size=abc'):
+            with self.subTest(query=query):
+                response, body = self._import(CSV_FEED.encode(), query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('msg', body)
+        self.assertEqual(Product.query.count(), 0)
+
+    def test_ndjson_upsert_by_external_id(self):
+        """Повторный импорт с upsert обновляет товары по external_id"""
+        feed = '\n'.join(json.dumps(row, ensure_ascii=False) for row in [
+            {'name': 'Book', 'price': 100, 'external_id': 'SKU-1'},
+            {'name': 'Lamp', 'price': 30, 'external_id': 'SKU-5'},
+        ])
+        self._import(feed.encode(), '?upsert=1', 'application/x-ndjson')
+
+        feed = '\n'.join(json.dumps(row) for row in [
+            {'name': 'Book v2', 'price': 120, 'external_id': 'SKU-1'},
+            'not an object',
+            {'name': 'Chair', 'price': 50, 'external_id': 'SKU-6'},
+        ])
+        response, report = self._import(feed.encode(), '?upsert=1&format=ndjson')
+        self.assertEqual(report['written'], 2)
+        self.assertEqual(report['failed'], 1)
+        self.assertEqual(Product.query.count(), 3)
+        self.assertEqual(Product.query.filter_by(external_id='SKU-1').one().price, 120.0)
+
+    def test_duplicate_external_id_without_upsert(self):
+        """Нарушение уникальности в пачке разбирается построчно"""
+        feed = 'name,price,external_id\nA,1,X\nB,2,X\nC,3,Y\n'
+        _, report = self._import(feed.encode())
+        self.assertEqual(report['written'], 2)
+        self.assertEqual([e['row'] for e in report['errors']], [3])
+
+    def test_multipart_upload(self):
+        """Файл можно загрузить полем формы"""
+        data = {'file': (io.BytesIO(CSV_FEED.encode()), 'feed.csv')}
+        response = self.client.post('/api/products/import', data=data, headers=self.headers,
+                                    content_type='multipart/form-data')
+        self.assertEqual(json.loads(response.data.decode())['written'], 3)
+
+    def test_cli_command(self):
+        """flask products import загружает файл"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'feed.csv')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(CSV_FEED)
+            result = self.app.test_cli_runner().invoke(args=['products', 'import', path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(Product.query.count(), 3)
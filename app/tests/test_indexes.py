@@ -0,0 +1,68 @@
+import unittest
+import json
+from sqlalchemy.dialects import sqlite
+from app import create_app, db
+from app.models.product import Product, Category
+from app.utils.filters import normalize_filters, build_product_query
+
+class ListingIndexesTestCase(unittest.TestCase):
+    """Планировщик использует индексы для основных фильтров и сортировок get-products"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        if db.engine.dialect.name != 'sqlite':
+            self.skipTest('План запроса проверяется через SQLite EXPLAIN QUERY PLAN')
+
+        category = Category(name='Книги')
+        db.session.add(category)
+        db.session.flush()
+        for i in range(200):
+            db.session.add(Product(name=f'Product {i}', price=float(i % 50),
+                                   category_id=category.id if i % 2 else None, in_stock=bool(i % 3)))
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _plan(self, body):
+        query, _ = build_product_query(normalize_filters(body))
+        statement = query.limit(10).statement.compile(dialect=sqlite.dialect(),
+                                                      compile_kwargs={'literal_binds': True})
+        rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}')).fetchall()
+        return '\n'.join(row[-1] for row in rows)
+
+    def assertUsesIndex(self, body, index):
+        plan = self._plan(body)
+        self.assertIn(index, plan, plan)
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan, plan)
+
+    def test_sorts_use_index(self):
+        """Каждая сортировка читается из индекса (поле, id) без отдельной сортировки"""
+        for sort_by in ('price', 'name', 'created_at', 'updated_at'):
+            for sort_order in ('asc', 'desc'):
+                with self.subTest(sort_by=sort_by, sort_order=sort_order):
+                    self.assertUsesIndex({'sort_by': sort_by, 'sort_order': sort_order},
+                                         f'ix_products_{sort_by}_id')
+
+    def test_category_filter_uses_composite_index(self):
+        """Фильтр категория + наличие + цена идёт по составному индексу"""
+        plan = self._plan({'category_id': 1, 'in_stock': True, 'min_price': 10, 'max_price': 20})
+        self.assertIn('ix_products_category_stock_price', plan, plan)
+
+    def test_in_stock_price_sort_uses_partial_index(self):
+        """Витрина «в наличии, по цене» использует частичный индекс"""
+        self.assertUsesIndex({'in_stock': True, 'sort_by': 'price'}, 'ix_products_in_stock_price_id')
+
+    def test_unsupported_sort_is_rejected(self):
+        """Сортировка по полю без индекса отклоняется с 400"""
+        response = self.client.post('/api/products/get-products',
+                                    data=json.dumps({'sort_by': 'description'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,82 @@
+import unittest
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from flask import jsonify
+from app import create_app, db
+from app.models.product import Product, Category
+from app.utils.json_provider import OrjsonProvider, StdlibJSONProvider, make_json_provider, orjson
+
+
+class JSONProviderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        category = Category(name='Электроника')
+        db.session.add(category)
+        db.session.flush()
+        db.session.add(Product(name='Ноутбук', price=999.99, category_id=category.id))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _payload(self):
+        return {
+            'products': [p.to_dict() for p in Product.query.all()],
+            'at': datetime(2024, 1, 2, 3, 4, 5, 678000),
+            'price': Decimal('1.50'),
+            'uid': uuid.UUID(int=1),
+            'row': db.session.query(Category.id, Category.name).first(),
+        }
+
+    @unittest.skipIf(orjson is None, 'orjson не установлен')
+    def test_orjson_selected_by_default(self):
+        """При установленном orjson create_app регистрирует быстрый провайдер"""
+        self.assertIsInstance(self.app.json, OrjsonProvider)
+
+    def test_stdlib_fallback(self):
+        """JSON_PROVIDER=stdlib оставляет стандартный кодировщик"""
+        self.app.config['JSON_PROVIDER'] = 'stdlib'
+        self.assertIsInstance(make_json_provider(self.app), StdlibJSONProvider)
+
+    def test_providers_agree(self):
+        """orjson и stdlib дают одинаковый JSON, даты в ISO 8601, строки Row как объекты"""
+        providers = [StdlibJSONProvider(self.app)]
+        if orjson is not None:
+            providers.append(OrjsonProvider(self.app))
+        decoded = []
+        for provider in providers:
+            self.app.json = provider
+            with self.app.test_request_context():
+                response = jsonify(self._payload())
+            self.assertEqual(response.mimetype, 'application/json')
+            decoded.append(json.loads(response.get_data()))
+
+        data = decoded[0]
+        self.assertEqual(data['at'], '2024-01-02T03:04:05.678000')
+        self.assertEqual(data['price'], '1.50')
+        self.assertEqual(data['uid'], str(uuid.UUID(int=1)))
+        self.assertEqual(data['row'], {'id': 1, 'name': 'Электроника'})
+        self.assertEqual(data['products'][0]['name'], 'Ноутбук')
+        for other in decoded[1:]:
+            self.assertEqual(other, data)
+
+    def test_api_response(self):
+        """Эндпоинты каталога отдают корректный JSON через зарегистрированный провайдер"""
+        response = self.client.post('/api/products/get-products', json={})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+        self.assertEqual(data['products'][0]['category']['name'], 'Электроника')
+        self.assertEqual(self.app.json.loads(self.app.json.dumps({'a': [1, 2]})), {'a': [1, 2]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.listing import ProductListing
+from app.models.product import Product, Category
+from app.models.user import User
+from app.utils.listing import prune_listing, refresh_listing
+
+# Комбинации фильтров и сортировок, на которых витрина должна отвечать как products
+LISTING_BODIES = [
+    {},
+    {'sort_by': 'price'},
+    {'sort_by': 'price', 'sort_order': 'desc', 'in_stock': True},
+    {'sort_by': 'name'},
+    {'sort_by': 'category.name'},
+    {'sort_by': 'category.name', 'sort_order': 'desc'},
+    {'sort_by': 'created_at', 'sort_order': 'desc', 'min_price': 150},
+    {'sort_by': 'updated_at'},
+    {'category_id': 1, 'max_price': 500},
+    {'search_query': 'ноутбук'},
+    {'search_query': 'Ноутбук', 'sort_by': 'price'},
+]
+
+
+class ListingReadModelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['LISTING_READ_MODEL'] = 'sync'
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.admin = User(email='admin@example.com', password='adminpass', role='admin')
+        self.books = Category(name='Книги')
+        self.tech = Category(name='Электроника')
+        db.session.add_all([self.admin, self.books, self.tech])
+        db.session.flush()
+        started = datetime(2024, 1, 1)
+        for i in range(12):
+            product = Product(name=f'Ноутбук {i}' if i % 3 == 0 else f'Товар {i}', price=100.0 * (i % 5 + 1),
+                              description='Описание', in_stock=i % 4 != 0,
+                              category_id=[self.books.id, self.tech.id, None][i % 3])
+            product.created_at = started + timedelta(days=i % 6)
+            product.updated_at = started + timedelta(days=i)
+            db.session.add(product)
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.admin.id))}'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _list(self, body, mode, query='?limit=5'):
+        self.app.config['LISTING_READ_MODEL'] = mode
+        response = self.client.post(f'/api/products/get-products{query}', json=body)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.get_json()
+
+    def _listing(self, product_id):
+        db.session.expire_all()
+        return db.session.get(ProductListing, product_id)
+
+    def test_parity_with_products(self):
+        """Витрина даёт тот же ответ, что и запрос к products, включая страницы и курсоры"""
+        for body in LISTING_BODIES:
+            for query in ('?limit=5', '?limit=5&page=2', '?limit=4&pagination=cursor', '?fields=list'):
+                with self.subTest(body=body, query=query):
+                    self.assertEqual(self._list(body, 'on', query), self._list(body, 'sync', query))
+
+        # Курсор, выданный при чтении из витрины, продолжает выдачу products
+        first = self._list({'sort_by': 'price'}, 'on', '?limit=4&pagination=cursor')
+        cursor_query = f'?limit=4&cursor={first["next_cursor"]}'
+        self.assertEqual(self._list({'sort_by': 'price'}, 'on', cursor_query),
+                         self._list({'sort_by': 'price'}, 'sync', cursor_query))
+
+    def test_orm_writes_are_synced(self):
+        """Создание, изменение и удаление товара и переименование категории попадают в витрину"""
+        product = Product(name='Новый', price=10.0, category_id=self.books.id)
+        db.session.add(product)
+        db.session.commit()
+        self.assertEqual(self._listing(product.id).category_name, 'Книги')
+
+        product.price = 20.0
+        db.session.commit()
+        self.assertEqual(self._listing(product.id).price, 20.0)
+
+        self.books.name = 'Литература'
+        db.session.commit()
+        self.assertEqual(self._listing(product.id).category_name, 'Литература')
+
+        product_id = product.id
+        db.session.delete(product)
+        db.session.commit()
+        self.assertIsNone(self._listing(product_id))
+
+    def test_bulk_and_import_are_synced(self):
+        """Массовые операции и импорт в обход ORM тоже обновляют витрину"""
+        ids = [p.id for p in Product.query.filter(Product.category_id == self.tech.id)]
+        response = self.client.post('/api/products/bulk-update', headers=self.headers,
+                                    json={'ids': ids, 'set': {'in_stock': False, 'category_id': self.books.id}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({self._listing(i).category_name for i in ids}, {'Книги'})
+
+        response = self.client.post('/api/products/bulk-delete', headers=self.headers, json={'ids': ids[:2]})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(self._listing(ids[0]))
+
+        feed = json.dumps({'name': 'Импортированный', 'price': 5, 'external_id': 'ext-1'})
+        response = self.client.post('/api/products/import?format=ndjson', data=feed.encode(),
+                                    content_type='application/x-ndjson', headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(ProductListing.query.filter_by(external_id='ext-1').one().name, 'Импортированный')
+        self.assertEqual(ProductListing.query.count(), Product.query.count())
+
+    def test_rebuild_command(self):
+        """Полная и инкрементальная пересборка"""
+        self.app.config['LISTING_READ_MODEL'] = 'off'
+        product = db.session.get(Product, 1)
+        product.name = 'Изменён без витрины'
+        db.session.commit()
+        self.assertNotEqual(self._listing(1).name, 'Изменён без витрины')
+
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['products', 'rebuild-listing', '--since', product.updated_at.replace(microsecond=0).isoformat()])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(self._listing(1).name, 'Изменён без витрины')
+
+        ProductListing.query.delete()
+        db.session.commit()
+        result = runner.invoke(args=['products', 'rebuild-listing'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(ProductListing.query.count(), Product.query.count())
+
+    def test_prune_removes_deleted_products(self):
+        """Строки удалённых в обход витрины товаров чистит отдельный шаг, а не каждое обновление по since"""
+        self.app.config['LISTING_READ_MODEL'] = 'off'
+        Product.query.filter(Product.id.in_([2, 3])).delete()
+        db.session.commit()
+        refresh_listing(db.session.connection(), since=datetime(2100, 1, 1))
+        db.session.commit()
+        self.assertIsNotNone(self._listing(2))
+
+        self.assertEqual(prune_listing(db.session.connection()), 2)
+        db.session.commit()
+        self.assertIsNone(self._listing(2))
+
+        Product.query.filter(Product.id == 4).delete()
+        db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=['products', 'rebuild-listing', '--since', '2100-01-01'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('удалено строк: 1', result.output)
+        self.assertIsNone(self._listing(4))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import json
+import logging
+from app import create_app, db
+from app.models.user import User
+from app.utils import log
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class LoggingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # Подменяем вывод потока QueueListener, чтобы видеть, что дошло до записи
+        self.collected = _Collect()
+        log._state['listener'].handlers = (self.collected,)
+        self.logger = logging.getLogger('auth')
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.setLevel(logging.NOTSET)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _drain(self):
+        # stop() дожидается, пока поток вывода разберёт очередь
+        log._state['listener'].stop()
+        return self.collected.records
+
+    def test_single_queue_handler(self):
+        """Повторный create_app не размножает обработчики корневого логгера"""
+        create_app('testing')
+        handlers = [h for h in logging.getLogger().handlers if isinstance(h, log.NonBlockingQueueHandler)]
+        self.assertEqual(len(handlers), 1)
+
+    def test_password_redacted(self):
+        """Пароли и токены в аргументах и extra не попадают в лог"""
+        self.logger.warning('payload %s', {'email': 'a@b.c', 'password': 'hunter2'},
+                            extra={'refresh_token': 'abc', 'user': {'password_hash': 'x'}})
+        record = self._drain()[0]
+        self.assertNotIn('hunter2', record.getMessage())
+        self.assertIn('a@b.c', record.getMessage())
+        self.assertEqual(record.refresh_token, log.REDACTED)
+        self.assertEqual(record.user, {'password_hash': log.REDACTED})
+
+    def test_login_does_not_log_password(self):
+        """Вход не пишет пароль из тела запроса ни на каком уровне"""
+        db.session.add(User(email='test@example.com', password='s3cret-pass'))
+        db.session.commit()
+        logging.getLogger().setLevel(logging.DEBUG)
+        try:
+            self.client.post('/api/auth/login',
+                             data=json.dumps({'email': 'test@example.com', 'password': 's3cret-pass'}),
+                             content_type='application/json')
+            self.client.post('/api/auth/login',
+                             data=json.dumps({'password': 's3cret-pass'}),
+                             content_type='application/json')
+        finally:
+            logging.getLogger().setLevel(self.app.config['LOG_LEVEL'])
+        output = '\n'.join(log.JsonFormatter().format(r) for r in self._drain())
+        self.assertIn('ENTER /login', output)
+        self.assertNotIn('s3cret-pass', output)
+
+    def test_json_formatter(self):
+        """Событие выводится одной JSON-строкой с полями extra и traceback"""
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            self.logger.exception('failed %s', 42, extra={'product_id': 7})
+        line = log.JsonFormatter().format(self._drain()[0])
+        entry = json.loads(line)
+        self.assertEqual(entry['msg'], 'failed 42')
+        self.assertEqual(entry['level'], 'ERROR')
+        self.assertEqual(entry['logger'], 'auth')
+        self.assertEqual(entry['product_id'], 7)
+        self.assertIn('ValueError: boom', entry['exc'])
+
+    def test_sampling(self):
+        """Семплирование отбрасывает шумные события ниже WARNING, предупреждения проходят"""
+        sampling = log.SamplingFilter({'auth': 0})
+        log._state['handler'].addFilter(sampling)
+        for _ in range(10):
+            self.logger.info('noise')
+        logging.getLogger('auth.sub').debug('noise')
+        self.logger.warning('important')
+        records = self._drain()
+        self.assertEqual([r.getMessage() for r in records], ['important'])
+
+    def test_per_logger_levels(self):
+        """Уровни отдельных логгеров задаются в конфиге"""
+        self.assertEqual(log.parse_levels('auth=WARNING, sqlalchemy.engine=INFO'),
+                         {'auth': 'WARNING', 'sqlalchemy.engine': 'INFO'})
+        self.app.config['LOG_LEVELS'] = 'auth.tests=ERROR'
+        log.configure_logging(self.app)
+        self.assertEqual(logging.getLogger('auth.tests').level, logging.ERROR)
+        logging.getLogger('auth.tests').setLevel(logging.NOTSET)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from sqlalchemy import create_engine, text
+from app import create_app, db
+from app.config import config
+from app.models.product import Product
+from app.middleware.metrics import TimedQueuePool, registry
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add(Product(name='Ноутбук', price=1000.0))
+        db.session.commit()
+        registry.reset()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _metrics(self, **kwargs):
+        response = self.client.get('/metrics', **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        return response.data.decode()
+
+    def test_request_metrics(self):
+        """Запрос учитывается по эндпоинту и коду, вместе с числом SQL-запросов"""
+        self.client.post('/api/products/get-products', json={})
+        self.client.post('/api/products/get-products', json={'min_price': 'abc'})
+        body = self._metrics()
+
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_requests_total{blueprint="products",endpoint="products.get_products",'
+                      'method="POST",status="200"} 1', body)
+        self.assertIn('status="400"} 1', body)
+        # Список — COUNT и страница
+        self.assertIn('db_statements_per_request_bucket{endpoint="products.get_products",le="2.0"} 2', body)
+        self.assertIn('db_statements_total{endpoint="products.get_products"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{blueprint="products",'
+                      'endpoint="products.get_products",method="POST"} 2', body)
+
+    def test_unmatched_route(self):
+        """Несуществующие URL не порождают новых рядов метрик"""
+        self.client.get('/api/nope/1')
+        self.client.get('/api/nope/2')
+        self.assertIn('endpoint="unmatched",method="GET",status="404"} 2', self._metrics())
+
+    def test_token(self):
+        """METRICS_TOKEN закрывает эндпоинт"""
+        self.app.config['METRICS_TOKEN'] = 'secret'
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self._metrics(headers={'Authorization': 'Bearer secret'})
+
+    def test_token_required_in_production(self):
+        """С METRICS_REQUIRE_TOKEN эндпоинт без настроенного токена не отдаётся"""
+        self.assertTrue(config['production'].METRICS_REQUIRE_TOKEN)
+        self.app.config['METRICS_REQUIRE_TOKEN'] = True
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.app.config['METRICS_TOKEN'] = 'secret'
+        self._metrics(headers={'Authorization': 'Bearer secret'})
+
+    def test_pool_checkout_wait(self):
+        """Пул с замером записывает ожидание соединения"""
+        directory = tempfile.mkdtemp()
+        try:
+            engine = create_engine(f'sqlite:///{directory}/pool.db', poolclass=TimedQueuePool)
+            for _ in range(3):
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT 1'))
+            engine.dispose()
+        finally:
+            shutil.rmtree(directory)
+        self.assertIn('db_pool_checkout_wait_seconds_count 3', self._metrics())
+
+    def test_multiprocess_aggregation(self):
+        """Снимки других процессов суммируются, gauge умерших процессов отбрасываются, а их файлы сворачиваются"""
+        directory = tempfile.mkdtemp()
+        self.app.config['METRICS_MULTIPROC_DIR'] = directory
+        try:
+            dead_pid = 2 ** 22 + 12345
+            with open(os.path.join(directory, f'metrics-{dead_pid}-x.json'), 'w') as f:
+                json.dump({
+                    'pid': dead_pid,
+                    'counters': [['http_requests_total', [['blueprint', 'products'],
+                                                          ['endpoint', 'products.get_products'],
+                                                          ['method', 'POST'], ['status', '200']], 5]],
+                    'histograms': [],
+                    'gauges': [['password_hash_in_flight', [], 7]],
+                }, f)
+
+            self.client.post('/api/products/get-products', json={})
+            body = self._metrics()
+            self.assertIn('endpoint="products.get_products",method="POST",status="200"} 6', body)
+            self.assertNotIn('password_hash_in_flight{pid="%d"}' % dead_pid, body)
+            self.assertIn('password_hash_in_flight{pid="%d"} 0' % os.getpid(), body)
+            self.assertTrue(any(name.startswith(f'metrics-{os.getpid()}-') for name in os.listdir(directory)))
+
+            # Файл умершего процесса свёрнут в архив: суммы те же, повторный опрос не удваивает
+            self.assertNotIn(f'metrics-{dead_pid}-x.json', os.listdir(directory))
+            self.assertIn('metrics-archive.json', os.listdir(directory))
+            self.assertIn('endpoint="products.get_products",method="POST",status="200"} 6', self._metrics())
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models.product import Product, Category
+
+class PaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # Две категории и 25 товаров с повторяющимися ценами (для проверки тай-брейка по id)
+        books = Category(name='Книги')
+        shoes = Category(name='Обувь')
+        db.session.add_all([books, shoes])
+        db.session.flush()
+
+        base = datetime(2024, 1, 1)
+        for i in range(25):
+            product = Product(
+                name=f'Product {i:02d}',
+                price=float(i % 5) * 10,
+                category_id=(books.id if i % 2 else shoes.id) if i % 7 else None,
+                in_stock=bool(i % 3)
+            )
+            product.created_at = base + timedelta(hours=i % 4)
+            db.session.add(product)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _post(self, url, body):
+        response = self.client.post(url, data=json.dumps(body), content_type='application/json')
+        return response, json.loads(response.data.decode())
+
+    def _walk_cursor(self, body, limit=4):
+        ids = []
+        response, data = self._post(f'/api/products/get-products?pagination=cursor&limit={limit}', body)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('total', data)
+        ids += [p['id'] for p in data['products']]
+        while data['next_cursor']:
+            response, data = self._post(
+                f'/api/products/get-products?cursor={data["next_cursor"]}&limit={limit}', body)
+            self.assertEqual(response.status_code, 200)
+            ids += [p['id'] for p in data['products']]
+        return ids
+
+    def _offset_ids(self, body):
+        response, data = self._post('/api/products/get-products?limit=100', body)
+        self.assertEqual(response.status_code, 200)
+        return [p['id'] for p in data['products']]
+
+    def test_cursor_matches_offset_for_every_sort(self):
+        """Keyset-пагинация возвращает тот же порядок, что и обычная, для всех sort_by"""
+        for sort_by in (None, 'id', 'name', 'price', 'created_at', 'updated_at', 'category.name'):
+            for sort_order in ('asc', 'desc'):
+                body = {'sort_by': sort_by, 'sort_order': sort_order}
+                with self.subTest(sort_by=sort_by, sort_order=sort_order):
+                    ids = self._walk_cursor(body)
+                    self.assertEqual(ids, self._offset_ids(body))
+                    self.assertEqual(len(ids), len(set(ids)))
+
+    def test_cursor_with_filters_and_numeric_search(self):
+        """Курсор работает вместе с фильтрами и приоритетом числового поиска"""
+        body = {'min_price': 10, 'in_stock': True, 'sort_by': 'price', 'sort_order': 'desc'}
+        self.assertEqual(self._walk_cursor(body, limit=3), self._offset_ids(body))
+
+        body = {'search_query': '12', 'sort_by': 'name'}
+        self.assertEqual(self._walk_cursor(body, limit=1), self._offset_ids(body))
+
+    def test_cursor_total_is_opt_in(self):
+        """Общее количество считается только по запросу with_total"""
+        response, data = self._post('/api/products/get-products?pagination=cursor&with_total=true', {})
+        self.assertEqual(data['total'], 25)
+
+    def test_cursor_rejects_foreign_filters(self):
+        """Курсор, выданный для других фильтров, отклоняется с 400"""
+        _, data = self._post('/api/products/get-products?pagination=cursor&limit=2', {'sort_by': 'price'})
+        response, _ = self._post(
+            f'/api/products/get-products?cursor={data["next_cursor"]}', {'sort_by': 'name'})
+        self.assertEqual(response.status_code, 400)
+        response, _ = self._post('/api/products/get-products?cursor=garbage', {})
+        self.assertEqual(response.status_code, 400)
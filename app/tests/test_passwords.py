@@ -0,0 +1,126 @@
+import unittest
+import json
+from concurrent.futures import Future
+from unittest.mock import patch
+from werkzeug.security import generate_password_hash, check_password_hash
+from app import create_app, db, hasher
+from app.utils.passwords import HasherBusy, HasherTimeout
+from app.models.user import User
+
+
+class PasswordHashingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        user = User(email='test@example.com', password='password')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _login(self, password='password'):
+        return self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'test@example.com', 'password': password}),
+            content_type='application/json'
+        )
+
+    def test_hash_uses_configured_method(self):
+        """Хэш создаётся методом из PASSWORD_HASH_METHOD"""
+        pwhash = hasher.hash('secret')
+        self.assertTrue(pwhash.startswith('pbkdf2:sha256:1000$'))
+        self.assertTrue(hasher.verify(pwhash, 'secret'))
+        self.assertFalse(hasher.verify(pwhash, 'wrong'))
+
+    def test_needs_rehash(self):
+        """Хэш другой стоимости требует перехэширования, тот же метод — нет"""
+        self.assertFalse(hasher.needs_rehash(generate_password_hash('x', method='pbkdf2:sha256:1000')))
+        self.assertTrue(hasher.needs_rehash(generate_password_hash('x', method='pbkdf2:sha256:2000')))
+
+    def test_login_rehashes_old_hash(self):
+        """Вход с устаревшим хэшем перехэширует пароль, не отзывая токены"""
+        user = db.session.get(User, self.user_id)
+        old_hash = generate_password_hash('password', method='pbkdf2:sha256:2000')
+        db.session.execute(db.update(User).where(User.id == self.user_id).values(password_hash=old_hash))
+        db.session.commit()
+        version = user.token_version
+
+        response = self._login()
+        self.assertEqual(response.status_code, 200)
+
+        db.session.expire_all()
+        user = db.session.get(User, self.user_id)
+        self.assertTrue(user.password_hash.startswith('pbkdf2:sha256:1000$'))
+        self.assertTrue(check_password_hash(user.password_hash, 'password'))
+        self.assertEqual(user.token_version, version)
+
+    def test_register_and_login_rejected_when_queue_full(self):
+        """Переполненная очередь хэширования даёт быстрый 429 с Retry-After"""
+        self.app.config['PASSWORD_HASH_QUEUE_LIMIT'] = 0
+        rejected = hasher.stats()['rejected']
+
+        response = self._login()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+
+        response = self.client.post(
+            '/api/auth/register',
+            data=json.dumps({'email': 'new@example.com', 'password': 'password123'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIsNone(User.query.filter_by(email='new@example.com').first())
+        self.assertEqual(hasher.stats()['rejected'], rejected + 2)
+
+    def test_hash_in_process_pool(self):
+        """Хэширование в пуле процессов даёт тот же результат и учитывается в метриках"""
+        self.app.config['PASSWORD_HASH_WORKERS'] = 1
+        before = hasher.stats()
+
+        pwhash = hasher.hash('secret')
+        self.assertTrue(check_password_hash(pwhash, 'secret'))
+        self.assertTrue(hasher.verify(pwhash, 'secret'))
+
+        stats = hasher.stats()
+        self.assertEqual(stats['hash_count'], before['hash_count'] + 1)
+        self.assertEqual(stats['verify_count'], before['verify_count'] + 1)
+        self.assertGreater(stats['hash_seconds'], before['hash_seconds'])
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertGreaterEqual(stats['in_flight_peak'], 1)
+
+    def _hash_with_future(self, future):
+        # Пул, который возвращает заранее подготовленную задачу
+        executor = type('Executor', (), {'submit': lambda self, fn, *args: future})()
+        with patch.object(hasher, '_executor', return_value=executor):
+            return hasher.hash('secret')
+
+    def test_timeout_keeps_slot_until_job_finishes(self):
+        """После таймаута слот занят, пока задача в пуле не завершится; не начатая задача отменяется"""
+        self.app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE_LIMIT=1, PASSWORD_HASH_TIMEOUT=0.01)
+
+        running = Future()
+        running.set_running_or_notify_cancel()
+        with self.assertRaises(HasherTimeout):
+            self._hash_with_future(running)
+        with self.assertRaises(HasherBusy):
+            self._hash_with_future(Future())
+        running.set_result('hash')
+        self.assertEqual(hasher.stats()['in_flight'], 0)
+
+        queued = Future()
+        with self.assertRaises(HasherTimeout):
+            self._hash_with_future(queued)
+        self.assertTrue(queued.cancelled())
+        self.assertEqual(hasher.stats()['in_flight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
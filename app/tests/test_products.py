@@ -24,7 +24,8 @@ class ProductsTestCase(unittest.TestCase):
 
         # Создаем токен для админа
         with self.app.app_context():
-            self.admin_token = create_access_token(identity=self.admin.id)
+            self.admin_token = create_access_token(identity=str(self.admin.id),
+                                                   additional_claims=self.admin.token_claims())
 
     def tearDown(self):
         db.session.remove()
@@ -33,7 +34,7 @@ class ProductsTestCase(unittest.TestCase):
 
     def test_get_products(self):
         """Тест получения списка товаров"""
-        response = self.client.get('/api/products/')
+        response = self.client.post('/api/products/get-products', json={})
         data = json.loads(response.data.decode())
         self.assertEqual(response.status_code, 200)
         self.assertTrue('products' in data)
@@ -42,7 +43,7 @@ class ProductsTestCase(unittest.TestCase):
     def test_create_product(self):
         """Тест создания нового товара (только админ)"""
         response = self.client.post(
-            '/api/products/',
+            '/api/products/create',
             data=json.dumps({
                 'name': 'New Product',
                 'price': 200.0,
@@ -0,0 +1,97 @@
+import unittest
+import json
+from contextlib import contextmanager
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.user import User
+from app.models.product import Product, Category
+
+class QueryCountTestCase(unittest.TestCase):
+    """Фиксированное число SQL-запросов на запрос к API (защита от N+1)"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.admin = User(email='admin@example.com', password='adminpass', role='admin')
+        db.session.add(self.admin)
+
+        categories = [Category(name=f'Категория {i}') for i in range(5)]
+        db.session.add_all(categories)
+        db.session.flush()
+        self.category_id = categories[0].id
+
+        for i in range(30):
+            db.session.add(Product(name=f'Product {i}', price=float(i),
+                                   category_id=categories[i % 5].id))
+        db.session.commit()
+        self.product_id = Product.query.first().id
+        self.admin_token = create_access_token(identity=str(self.admin.id),
+                                               additional_claims=self.admin.token_claims())
+        db.session.remove()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @contextmanager
+    def assertQueryCount(self, expected):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        self.assertEqual(len(statements), expected, '\n\n'.join(statements))
+
+    def _post(self, url, body, **kwargs):
+        return self.client.post(url, data=json.dumps(body), content_type='application/json', **kwargs)
+
+    def test_list_does_not_load_categories_per_row(self):
+        """Список: COUNT и страница, независимо от размера страницы"""
+        for limit in (5, 30):
+            with self.assertQueryCount(2):
+                response = self._post(f'/api/products/get-products?limit={limit}', {})
+            self.assertEqual(response.status_code, 200)
+            products = json.loads(response.data.decode())['products']
+            self.assertTrue(all(p['category'] for p in products))
+
+        with self.assertQueryCount(2):
+            self._post('/api/products/get-products?limit=30', {'sort_by': 'category.name'})
+        with self.assertQueryCount(1):
+            self._post('/api/products/get-products?pagination=cursor&limit=30', {})
+
+    def test_detail_is_single_query(self):
+        """Карточка товара: один запрос вместе с категорией"""
+        with self.assertQueryCount(1):
+            response = self.client.get(f'/api/products/{self.product_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(json.loads(response.data.decode())['product']['category'])
+
+    def test_write_endpoints_reload_once(self):
+        """Создание и обновление перечитывают товар с категорией одним запросом"""
+        headers = {'Authorization': f'Bearer {self.admin_token}'}
+        # пользователь (admin_required) + категория + INSERT + перечитывание
+        with self.assertQueryCount(4):
+            response = self._post('/api/products/create',
+                                  {'name': 'New', 'price': 1, 'category': self.category_id},
+                                  headers=headers)
+        self.assertEqual(response.status_code, 201)
+
+        # роль админа проверяется по БД при каждом запросе: пользователь + товар с категорией
+        # + UPDATE + перечитывание
+        with self.assertQueryCount(4):
+            response = self.client.put(f'/api/products/{self.product_id}',
+                                       data=json.dumps({'price': 5}),
+                                       content_type='application/json', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(json.loads(response.data.decode())['product']['category'])
@@ -0,0 +1,129 @@
+import unittest
+import json
+from unittest.mock import patch
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from app import create_app, db
+from app.models.listing import ProductListing
+from app.models.product import Product
+from app.utils.search import get_search_backend, postgres_search_ready, BasicSearch, PostgresSearch
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.products = [
+            Product(name='Red Shoes', price=10.0, description='Leather'),
+            Product(name='Blue shoes', price=20.0),
+            Product(name='Hat', price=5.0, description='Goes well with shoes'),
+            Product(name='100% cotton shirt', price=15.0),
+            Product(name='Lamp', price=30.0),
+        ]
+        db.session.add_all(self.products)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _search(self, body):
+        response = self.client.post(
+            '/api/products/get-products?limit=50',
+            data=json.dumps(body),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [p['name'] for p in json.loads(response.data.decode())['products']]
+
+    def test_portable_backend_on_sqlite(self):
+        """На SQLite выбирается переносимый движок поиска"""
+        if db.engine.dialect.name == 'sqlite':
+            self.assertIsInstance(get_search_backend(), BasicSearch)
+
+    def test_relevance_ranking(self):
+        """Совпадение в начале названия выше, описание — ниже названия"""
+        self.assertEqual(self._search({'search_query': 'shoes'}),
+                         ['Red Shoes', 'Blue shoes', 'Hat'])
+        self.assertEqual(self._search({'search_query': 'blue'}), ['Blue shoes'])
+
+    def test_explicit_sort_overrides_relevance(self):
+        """Явная сортировка имеет приоритет над релевантностью"""
+        self.assertEqual(self._search({'search_query': 'shoes', 'sort_by': 'price'}),
+                         ['Hat', 'Red Shoes', 'Blue shoes'])
+
+    def test_like_wildcards_are_escaped(self):
+        """Символы % и _ в запросе ищутся буквально"""
+        self.assertEqual(self._search({'search_query': '0%'}), ['100% cotton shirt'])
+        self.assertEqual(self._search({'search_query': 'a_p'}), [])
+
+    def test_digit_query_uses_id_lookup(self):
+        """Запрос из цифр находит товар по ID и ставит его первым"""
+        lamp = self.products[4]
+        names = self._search({'search_query': str(lamp.id).zfill(2)})
+        self.assertEqual(names[0], 'Lamp')
+        names = self._search({'search_query': '100'})
+        self.assertEqual(names, ['100% cotton shirt'])
+
+    def _postgres_ready(self):
+        if db.engine.dialect.name != 'postgresql':
+            return False
+        with db.engine.connect() as connection:
+            return postgres_search_ready(connection)
+
+    def test_auto_falls_back_without_search_schema(self):
+        """auto на PostgreSQL без search_vector/pg_trgm выбирает ILIKE, с ними — Postgres-поиск"""
+        for ready, backend_cls in ((False, BasicSearch), (True, PostgresSearch)):
+            with self.subTest(ready=ready):
+                self.app.extensions.pop('search', None)
+                with patch.object(db.engine.dialect, 'name', 'postgresql'), \
+                        patch('app.utils.search.postgres_search_ready', return_value=ready):
+                    self.assertIsInstance(get_search_backend(), backend_cls)
+        self.app.extensions.pop('search', None)
+
+    def test_postgres_backend_sql(self):
+        """Условие и ранжирование Postgres-движка: tsvector своей таблицы, websearch_to_tsquery и pg_trgm"""
+        backend = PostgresSearch()
+        for source, table in ((Product, 'products'), (ProductListing, 'product_listings')):
+            with self.subTest(table=table):
+                criteria = str(backend.criteria(source, '42').compile(dialect=postgresql.dialect()))
+                self.assertIn(f'{table}.search_vector @@ websearch_to_tsquery', criteria)
+                self.assertIn(f'{table}.name %', criteria)
+                self.assertIn(f'{table}.id =', criteria)
+
+                keys = backend.sort_keys(source, '42', by_relevance=True)
+                self.assertEqual([descending for _, descending in keys], [False, True])
+                rank = str(keys[1][0].compile(dialect=postgresql.dialect()))
+                self.assertIn(f'ts_rank_cd({table}.search_vector', rank)
+                self.assertIn(f'similarity({table}.name', rank)
+
+    def test_postgres_search_on_migrated_database(self):
+        """Postgres-движок со схемой из миграции находит и ранжирует товары"""
+        if db.engine.dialect.name != 'postgresql':
+            self.skipTest('нужен PostgreSQL')
+        if not self._postgres_ready():
+            # Таблицы созданы create_all(): добавляем то, что делает миграция b7e3c1d2a4f5
+            db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            db.session.execute(text(
+                "ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED"
+            ))
+            db.session.commit()
+        self.app.extensions['search'] = PostgresSearch()
+        names = self._search({'search_query': 'shoes'})
+        self.assertEqual(set(names), {'Red Shoes', 'Blue shoes', 'Hat'})
+        self.assertEqual(names[-1], 'Hat')
+        self.assertEqual(self._search({'search_query': 'shoes', 'sort_by': 'price'}),
+                         ['Hat', 'Red Shoes', 'Blue shoes'])
+
+    def test_postgres_without_migration_still_searches(self):
+        """База из db.create_all() на PostgreSQL ищет через ILIKE, а не падает с 500"""
+        if db.engine.dialect.name != 'postgresql' or self._postgres_ready():
+            self.skipTest('нужен PostgreSQL без миграции поиска')
+        self.assertIsInstance(get_search_backend(), BasicSearch)
+        self.assertEqual(self._search({'search_query': 'blue'}), ['Blue shoes'])
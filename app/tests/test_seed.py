@@ -0,0 +1,54 @@
+import unittest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import create_app, db
+from app.models.product import Category
+from app.utils.seed import BASE_CATEGORIES, seed_categories
+
+
+class SeedCategoriesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_seed_is_idempotent(self):
+        """Повторный запуск ничего не добавляет, существующие категории не мешают"""
+        db.session.add(Category(name='Книги'))
+        db.session.commit()
+
+        self.assertEqual(seed_categories(), len(BASE_CATEGORIES) - 1)
+        self.assertEqual(seed_categories(), 0)
+        self.assertEqual(Category.query.count(), len(BASE_CATEGORIES))
+
+    def test_seed_command(self):
+        """flask seed-categories"""
+        result = self.app.test_cli_runner().invoke(args=['seed-categories'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn(str(len(BASE_CATEGORIES)), result.output)
+        self.assertEqual(Category.query.count(), len(BASE_CATEGORIES))
+
+    def test_create_app_skips_db(self):
+        """По умолчанию create_app не выполняет ни одного SQL-запроса"""
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(Engine, 'before_cursor_execute', count_statement)
+        try:
+            app = create_app('testing')
+        finally:
+            event.remove(Engine, 'before_cursor_execute', count_statement)
+        self.assertEqual(statements, [])
+        self.assertGreater(app.extensions['startup_seconds'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import runpy
+from unittest import mock
+from app import create_app, db
+from app.utils.db_routing import dispose_engines
+
+GUNICORN_CONF = os.path.join(os.path.dirname(__file__), '..', '..', 'gunicorn.conf.py')
+
+
+class ServerConfigTestCase(unittest.TestCase):
+    """Размеры воркеров gunicorn и сброс пулов после fork"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conf = runpy.run_path(GUNICORN_CONF)
+
+    def test_worker_sizing(self):
+        """Воркеры — от CPU, потоки и гринлеты — от пула, общий лимит соединений соблюдается"""
+        sizing = self.conf['worker_sizing']
+        self.assertEqual(sizing('sync', 4, 5, 10), (9, 1, None))
+        self.assertEqual(sizing('gthread', 4, 5, 10), (4, 5, None))
+        self.assertEqual(sizing('gevent', 4, 5, 10), (4, 1, 15))
+        # 4 воркера по 15 соединений не помещаются в 40
+        self.assertEqual(sizing('gthread', 4, 5, 10, max_connections=40), (2, 5, None))
+        self.assertEqual(sizing('sync', 1, 5, 10, max_connections=5), (1, 1, None))
+
+    def test_config_module(self):
+        """Модуль конфигурации задаёт точку входа и preload"""
+        self.assertEqual(self.conf['wsgi_app'], 'wsgi:app')
+        self.assertTrue(self.conf['preload_app'])
+        self.assertIn(self.conf['worker_class'], ('sync', 'gthread', 'gevent'))
+
+    def test_gevent_fallback_is_logged(self):
+        """Без gevent выбирается gthread, и это попадает в лог gunicorn"""
+        with mock.patch('importlib.util.find_spec', return_value=None), \
+                self.assertLogs('gunicorn.error', 'WARNING') as logs:
+            self.assertEqual(self.conf['_worker_class']('gevent'), 'gthread')
+        self.assertIn('gevent не установлен', logs.output[0])
+
+    def test_dispose_engines(self):
+        """После сброса движок работает с новым пулом"""
+        app = create_app('testing')
+        with app.app_context():
+            pool = db.engine.pool
+            dispose_engines(app, close=False)
+            self.assertIsNot(db.engine.pool, pool)
+            self.assertEqual(db.session.execute(db.text('SELECT 1')).scalar(), 1)
+            db.session.remove()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import os
+import shutil
+import tempfile
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.product import Product, Category
+from app.models.user import User
+from app.utils.slow_queries import SlowQueryStore, normalize_statement, redact_parameters, slow_query_store
+
+
+class SlowQueryLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        # Порог 0 — в журнал попадает каждый запрос
+        self.app.config['SLOW_QUERY_ENABLED'] = True
+        self.app.config['SLOW_QUERY_THRESHOLD_MS'] = 0
+        self.app.config['SLOW_QUERY_PATH'] = os.path.join(self.tmpdir, 'slow.sqlite3')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        category = Category(name='Электроника')
+        db.session.add(category)
+        db.session.flush()
+        db.session.add(Product(name='Ноутбук', price=1000.0, category_id=category.id))
+        self.admin = User(email='admin@example.com', password='secret', username='admin', role='admin')
+        self.buyer = User(email='buyer@example.com', password='secret', username='buyer')
+        db.session.add_all([self.admin, self.buyer])
+        db.session.commit()
+        self.category_id = category.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _headers(self, user):
+        token = create_access_token(identity=str(user.id), additional_claims=user.token_claims())
+        return {'Authorization': f'Bearer {token}'}
+
+    def test_captures_filters_and_plan(self):
+        """Медленный запрос записывается с эндпоинтом, фильтром и планом"""
+        response = self.client.post('/api/products/get-products',
+                                    json={'category_id': self.category_id, 'min_price': 10})
+        self.assertEqual(response.status_code, 200)
+
+        entries = slow_query_store().top(limit=50, endpoint='products.get_products')
+        self.assertTrue(entries)
+        sample = entries[0]['sample']
+        self.assertEqual(sample['endpoint'], 'products.get_products')
+        self.assertEqual(sample['filters']['category_id'], self.category_id)
+        self.assertTrue(sample['explain'])
+        self.assertNotIn('EXPLAIN failed', sample['explain'])
+
+    def test_parameters_redacted(self):
+        """Email и пароль не попадают в журнал"""
+        response = self.client.post('/api/auth/login',
+                                    json={'email': 'buyer@example.com', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+
+        entries = slow_query_store().top(limit=50, endpoint='auth.login')
+        params = [entry['sample']['parameters'] for entry in entries]
+        self.assertTrue(any(p and '***' in p.values() for p in params))
+        for p in params:
+            self.assertNotIn('buyer@example.com', (p or {}).values())
+
+    def test_admin_endpoint(self):
+        """Топ по суммарному времени доступен только администратору"""
+        for _ in range(3):
+            self.client.post('/api/products/get-products', json={})
+
+        response = self.client.get('/api/admin/slow-queries', headers=self._headers(self.admin))
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertTrue(data['enabled'])
+        totals = [q['total_ms'] for q in data['queries']]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+
+        forbidden = self.client.get('/api/admin/slow-queries', headers=self._headers(self.buyer))
+        self.assertEqual(forbidden.status_code, 403)
+        bad_sort = self.client.get('/api/admin/slow-queries?sort=name', headers=self._headers(self.admin))
+        self.assertEqual(bad_sort.status_code, 400)
+
+        cleared = self.client.delete('/api/admin/slow-queries', headers=self._headers(self.admin))
+        self.assertEqual(cleared.status_code, 200)
+        self.assertEqual(slow_query_store().top(), [])
+
+    def test_disabled_by_default(self):
+        """Без SLOW_QUERY_ENABLED ничего не пишется"""
+        self.app.config['SLOW_QUERY_ENABLED'] = False
+        self.client.post('/api/products/get-products', json={})
+        self.assertEqual(slow_query_store().top(), [])
+
+    def test_rotation(self):
+        """Журнал хранит не больше SLOW_QUERY_MAX_ENTRIES записей"""
+        store = SlowQueryStore(os.path.join(self.tmpdir, 'rotate.sqlite3'), max_entries=10)
+        for i in range(30):
+            store.add({'logged_at': i, 'fingerprint': f'f{i}', 'endpoint': 'e', 'method': 'GET', 'path': '/',
+                       'statement': 'SELECT 1', 'parameters': {}, 'filters': None,
+                       'duration_ms': 1.0, 'explain': None})
+        store.rotate()
+        self.assertEqual(len(store.top(limit=100)), 10)
+
+    def test_normalize_statement(self):
+        """IN-списки разной длины дают один отпечаток"""
+        self.assertEqual(normalize_statement('SELECT * FROM p WHERE id IN (?, ?, ?)'),
+                         normalize_statement('SELECT *  FROM p\n WHERE id IN (?)'))
+        self.assertEqual(redact_parameters({'password_hash': 'x', 'limit': 5}), {'password_hash': '***', 'limit': 5})
+
+
+if __name__ == '__main__':
+    unittest.main()
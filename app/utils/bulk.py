@@ -0,0 +1,156 @@
+from sqlalchemy import case, cast, delete, func, select, update, Numeric
+from .. import db
+from ..models.product import Product, Category
+from .cache import mark_catalog_changed
+from .filters import FilterError, filter_criteria, normalize_filters
+from .listing import listing_sync_enabled, refresh_listing
+
+# Поля, которые можно менять массово
+BULK_FIELDS = ('name', 'price', 'description', 'image_url', 'category_id', 'in_stock')
+
+
+class BulkError(ValueError):
+    """Некорректное тело массовой операции (отдаётся клиенту как 400)."""
+
+
+def selection_criteria(data):
+    """Условия WHERE для выборки товаров: список ids или фильтр get-products."""
+    ids = data.get('ids')
+    filter_data = data.get('filter')
+
+    if ids:
+        if not isinstance(ids, list):
+            raise BulkError('ids должен быть списком целых чисел')
+        try:
+            return [Product.id.in_([int(value) for value in ids])]
+        except (TypeError, ValueError):
+            raise BulkError('ids должен быть списком целых чисел')
+
+    if filter_data and isinstance(filter_data, dict):
+        try:
+            criteria = filter_criteria(normalize_filters(filter_data))
+        except FilterError as e:
+            raise BulkError(str(e))
+        if criteria:
+            return criteria
+
+    # Пустой фильтр затронул бы весь каталог — такое требуем делать явно по ids
+    raise BulkError('Укажите непустой список ids или фильтр filter')
+
+
+def _price_adjustment(adjust):
+    if not isinstance(adjust, dict) or len(adjust) != 1:
+        raise BulkError('price_adjust должен содержать ровно одно поле: percent или delta')
+    (kind, value), = adjust.items()
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise BulkError(f'Некорректное значение price_adjust.{kind}')
+
+    if kind == 'percent':
+        # round(double precision, int) в Postgres нет — округляем через numeric
+        price = func.round(cast(Product.price * (1 + value / 100), Numeric), 2)
+    elif kind == 'delta':
+        price = Product.price + value
+    else:
+        raise BulkError('price_adjust поддерживает только percent или delta')
+    # Цена не уходит в минус
+    return case((price < 0, 0), else_=price)
+
+
+def _field_value(field, value):
+    # Те же правила, что у строк импорта: ошибка типа или длины — 400, а не 500 из БД
+    if field == 'price':
+        if isinstance(value, bool):
+            raise BulkError('Некорректная цена')
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise BulkError('Некорректная цена')
+        if value < 0:
+            raise BulkError('Цена не может быть отрицательной')
+    elif field == 'in_stock':
+        if not isinstance(value, bool):
+            raise BulkError('in_stock должен быть true или false')
+    elif field == 'category_id':
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+            raise BulkError('category_id должен быть целым числом или null')
+    elif field == 'name':
+        if not isinstance(value, str) or not value.strip():
+            raise BulkError('Название не может быть пустым')
+        value = value.strip()
+        if len(value) > 100:
+            raise BulkError('Поле name длиннее 100 символов')
+    elif value is not None:
+        # description и image_url
+        if not isinstance(value, str):
+            raise BulkError(f'Поле {field} должно быть строкой или null')
+        max_length = Product.__table__.c[field].type.length
+        if max_length and len(value) > max_length:
+            raise BulkError(f'Поле {field} длиннее {max_length} символов')
+    return value
+
+
+def _update_values(data):
+    values = {}
+    patch = data.get('set') or {}
+    if not isinstance(patch, dict):
+        raise BulkError('set должен быть объектом')
+
+    unknown = set(patch) - set(BULK_FIELDS)
+    if unknown:
+        raise BulkError(f'Эти поля нельзя менять массово: {", ".join(sorted(unknown))}')
+
+    for field, value in patch.items():
+        values[field] = _field_value(field, value)
+
+    if values.get('category_id') is not None and db.session.get(Category, values['category_id']) is None:
+        raise BulkError('Указанная категория не найдена')
+
+    if data.get('price_adjust') is not None:
+        if 'price' in values:
+            raise BulkError('Нельзя одновременно задать price и price_adjust')
+        values['price'] = _price_adjustment(data['price_adjust'])
+
+    if not values:
+        raise BulkError('Нечего обновлять: укажите set или price_adjust')
+    return values
+
+
+def _selected_ids(criteria):
+    # Витрине нужны id выборки до записи: после UPDATE фильтр может уже не совпадать
+    if not listing_sync_enabled():
+        return None
+    return db.session.scalars(select(Product.id).where(*criteria)).all()
+
+
+def _sync_listing(ids):
+    if ids:
+        refresh_listing(db.session.connection(), ids=ids)
+
+
+def bulk_update(data):
+    """Один UPDATE ... WHERE по выборке; возвращает число изменённых строк."""
+    criteria = selection_criteria(data)
+    values = _update_values(data)
+    ids = _selected_ids(criteria)
+    result = db.session.execute(
+        update(Product).where(*criteria).values(**values),
+        execution_options={'synchronize_session': False}
+    )
+    mark_catalog_changed(db.session)
+    _sync_listing(ids)
+    return result.rowcount
+
+
+def bulk_delete(data):
+    """Один DELETE ... WHERE по выборке; возвращает число удалённых строк."""
+    criteria = selection_criteria(data)
+    ids = _selected_ids(criteria)
+    result = db.session.execute(
+        delete(Product).where(*criteria),
+        execution_options={'synchronize_session': False}
+    )
+    mark_catalog_changed(db.session)
+    _sync_listing(ids)
+    return result.rowcount
@@ -0,0 +1,309 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.utils import import_string
+from .db_routing import read_from_replica
+
+# Какие счётчики версий сдвигаются при изменении строк таблицы
+VERSIONED_TABLES = {
+    'products': ('catalog',),
+    'categories': ('catalog', 'categories'),
+}
+
+
+class NullBackend:
+    """Отключённый кэш: ничего не хранит."""
+
+    def __init__(self, **options):
+        self._counters = {}
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    def incr(self, name):
+        self._counters[name] = self._counters.get(name, 0) + 1
+        return self._counters[name]
+
+
+class MemoryBackend:
+    """LRU-кэш с TTL в памяти процесса (по умолчанию).
+
+    Записи локальны для процесса. Счётчики версий с shared_versions хранятся
+    в файле path (таблица counters, как у SQLiteBackend), поэтому изменение
+    каталога в одном воркере сразу инвалидирует записи всех воркеров хоста;
+    без него счётчики тоже локальны.
+    """
+
+    def __init__(self, max_entries=2048, ttl=60, path=None, shared_versions=False, **options):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._counters = {}
+        self._versions = SQLiteBackend(path) if path and shared_versions else None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def counter(self, name):
+        if self._versions is not None:
+            return self._versions.counter(name)
+        return self._counters.get(name, 0)
+
+    def incr(self, name):
+        if self._versions is not None:
+            return self._versions.incr(name)
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+
+class SQLiteBackend:
+    """Общий для всех воркеров одного хоста кэш в локальном файле SQLite.
+
+    Значения хранятся в JSON. При переполнении вытесняются самые старые записи,
+    просроченные удаляются при чтении и при вытеснении. Счётчики версий общие,
+    поэтому изменение каталога сразу видно всем воркерам.
+    """
+
+    def __init__(self, path, max_entries=2048, ttl=60, **options):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # Соединение на поток и на процесс (после fork создаётся заново)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS entries '
+                         '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, stored_at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_entries_stored_at ON entries (stored_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at and expires_at < time.time():
+            self.delete(key)
+            return None
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        conn = self._connection()
+        conn.execute('INSERT OR REPLACE INTO entries (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)',
+                     (key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else None, now))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?', (now,))
+        conn.execute('DELETE FROM entries WHERE key IN '
+                     '(SELECT key FROM entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+                     (self.max_entries,))
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM entries')
+
+    def counter(self, name):
+        row = self._connection().execute('SELECT value FROM counters WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, name):
+        conn = self._connection()
+        conn.execute('INSERT INTO counters (name, value) VALUES (?, 1) '
+                     'ON CONFLICT(name) DO UPDATE SET value = value + 1', (name,))
+        return self.counter(name)
+
+
+CACHE_BACKENDS = {
+    'null': NullBackend,
+    'memory': MemoryBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def cache_key_digest(*parts):
+    """Стабильный хэш произвольных JSON-совместимых частей ключа."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Кэш результатов запросов к каталогу с инвалидацией по версии.
+
+    Ключ включает текущее значение счётчика версии ('catalog', 'categories'),
+    который увеличивается после commit, изменившего товары или категории,
+    поэтому старые записи просто перестают находиться и вытесняются LRU/TTL.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESULT_CACHE_BACKEND', 'memory')
+        app.config.setdefault('RESULT_CACHE_TTL', 60)
+        app.config.setdefault('RESULT_CACHE_MAX_ENTRIES', 2048)
+        app.config.setdefault('RESULT_CACHE_SHARED_VERSIONS', True)
+        if not app.config.get('RESULT_CACHE_PATH'):
+            app.config['RESULT_CACHE_PATH'] = os.path.join(app.instance_path, 'result-cache.sqlite3')
+        app.extensions['result_cache'] = {'cache': self, 'backend': None, 'versions_seen': {}}
+
+        if not event.contains(Session, 'after_flush', _track_catalog_changes):
+            event.listen(Session, 'after_flush', _track_catalog_changes)
+            event.listen(Session, 'after_commit', _bump_catalog_versions)
+            event.listen(Session, 'after_rollback', _discard_catalog_changes)
+
+    @property
+    def backend(self):
+        # Бэкенд создаётся лениво: конфиг можно поменять после create_app, а
+        # файловые соединения открываются уже в воркере, после fork
+        state = current_app.extensions['result_cache']
+        if state['backend'] is None:
+            config = current_app.config
+            name = config['RESULT_CACHE_BACKEND']
+            backend_cls = CACHE_BACKENDS[name] if name in CACHE_BACKENDS else import_string(name)
+            options = {}
+            if name == 'memory':
+                options['shared_versions'] = config['RESULT_CACHE_SHARED_VERSIONS']
+            if name == 'sqlite' or options.get('shared_versions'):
+                os.makedirs(os.path.dirname(config['RESULT_CACHE_PATH']) or '.', exist_ok=True)
+            state['backend'] = backend_cls(
+                path=config['RESULT_CACHE_PATH'],
+                max_entries=config['RESULT_CACHE_MAX_ENTRIES'],
+                ttl=config['RESULT_CACHE_TTL'],
+                **options
+            )
+        return state['backend']
+
+    @property
+    def enabled(self):
+        return not isinstance(self.backend, NullBackend)
+
+    def version(self, name='catalog'):
+        value = self.backend.counter(f'version:{name}')
+        # Когда процесс впервые увидел это значение версии: не раньше самого изменения,
+        # в том числе сделанного другим воркером (см. set)
+        seen = current_app.extensions['result_cache']['versions_seen']
+        if seen.get(name, (None,))[0] != value:
+            seen[name] = (value, time.monotonic())
+        return value
+
+    def _replica_may_lag(self):
+        # Реплика отстаёт не дольше DB_REPLICA_STICKY_SECONDS: прочитанное с неё сразу
+        # после изменения каталога может быть старой строкой под новой версией ключа
+        window = current_app.config.get('DB_REPLICA_STICKY_SECONDS', 0)
+        seen = current_app.extensions['result_cache']['versions_seen'].values()
+        return any(time.monotonic() - seen_at < window for _, seen_at in seen)
+
+    def bump(self, name='catalog'):
+        return self.backend.incr(f'version:{name}')
+
+    def make_key(self, namespace, *parts, version='catalog'):
+        return f'{namespace}:{self.version(version)}:{cache_key_digest(*parts)}'
+
+    def make_keys(self, namespace, values, version='catalog'):
+        """Ключи make_key(namespace, value) для многих значений при одном чтении версии."""
+        current = self.version(version)
+        return {value: f'{namespace}:{current}:{cache_key_digest(value)}' for value in values}
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None):
+        if read_from_replica() and self._replica_may_lag():
+            return
+        self.backend.set(key, value, ttl)
+
+
+def mark_catalog_changed(session, *tables):
+    """Помечает изменение каталога в обход ORM (bulk UPDATE/INSERT через Core).
+
+    Версии будут сдвинуты после commit этой сессии.
+    """
+    changed = session.info.setdefault('catalog_changed', set())
+    for table in tables or ('products',):
+        changed.update(VERSIONED_TABLES[table])
+
+
+def _track_catalog_changes(session, flush_context):
+    changed = session.info.setdefault('catalog_changed', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        names = VERSIONED_TABLES.get(getattr(obj, '__tablename__', None))
+        if names and (obj not in session.dirty or session.is_modified(obj)):
+            changed.update(names)
+
+
+def _bump_catalog_versions(session):
+    changed = session.info.pop('catalog_changed', None)
+    if not changed or not has_app_context() or 'result_cache' not in current_app.extensions:
+        return
+    cache = current_app.extensions['result_cache']['cache']
+    for name in sorted(changed):
+        cache.bump(name)
+
+
+def _discard_catalog_changes(session):
+    session.info.pop('catalog_changed', None)
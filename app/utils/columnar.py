@@ -0,0 +1,379 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, select
+from .. import db, cache
+from ..models.product import Product, Category
+from ..models.listing import ProductListing
+from .fields import product_load_options
+from .listing import listing_load_options, listing_reads_enabled
+from .pagination import decode_cursor, encode_cursor
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy необязателен
+    np = None
+
+logger = logging.getLogger('columnar')
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Колонки products, которые держит колоночный каталог
+_COLUMNS = ('id', 'name', 'price', 'category_id', 'in_stock', 'created_at', 'updated_at')
+
+# Сортировки по тексту: порядок строк Python совпадает с BINARY-сравнением SQLite,
+# но не с локалью Postgres — там такие сортировки остаются за SQL
+_TEXT_SORTS = ('name', 'category.name')
+
+
+def columnar_enabled():
+    return bool(current_app.config.get('COLUMNAR_CATALOG')) and np is not None
+
+
+def _micros(value):
+    # Наивный datetime -> микросекунды от эпохи (так хранятся даты в массивах)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _datetime(micros):
+    return _EPOCH + timedelta(microseconds=int(micros))
+
+
+class CatalogSnapshot:
+    """Неизменяемый снимок каталога: по массиву на колонку, строки упорядочены по id.
+
+    Перестановки под сортировки считаются лениво и живут, пока жив снимок;
+    обновление каталога создаёт новый снимок, а запросы дочитывают старый.
+    """
+
+    def __init__(self, columns, categories):
+        self.ids = columns['id']
+        self.names = columns['name']
+        self.prices = columns['price']
+        self.category_ids = columns['category_id']
+        self.in_stock = columns['in_stock']
+        self.created_at = columns['created_at']
+        self.updated_at = columns['updated_at']
+        self.categories = categories
+
+        # Имя категории для сортировки по category.name; товары без категории
+        # (или с удалённой категорией) отсекаются маской, как inner join в SQL
+        category_ids = np.array(sorted(categories), dtype=np.int64)
+        labels = np.array([categories[i] for i in category_ids.tolist()] + [''], dtype=object)
+        position = np.searchsorted(category_ids, self.category_ids)
+        self.has_category = np.zeros(len(self.ids), dtype=bool)
+        if len(category_ids):
+            found = position < len(category_ids)
+            found[found] = category_ids[position[found]] == self.category_ids[found]
+            self.has_category = found
+        self.category_names = labels[np.where(self.has_category, position, len(category_ids))]
+
+        self.watermark = _datetime(self.updated_at.max()) if len(self.ids) else None
+        self._orders = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows, categories):
+        return cls(_rows_to_columns(rows), categories)
+
+    def columns(self):
+        return {
+            'id': self.ids, 'name': self.names, 'price': self.prices, 'category_id': self.category_ids,
+            'in_stock': self.in_stock, 'created_at': self.created_at, 'updated_at': self.updated_at,
+        }
+
+    def merge(self, rows, categories, live_count, live_ids):
+        """Снимок с применёнными изменениями; self, если ничего не поменялось.
+
+        rows — строки, изменённые с последнего обновления (возможно, уже известные),
+        live_count — число товаров в базе; при расхождении live_ids() отдаёт id
+        существующих товаров, и удалённые убираются из снимка.
+        """
+        columns = self.columns()
+        changed = categories != self.categories
+
+        if rows:
+            delta = _rows_to_columns(rows)
+            position = np.searchsorted(self.ids, delta['id'])
+            known = position < len(self.ids)
+            known[known] = self.ids[position[known]] == delta['id'][known]
+
+            same = known.copy()
+            for name, values in delta.items():
+                same[known] &= columns[name][position[known]] == values[known]
+            if not same.all():
+                changed = True
+                columns = {name: values.copy() for name, values in columns.items()}
+                for name, values in delta.items():
+                    columns[name][position[known]] = values[known]
+                if not known.all():
+                    columns = {name: np.concatenate((columns[name], delta[name][~known])) for name in columns}
+                    order = np.argsort(columns['id'], kind='stable')
+                    columns = {name: values[order] for name, values in columns.items()}
+
+        if len(columns['id']) != live_count:
+            keep = np.isin(columns['id'], np.fromiter(live_ids(), dtype=np.int64))
+            if not keep.all():
+                changed = True
+                columns = {name: values[keep] for name, values in columns.items()}
+
+        return CatalogSnapshot(columns, categories) if changed else self
+
+    def _order(self, sort_by, descending):
+        # Перестановка всех строк под сортировку; id в массивах возрастает, поэтому
+        # устойчивая сортировка сама разрешает равенства по id, а обратный порядок
+        # ключа с id по убыванию — это просто развёрнутая перестановка
+        key = (sort_by, descending)
+        if key not in self._orders:
+            if sort_by is None or sort_by == 'id':
+                order = np.arange(len(self.ids))
+            else:
+                order = np.argsort(self._sort_values(sort_by), kind='stable')
+            self._orders[key] = order[::-1] if descending and sort_by else order
+        return self._orders[key]
+
+    def _sort_values(self, sort_by):
+        return {
+            'id': self.ids,
+            'name': self.names,
+            'price': self.prices,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'category.name': self.category_names,
+        }[sort_by]
+
+    def mask(self, filters):
+        """Булева маска строк под фильтр get-products (без search_query)."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        if filters['min_price'] is not None:
+            mask &= self.prices >= filters['min_price']
+        if filters['max_price'] is not None:
+            mask &= self.prices <= filters['max_price']
+        if filters['category_id'] is not None:
+            mask &= self.category_ids == filters['category_id']
+        if filters['in_stock'] is not None:
+            mask &= self.in_stock == int(filters['in_stock'])
+        if filters['created_from'] is not None:
+            mask &= self.created_at >= _micros(datetime.fromisoformat(filters['created_from']))
+        if filters['created_to'] is not None:
+            mask &= self.created_at <= _micros(datetime.fromisoformat(filters['created_to']))
+        if filters['sort_by'] == 'category.name':
+            mask &= self.has_category
+        return mask
+
+    def _after(self, filters, values):
+        # Строки строго после значений курсора: (ключ, id) > (v, vid) с учётом направления
+        sort_by = filters['sort_by']
+        last_id = values[-1]
+        if not isinstance(last_id, int) or isinstance(last_id, bool):
+            raise TypeError('id в курсоре должен быть целым')
+        if sort_by is None:
+            return self.ids > last_id
+
+        descending = filters['sort_order'] == 'desc'
+        column = self._sort_values(sort_by)
+        value = values[0]
+        if sort_by in ('created_at', 'updated_at'):
+            if not isinstance(value, datetime) or value.tzinfo is not None:
+                raise TypeError('Дата в курсоре должна быть наивным datetime')
+            value = _micros(value)
+        elif sort_by in _TEXT_SORTS and not isinstance(value, str):
+            raise TypeError('Имя в курсоре должно быть строкой')
+        elif sort_by in ('id', 'price') and (not isinstance(value, (int, float)) or isinstance(value, bool)):
+            raise TypeError('Число в курсоре должно быть числом')
+
+        if descending:
+            return (column < value) | ((column == value) & (self.ids < last_id))
+        return (column > value) | ((column == value) & (self.ids > last_id))
+
+    def cursor_values(self, filters, row):
+        """Значения ключей сортировки строки — те же, что кладёт в курсор paginate_keyset."""
+        sort_by = filters['sort_by']
+        values = [int(self.ids[row])]
+        if sort_by in ('created_at', 'updated_at'):
+            values.insert(0, _datetime(self._sort_values(sort_by)[row]))
+        elif sort_by in _TEXT_SORTS:
+            values.insert(0, self._sort_values(sort_by)[row])
+        elif sort_by == 'price':
+            values.insert(0, float(self.prices[row]))
+        elif sort_by == 'id':
+            values.insert(0, int(self.ids[row]))
+        return values
+
+    def select(self, filters, after=None):
+        """Индексы строк под фильтр в порядке сортировки и их общее число (без курсора)."""
+        mask = self.mask(filters)
+        total = int(np.count_nonzero(mask))
+        if after is not None:
+            mask &= self._after(filters, after)
+        order = self._order(filters['sort_by'], filters['sort_order'] == 'desc')
+        return order[mask[order]], total
+
+
+def _rows_to_columns(rows):
+    ids, names, prices, category_ids, in_stock, created_at, updated_at = zip(*rows) if rows else ((),) * 7
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'name': np.array(names, dtype=object),
+        'price': np.array(prices, dtype=np.float64),
+        # NULL: категории нет (-1, id категорий положительные), наличие неизвестно (-1)
+        'category_id': np.array([-1 if value is None else value for value in category_ids], dtype=np.int64),
+        'in_stock': np.array([-1 if value is None else int(value) for value in in_stock], dtype=np.int8),
+        'created_at': np.array([_micros(value) for value in created_at], dtype=np.int64),
+        'updated_at': np.array([_micros(value) for value in updated_at], dtype=np.int64),
+    }
+
+
+def _product_rows(since=None):
+    products = Product.__table__
+    query = select(*[products.c[name] for name in _COLUMNS])
+    if since is not None:
+        query = query.where(products.c.updated_at >= since)
+    return db.session.execute(query.order_by(products.c.id)).all()
+
+
+def _categories():
+    return dict(db.session.execute(select(Category.id, Category.name)).all())
+
+
+class ColumnarCatalog:
+    """Каталог товаров в массивах NumPy, свой в каждом процессе (COLUMNAR_CATALOG).
+
+    Первый запрос загружает products целиком, дальше снимок догружает строки
+    с updated_at не раньше последнего известного минус COLUMNAR_REFRESH_LAG
+    (запас на транзакции, закоммиченные позже своего updated_at). Удаления
+    замечаются по числу строк, переименования — по справочнику категорий.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._version = None
+
+    def _stale(self, config):
+        if self.snapshot is None:
+            return True
+        # Изменения каталога в этом процессе видны сразу, чужие — не позже чем через интервал
+        return (self._version != cache.version()
+                or time.monotonic() - self._checked_at >= config['COLUMNAR_REFRESH_INTERVAL'])
+
+    def current(self):
+        """Актуальный снимок; пока другой поток его обновляет, отдаётся предыдущий."""
+        config = current_app.config
+        if not self._stale(config):
+            return self.snapshot
+        if not self._lock.acquire(blocking=self.snapshot is None):
+            return self.snapshot
+        try:
+            if self._stale(config):
+                self.refresh(config['COLUMNAR_REFRESH_LAG'])
+            return self.snapshot
+        finally:
+            self._lock.release()
+
+    def refresh(self, lag=0):
+        started = time.perf_counter()
+        version = cache.version()
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.watermark is None:
+            snapshot = CatalogSnapshot.from_rows(_product_rows(), _categories())
+            logger.info("Columnar catalog loaded: %d products in %.1f ms",
+                        len(snapshot), (time.perf_counter() - started) * 1000)
+        else:
+            rows = _product_rows(since=snapshot.watermark - timedelta(seconds=lag))
+            live_count = db.session.scalar(select(func.count()).select_from(Product.__table__))
+            snapshot = snapshot.merge(
+                rows, _categories(), live_count,
+                lambda: db.session.scalars(select(Product.id)).all()
+            )
+        self.snapshot = snapshot
+        self._version = version
+        self._checked_at = time.monotonic()
+        return snapshot
+
+
+def columnar_catalog():
+    """Колоночный каталог текущего процесса (после fork воркер строит свой)."""
+    state = current_app.extensions.setdefault('columnar_catalog', {})
+    if state.get('pid') != os.getpid():
+        state.update(pid=os.getpid(), catalog=ColumnarCatalog())
+    return state['catalog']
+
+
+def columnar_supported(filters):
+    """Может ли колоночный каталог ответить на фильтр так же, как SQL."""
+    if filters['search_query']:
+        # Поиск (ILIKE, полнотекстовый) и его ранжирование остаются за базой
+        return False
+    category_id = filters['category_id']
+    if category_id is not None and (not isinstance(category_id, int) or isinstance(category_id, bool)
+                                    or abs(category_id) >= 2 ** 63):
+        return False
+    for key in ('created_from', 'created_to'):
+        if filters[key] is not None and datetime.fromisoformat(filters[key]).tzinfo is not None:
+            return False
+    if filters['sort_by'] in _TEXT_SORTS and db.engine.dialect.name != 'sqlite':
+        return False
+    return True
+
+
+def _load_rows(ids, fields):
+    # Тела строк страницы — одним запросом по первичному ключу, в порядке ids
+    if not ids:
+        return []
+    if listing_reads_enabled():
+        model, options = ProductListing, listing_load_options(fields)
+    else:
+        model, options = Product, product_load_options(fields)
+    found = {row.id: row for row in model.query.options(*options).filter(model.id.in_(ids))}
+    return [found[row_id] for row_id in ids if row_id in found]
+
+
+def columnar_products(filters, page, limit, cursor_mode, cursor, with_total, fields):
+    """Ответ get-products из колоночного каталога или None, если он не применим.
+
+    Фильтр, сортировка, подсчёт и выбор страницы считаются по массивам;
+    из базы читаются только строки самой страницы.
+    """
+    if not columnar_enabled() or not columnar_supported(filters):
+        return None
+    snapshot = columnar_catalog().current()
+
+    if cursor_mode:
+        after = decode_cursor(cursor, filters, [None] * (2 if filters['sort_by'] else 1)) if cursor else None
+        try:
+            rows, total = snapshot.select(filters, after)
+        except TypeError:
+            # Значения курсора не того типа — пусть сравнивает база, как и раньше
+            return None
+        page_rows = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(filters, snapshot.cursor_values(filters, page_rows[-1]))
+        result = {
+            'products': [row.to_dict(fields) for row in _load_rows(snapshot.ids[page_rows].tolist(), fields)],
+            'next_cursor': next_cursor,
+            'limit': limit
+        }
+        if with_total:
+            result['total'] = total
+        return result
+
+    rows, total = snapshot.select(filters)
+    max_pages = (total + limit - 1) // limit
+    page = max(page, 1)
+    if max_pages > 0 and page > max_pages:
+        page = max_pages
+    page_rows = rows[(page - 1) * limit:page * limit]
+    return {
+        'products': [row.to_dict(fields) for row in _load_rows(snapshot.ids[page_rows].tolist(), fields)],
+        'total': total,
+        'pages': max_pages,
+        'current_page': page
+    }
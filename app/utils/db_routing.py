@@ -0,0 +1,158 @@
+import random
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+STICKY_COOKIE = 'db_primary_until'
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config, uri, overrides=None):
+    """Параметры create_engine для базы по адресу uri из DB_* конфига.
+
+    overrides (явно заданные SQLALCHEMY_ENGINE_OPTIONS) имеют приоритет.
+    """
+    url = make_url(uri)
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+    # In-memory SQLite всегда на StaticPool: размеров очереди у него нет
+    if not _is_memory_sqlite(url):
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+        )
+    timeout = config['DB_STATEMENT_TIMEOUT_MS']
+    if timeout and url.get_backend_name() == 'postgresql':
+        options['connect_args'] = {'options': f'-c statement_timeout={int(timeout)}'}
+
+    options.update(overrides or {})
+    return options
+
+
+def read_only(fn):
+    """Эндпоинт только читает: его запросы можно отправить на реплику."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def _sticky():
+    # Клиент недавно писал: читаем с основной базы, пока реплика догоняет
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _replica_engine():
+    if not has_request_context() or not g.get('db_read_only') or g.get('db_wrote'):
+        return None
+    replicas = current_app.extensions['db_routing']['replicas']
+    if not replicas or _sticky():
+        return None
+    # Одна реплика на весь запрос: все его чтения видят один снимок
+    if 'db_replica' not in g:
+        g.db_replica = random.randrange(len(replicas))
+    return replicas[g.db_replica]
+
+
+def read_from_replica():
+    """Читал ли текущий запрос с реплики."""
+    return has_request_context() and 'db_replica' in g
+
+
+class RoutingSession(Session):
+    """Сессия, отправляющая чтения read_only-эндпоинтов на реплики.
+
+    Запись (flush или DML) всегда идёт в основную базу, а после неё до конца
+    запроса и ещё DB_REPLICA_STICKY_SECONDS по cookie чтения тоже идут туда.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                if has_request_context():
+                    g.db_wrote = True
+            else:
+                replica = _replica_engine()
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _reset_request_state():
+    # g живёт в контексте приложения: при внешнем app_context (тесты, CLI)
+    # флаги прошлого запроса не должны влиять на следующий
+    for name in ('db_read_only', 'db_wrote', 'db_replica'):
+        g.pop(name, None)
+
+
+def _set_sticky_cookie(response):
+    if g.get('db_wrote'):
+        seconds = current_app.config['DB_REPLICA_STICKY_SECONDS']
+        response.set_cookie(STICKY_COOKIE, str(int(time.time() + seconds) + 1), max_age=seconds + 1,
+                            httponly=True, samesite='Lax', secure=request.is_secure)
+    return response
+
+
+class DatabaseRouting:
+    """Параметры пула из DB_* конфига и реплики для чтения (DATABASE_REPLICA_URLS).
+
+    Движки реплик получают те же параметры пула, что и основная база, но не
+    регистрируются как binds: create_all/drop_all их не трогают. Адреса SQLite
+    для реплик — абсолютные. init_app вызывается до db.init_app.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DB_POOL_SIZE', 5)
+        app.config.setdefault('DB_MAX_OVERFLOW', 10)
+        app.config.setdefault('DB_POOL_TIMEOUT', 30)
+        app.config.setdefault('DB_POOL_RECYCLE', 1800)
+        app.config.setdefault('DB_POOL_PRE_PING', True)
+        app.config.setdefault('DB_STATEMENT_TIMEOUT_MS', 0)
+        app.config.setdefault('DATABASE_REPLICA_URLS', [])
+        app.config.setdefault('DB_REPLICA_STICKY_SECONDS', 5)
+
+        replica_urls = app.config['DATABASE_REPLICA_URLS']
+        if isinstance(replica_urls, str):
+            replica_urls = [u.strip() for u in replica_urls.split(',') if u.strip()]
+
+        overrides = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        replicas = [create_engine(url, **engine_options(app.config, url, overrides)) for url in replica_urls]
+
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+            app.config, app.config['SQLALCHEMY_DATABASE_URI'], overrides)
+        app.extensions['db_routing'] = {'replicas': replicas}
+        if replicas:
+            app.before_request(_reset_request_state)
+            app.after_request(_set_sticky_cookie)
+
+
+def dispose_engines(app, close=False):
+    """Сбрасывает пулы основной базы и реплик.
+
+    После fork (gunicorn post_fork) вызывается с close=False: соединения,
+    унаследованные от мастера, не закрываются (их сокеты общие с родителем),
+    а просто забываются — воркер откроет свои.
+    """
+    db = app.extensions['sqlalchemy']
+    with app.app_context():
+        engines = list(db.engines.values())
+    engines += app.extensions['db_routing']['replicas']
+    for engine in engines:
+        engine.dispose(close=close)
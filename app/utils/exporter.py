@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select
+from .. import db
+from ..models.product import Product, Category
+from .filters import filter_criteria, sort_keys
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+EXPORT_COLUMNS = ('id', 'name', 'price', 'description', 'image_url', 'category_id', 'category_name',
+                  'in_stock', 'external_id', 'created_at', 'updated_at')
+
+# Сколько байт копить перед отправкой клиенту
+CHUNK_SIZE = 64 * 1024
+
+
+def export_statement(filters):
+    """SELECT колонок каталога (без ORM-объектов) для выгрузки с фильтрами get-products."""
+    keys = sort_keys(filters)
+    return (
+        select(
+            Product.id, Product.name, Product.price, Product.description, Product.image_url,
+            Product.category_id, Category.name.label('category_name'), Product.in_stock,
+            Product.external_id, Product.created_at, Product.updated_at,
+        )
+        .outerjoin(Category, Product.category_id == Category.id)
+        .where(*filter_criteria(filters))
+        .order_by(*[key.order_by() for key in keys])
+    )
+
+
+def iter_export_rows(filters, yield_per=1000):
+    """Строки выгрузки через серверный курсор: в памяти не больше yield_per строк."""
+    result = db.session.execute(export_statement(filters).execution_options(yield_per=yield_per))
+    for row in result:
+        yield row._mapping
+
+
+def _value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _ndjson(rows):
+    for row in rows:
+        yield json.dumps({column: _value(row[column]) for column in EXPORT_COLUMNS},
+                         ensure_ascii=False) + '\n'
+
+
+def _csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([_value(row[column]) for column in EXPORT_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Заголовок без строк
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_export(rows, fmt):
+    """Сериализует строки в CSV/NDJSON и отдаёт байтовые куски по ~CHUNK_SIZE."""
+    lines = _ndjson(rows) if fmt == 'ndjson' else _csv(rows)
+    chunk, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        chunk.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            yield b''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def gzip_chunks(chunks, level=6):
+    """Сжимает поток кусков в gzip на лету."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,72 @@
+from sqlalchemy import case, cast, func, Integer
+from .. import db
+from ..models.product import Product, Category
+from .filters import filter_criteria
+
+
+def _bucket(bucket_size):
+    ratio = Product.price / bucket_size
+    if db.engine.dialect.name == 'postgresql':
+        # В Postgres CAST округляет, а не отбрасывает дробную часть
+        ratio = func.floor(ratio)
+    return cast(ratio, Integer).label('bucket')
+
+
+def product_facets(filters, bucket_size):
+    """Фасеты боковой панели одним агрегирующим запросом.
+
+    Группировка идёт по (категория, ценовая корзина); счётчики по категориям,
+    наличию и гистограмма цен собираются из этих групп уже в Python.
+    """
+    bucket = _bucket(bucket_size)
+    in_stock = func.sum(case((Product.in_stock.is_(True), 1), else_=0))
+
+    rows = (
+        db.session.query(
+            Product.category_id,
+            Category.name,
+            bucket,
+            func.count(Product.id),
+            in_stock,
+            func.min(Product.price),
+            func.max(Product.price),
+        )
+        .outerjoin(Category, Product.category_id == Category.id)
+        .filter(*filter_criteria(filters))
+        .group_by(Product.category_id, Category.name, bucket)
+        .all()
+    )
+
+    categories = {}
+    histogram = {}
+    total = total_in_stock = 0
+    min_price = max_price = None
+
+    for category_id, category_name, bucket_index, count, count_in_stock, low, high in rows:
+        count_in_stock = int(count_in_stock or 0)
+        total += count
+        total_in_stock += count_in_stock
+
+        category = categories.setdefault(category_id, {
+            'id': category_id,
+            'name': category_name,
+            'count': 0,
+            'in_stock': 0,
+        })
+        category['count'] += count
+        category['in_stock'] += count_in_stock
+
+        histogram[bucket_index] = histogram.get(bucket_index, 0) + count
+        min_price = low if min_price is None else min(min_price, low)
+        max_price = high if max_price is None else max(max_price, high)
+
+    return {
+        'total': total,
+        'in_stock': total_in_stock,
+        'categories': sorted(categories.values(), key=lambda c: (c['name'] is None, c['name'] or '')),
+        'price': {'min': min_price, 'max': max_price},
+        'price_histogram': [
+            {'from': index * bucket_size, 'to': (index + 1) * bucket_size, 'count': histogram[index]}
+            for index in sorted(histogram)
+        ],
+    }
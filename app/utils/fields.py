@@ -0,0 +1,60 @@
+from sqlalchemy.orm import joinedload, load_only
+from ..models.product import Product, PRODUCT_FIELDS
+
+# Готовые наборы полей: ?fields=list — всё, что нужно карточке в сетке каталога
+FIELD_PRESETS = {
+    'list': ('id', 'name', 'price', 'image_url', 'in_stock'),
+}
+
+# Поля-колонки products (category — связь, грузится отдельно)
+_COLUMN_FIELDS = tuple(field for field in PRODUCT_FIELDS if field != 'category')
+
+
+class FieldsError(ValueError):
+    """Некорректный параметр fields."""
+
+
+def parse_fields(raw):
+    """Разбирает ?fields=id,name,price (или имя набора из FIELD_PRESETS).
+
+    Возвращает None, если параметр не задан (нужны все поля), иначе кортеж
+    полей в порядке PRODUCT_FIELDS; id включается всегда.
+    """
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        raw = FIELD_PRESETS.get(raw.strip(), raw.split(','))
+    if not isinstance(raw, (list, tuple)):
+        raise FieldsError('fields должен быть списком полей через запятую')
+
+    requested = {str(field).strip() for field in raw if str(field).strip()}
+    unknown = requested.difference(PRODUCT_FIELDS)
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    requested.add('id')
+    if requested == set(PRODUCT_FIELDS):
+        return None
+    return tuple(field for field in PRODUCT_FIELDS if field in requested)
+
+
+def includes(fields, field):
+    return fields is None or field in fields
+
+
+def column_projection(fields):
+    """load_only() с колонками набора полей или None для полного набора."""
+    if fields is None:
+        return None
+    return load_only(*[getattr(Product, field) for field in fields if field in _COLUMN_FIELDS])
+
+
+def product_load_options(fields):
+    """Опции загрузки Product под набор полей: load_only колонок и категория только по запросу.
+
+    Для полного набора (fields=None) — прежняя загрузка всех колонок с категорией.
+    """
+    options = [joinedload(Product.category)] if includes(fields, 'category') else []
+    projection = column_projection(fields)
+    if projection is not None:
+        options.append(projection)
+    return options
@@ -0,0 +1,180 @@
+from datetime import datetime
+from sqlalchemy import or_
+from sqlalchemy.orm import contains_eager
+from ..models.product import Product, Category
+from .search import get_search_backend
+from .fields import includes, column_projection, product_load_options
+
+
+# Поля, по которым разрешена сортировка: у каждого есть индекс (поле, id),
+# см. Product.__table_args__; category.name сортируется через уникальный индекс categories.name
+SORTABLE_FIELDS = ('id', 'name', 'price', 'created_at', 'updated_at', 'category.name')
+
+
+class FilterError(ValueError):
+    """Некорректные параметры фильтрации (отдаётся клиенту как 400)."""
+
+
+def normalize_filters(filter_data):
+    """Приводит тело фильтра get-products к каноническому виду.
+
+    Результат используется и для построения запроса, и как основа для
+    курсоров пагинации (одинаковые фильтры дают одинаковый словарь).
+    """
+    data = filter_data or {}
+
+    search_query = (data.get('search_query') or '').strip()
+    # Поиск применяется только если запрос содержит хотя бы 2 символа
+    if len(search_query) < 2:
+        search_query = ''
+
+    def _float(key):
+        value = data.get(key)
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise FilterError(f'Некорректное значение {key}: {value!r}')
+
+    def _datetime(key):
+        value = data.get(key)
+        if value is None:
+            return None
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except (TypeError, ValueError):
+            raise FilterError(f'Некорректная дата {key}: {value!r}')
+
+    sort_by = data.get('sort_by') or None
+    if sort_by is not None and sort_by not in SORTABLE_FIELDS:
+        raise FilterError(f'Сортировка по полю {sort_by!r} не поддерживается. '
+                          f'Допустимые поля: {", ".join(SORTABLE_FIELDS)}')
+
+    in_stock = data.get('in_stock')
+
+    return {
+        'search_query': search_query,
+        'min_price': _float('min_price'),
+        'max_price': _float('max_price'),
+        'category_id': data.get('category_id'),
+        'in_stock': bool(in_stock) if in_stock is not None else None,
+        'created_from': _datetime('created_from'),
+        'created_to': _datetime('created_to'),
+        'sort_by': sort_by,
+        'sort_order': 'desc' if data.get('sort_order') == 'desc' else 'asc',
+    }
+
+
+def filter_criteria(filters, source=Product):
+    """Список условий WHERE для нормализованного фильтра.
+
+    source — Product или витрина ProductListing (колонки товара называются одинаково).
+    """
+    criteria = []
+
+    search_query = filters['search_query']
+    if search_query:
+        criteria.append(get_search_backend().criteria(source, search_query))
+
+    if filters['min_price'] is not None:
+        criteria.append(source.price >= filters['min_price'])
+
+    if filters['max_price'] is not None:
+        criteria.append(source.price <= filters['max_price'])
+
+    if filters['category_id'] is not None:
+        criteria.append(source.category_id == filters['category_id'])
+
+    if filters['in_stock'] is not None:
+        criteria.append(source.in_stock == filters['in_stock'])
+
+    if filters['created_from'] is not None:
+        criteria.append(source.created_at >= datetime.fromisoformat(filters['created_from']))
+
+    if filters['created_to'] is not None:
+        criteria.append(source.created_at <= datetime.fromisoformat(filters['created_to']))
+
+    return criteria
+
+
+class SortKey:
+    """Один ключ сортировки: выражение, направление и допустимость NULL."""
+
+    def __init__(self, expr, descending=False, nullable=False):
+        self.expr = expr
+        self.descending = descending
+        self.nullable = nullable
+
+    def order_by(self):
+        clause = self.expr.desc() if self.descending else self.expr.asc()
+        # NULL всегда в конце, независимо от СУБД и направления
+        return clause.nulls_last() if self.nullable else clause
+
+    def after(self, value):
+        """Условие «строка идёт строго после значения value» по этому ключу."""
+        if value is None:
+            # NULL-значения стоят в конце, после них ничего нет
+            return None
+        clause = self.expr < value if self.descending else self.expr > value
+        return or_(clause, self.expr.is_(None)) if self.nullable else clause
+
+    def equals(self, value):
+        return self.expr.is_(None) if value is None else self.expr == value
+
+
+def sort_keys(filters, source=Product):
+    """Ключи сортировки для нормализованного фильтра.
+
+    Последним ключом всегда идёт id, чтобы порядок был
+    детерминированным и пригодным для keyset-пагинации.
+    """
+    keys = []
+    descending = filters['sort_order'] == 'desc'
+
+    sort_by = filters['sort_by']
+    search_query = filters['search_query']
+    if search_query:
+        # Точное совпадение по ID первым; по релевантности — если сортировка не задана явно
+        search_keys = get_search_backend().sort_keys(source, search_query, by_relevance=not sort_by)
+        keys.extend(SortKey(expr, by_desc) for expr, by_desc in search_keys)
+
+    if sort_by:
+        if sort_by == 'category.name':
+            # В витрине имя категории — своя колонка (строки без категории отфильтрованы,
+            # как и join к categories в build_product_query)
+            category_name = Category.name if source is Product else source.category_name
+            keys.append(SortKey(category_name, descending))
+        else:
+            column = source.__table__.c[sort_by]
+            keys.append(SortKey(getattr(source, sort_by), descending, column.nullable))
+
+    keys.append(SortKey(source.id, descending if sort_by else False))
+    return keys
+
+
+def build_product_query(filters, query=None, fields=None):
+    """Запрос товаров с применёнными фильтрами и сортировкой.
+
+    fields — набор полей из parse_fields(): SELECT ограничивается этими колонками,
+    категория присоединяется, только если она запрошена или нужна для сортировки.
+    Возвращает пару (query, keys), где keys — ключи сортировки из sort_keys().
+    """
+    query = query if query is not None else Product.query
+    query = query.filter(*filter_criteria(filters))
+
+    if filters['sort_by'] == 'category.name':
+        # Сортировка по имени категории требует join; он же заполняет product.category
+        query = query.join(Product.category)
+        if includes(fields, 'category'):
+            query = query.options(contains_eager(Product.category))
+        projection = column_projection(fields)
+        if projection is not None:
+            query = query.options(projection)
+    else:
+        # Категории подгружаем в том же запросе, чтобы to_dict() не делал N+1
+        query = query.options(*product_load_options(fields))
+
+    keys = sort_keys(filters)
+    query = query.order_by(*[key.order_by() for key in keys])
+    return query, keys
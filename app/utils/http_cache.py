@@ -0,0 +1,74 @@
+import hashlib
+import json
+from datetime import datetime
+from flask import current_app, jsonify, request
+
+
+def _digest(*parts):
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def product_etag(product):
+    """Сильный ETag товара: меняется вместе с updated_at и с категорией.
+
+    Категория входит в ответ, но её переименование не трогает products.updated_at,
+    поэтому её id и имя тоже участвуют в хэше.
+    """
+    category = product.category
+    return _digest(
+        product.id,
+        product.updated_at,
+        category.id if category else None,
+        category.name if category else None,
+    )
+
+
+def content_etag(payload):
+    """Сильный ETag по содержимому ответа (одинаков во всех воркерах)."""
+    return _digest(payload)
+
+
+def cache_entry(body, etag, last_modified=None):
+    """Запись для кэша: тело ответа вместе с валидаторами."""
+    return {
+        'etag': etag,
+        'last_modified': last_modified.isoformat() if last_modified else None,
+        'body': body,
+    }
+
+
+def encoded_etag(etag, encoding):
+    """ETag сжатого представления ('<etag>-gzip', '<etag>-br')."""
+    return f'{etag}-{encoding}'
+
+
+def is_not_modified(entry):
+    """Совпадает ли If-None-Match клиента с ETag записи (в том числе сжатого представления)."""
+    if_none_match = request.if_none_match
+    etag = entry['etag']
+    return if_none_match.contains(etag) or any(
+        if_none_match.contains(encoded_etag(etag, encoding)) for encoding in ('gzip', 'br'))
+
+
+def _apply_validators(response, entry, cache_control):
+    response.set_etag(entry['etag'])
+    if entry['last_modified']:
+        response.last_modified = datetime.fromisoformat(entry['last_modified'])
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def not_modified_response(entry, cache_control):
+    """Ответ 304 без тела: только валидаторы и Cache-Control."""
+    response = current_app.response_class(status=304)
+    return _apply_validators(response, entry, cache_control)
+
+
+def conditional_response(entry, cache_control):
+    """Ответ 200 с валидаторами; If-None-Match/If-Modified-Since дают 304."""
+    if is_not_modified(entry):
+        # Сюда же попадает ETag сжатого представления, который make_conditional не узнает
+        return not_modified_response(entry, cache_control)
+    response = _apply_validators(jsonify(entry['body']), entry, cache_control)
+    return response.make_conditional(request)
@@ -0,0 +1,252 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from .. import db
+from ..models.product import Product, Category
+from .cache import mark_catalog_changed
+from .listing import listing_sync_enabled, refresh_listing
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+# insert — executemany, copy — COPY FROM STDIN на Postgres (иначе как insert)
+IMPORT_METHODS = ('insert', 'copy')
+
+# Колонки, которые импорт записывает в products
+IMPORT_COLUMNS = ('name', 'price', 'description', 'image_url', 'category_id', 'in_stock',
+                  'external_id', 'created_at', 'updated_at')
+
+_TRUE = {'1', 'true', 'yes', 'y', 'да'}
+_FALSE = {'0', 'false', 'no', 'n', 'нет'}
+
+
+class RowError(ValueError):
+    """Ошибка в отдельной строке файла импорта."""
+
+
+def open_text_stream(stream):
+    """Оборачивает байтовый поток (тело запроса, файл) в построчно читаемый текст."""
+    if not hasattr(stream, 'read1'):
+        # Сырой поток WSGI (LimitedStream) читаем через буфер, не загружая тело целиком
+        stream = io.BufferedReader(stream, buffer_size=64 * 1024)
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def iter_rows(text_stream, fmt):
+    """Лениво читает строки CSV/NDJSON: пары (номер строки, словарь)."""
+    if fmt == 'csv':
+        reader = csv.DictReader(text_stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'ndjson':
+        for line_no, line in enumerate(text_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, RowError(f'Некорректный JSON: {e}')
+                continue
+            yield line_no, record
+    else:
+        raise ValueError(f'Неизвестный формат импорта: {fmt}')
+
+
+def detect_format(fmt=None, content_type=None, filename=None):
+    if fmt:
+        return fmt
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if content_type and ('ndjson' in content_type or 'jsonl' in content_type):
+        return 'ndjson'
+    return 'csv'
+
+
+class ProductImporter:
+    """Пакетная загрузка товаров из потока строк.
+
+    Категории проверяются по словарю, загруженному один раз; строки пишутся
+    пачками (executemany, COPY на Postgres или INSERT ... ON CONFLICT для upsert
+    по external_id). Каждая пачка фиксируется отдельно, ошибки БД внутри пачки
+    разбираются построчно в savepoint'ах.
+    """
+
+    def __init__(self, batch_size=1000, upsert=False, method='insert', max_errors=100):
+        if method not in IMPORT_METHODS:
+            raise ValueError(f'Неизвестный метод импорта: {method}')
+        if batch_size < 1:
+            raise ValueError('Размер пачки должен быть положительным')
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.method = method
+        self.max_errors = max_errors
+        self.categories = self._load_categories()
+        self.report = {
+            'rows': 0,
+            'written': 0,
+            'failed': 0,
+            'batches': 0,
+            'errors': [],
+        }
+
+    def _load_categories(self):
+        categories = {}
+        for category_id, name in db.session.query(Category.id, Category.name):
+            categories[str(category_id)] = category_id
+            categories[name.strip().lower()] = category_id
+        return categories
+
+    def _error(self, line_no, message):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < self.max_errors:
+            self.report['errors'].append({'row': line_no, 'error': message})
+
+    def validate(self, record):
+        """Проверяет строку и приводит её к значениям колонок products."""
+        if not isinstance(record, dict):
+            raise RowError('Строка должна быть объектом')
+
+        name = (record.get('name') or '').strip()
+        if not name:
+            raise RowError('Не заполнено поле name')
+        if len(name) > 100:
+            raise RowError('Поле name длиннее 100 символов')
+
+        try:
+            price = float(record.get('price'))
+        except (TypeError, ValueError):
+            raise RowError(f'Некорректная цена: {record.get("price")!r}')
+        if price < 0:
+            raise RowError('Цена не может быть отрицательной')
+
+        category_id = None
+        category = record.get('category', record.get('category_id'))
+        if category not in (None, ''):
+            category_id = self.categories.get(str(category).strip().lower())
+            if category_id is None:
+                raise RowError(f'Категория не найдена: {category!r}')
+
+        in_stock = record.get('in_stock')
+        if in_stock in (None, ''):
+            in_stock = True
+        elif not isinstance(in_stock, bool):
+            value = str(in_stock).strip().lower()
+            if value not in _TRUE | _FALSE:
+                raise RowError(f'Некорректное значение in_stock: {in_stock!r}')
+            in_stock = value in _TRUE
+
+        external_id = record.get('external_id')
+        external_id = str(external_id).strip() if external_id not in (None, '') else None
+        if self.upsert and not external_id:
+            raise RowError('Для upsert нужно поле external_id')
+
+        now = datetime.utcnow()
+        return {
+            'name': name,
+            'price': price,
+            'description': record.get('description') or None,
+            'image_url': record.get('image_url') or None,
+            'category_id': category_id,
+            'in_stock': in_stock,
+            'external_id': external_id,
+            'created_at': now,
+            'updated_at': now,
+        }
+
+    def _statement(self):
+        table = Product.__table__
+        if not self.upsert:
+            return insert(table)
+
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            stmt = postgresql.insert(table)
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(table)
+        else:
+            raise ValueError(f'Upsert не поддерживается для {dialect}')
+        updated = {column: stmt.excluded[column]
+                   for column in IMPORT_COLUMNS if column not in ('external_id', 'created_at')}
+        return stmt.on_conflict_do_update(index_elements=['external_id'], set_=updated)
+
+    def _copy(self, rows):
+        # COPY ... FROM STDIN через psycopg2: самый быстрый путь для чистой вставки
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['\\N' if row[c] is None else row[c] for c in IMPORT_COLUMNS])
+        buffer.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(
+            f'COPY products ({", ".join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')',
+            buffer
+        )
+
+    def _use_copy(self):
+        return (self.method == 'copy' and not self.upsert
+                and db.engine.dialect.name == 'postgresql' and db.engine.driver == 'psycopg2')
+
+    def _write(self, batch):
+        rows = [row for _, row in batch]
+        try:
+            with db.session.begin_nested():
+                if self._use_copy():
+                    self._copy(rows)
+                else:
+                    db.session.execute(self._statement(), rows)
+            self.report['written'] += len(rows)
+        except (SQLAlchemyError, db.engine.dialect.dbapi.Error):
+            # Пачка целиком не прошла: ищем виноватые строки по одной
+            for line_no, row in batch:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(self._statement(), [row])
+                    self.report['written'] += 1
+                except SQLAlchemyError as e:
+                    self._error(line_no, str(getattr(e, 'orig', e)).strip())
+
+        mark_catalog_changed(db.session)
+        if listing_sync_enabled():
+            # id вставленных строк неизвестны (COPY, upsert): обновляем витрину по updated_at пачки.
+            # Импорт ничего не удаляет, поэтому чистка удалённых товаров здесь не нужна
+            refresh_listing(db.session.connection(), since=min(row['updated_at'] for row in rows))
+        db.session.commit()
+        self.report['batches'] += 1
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        if self.upsert:
+            # Повтор external_id в одной пачке ON CONFLICT не обработает: оставляем последний
+            unique = {}
+            for line_no, row in batch:
+                unique[row['external_id']] = (line_no, row)
+            batch = list(unique.values())
+        self._write(batch)
+
+    def run(self, rows):
+        """Импортирует строки из iter_rows() и возвращает отчёт."""
+        started = time.perf_counter()
+        batch = []
+        for line_no, record in rows:
+            self.report['rows'] += 1
+            try:
+                if isinstance(record, RowError):
+                    raise record
+                batch.append((line_no, self.validate(record)))
+            except RowError as e:
+                self._error(line_no, str(e))
+                continue
+
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        self._flush(batch)
+
+        elapsed = time.perf_counter() - started
+        self.report['elapsed_sec'] = round(elapsed, 3)
+        self.report['rows_per_sec'] = round(self.report['rows'] / elapsed, 1) if elapsed else None
+        return self.report
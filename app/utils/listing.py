@@ -0,0 +1,152 @@
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, load_only
+from ..models.product import Product, Category
+from ..models.listing import ProductListing
+from .filters import filter_criteria, sort_keys
+
+LISTING_MODES = ('off', 'sync', 'on')
+
+# Колонки витрины, которые копируются из products как есть
+_PRODUCT_COLUMNS = ('id', 'name', 'price', 'description', 'image_url', 'created_at', 'updated_at',
+                    'in_stock', 'external_id', 'category_id')
+
+# Сколько id обновлять одним DELETE + INSERT ... SELECT
+REFRESH_CHUNK = 1000
+
+
+def listing_mode():
+    """LISTING_READ_MODEL: off — витрина не ведётся, sync — ведётся, но не читается, on — ведётся и читается."""
+    mode = current_app.config.get('LISTING_READ_MODEL', 'off')
+    if mode not in LISTING_MODES:
+        raise ValueError(f'LISTING_READ_MODEL должен быть одним из: {", ".join(LISTING_MODES)}')
+    return mode
+
+
+def listing_sync_enabled():
+    return has_app_context() and listing_mode() != 'off'
+
+
+def listing_reads_enabled():
+    return listing_mode() == 'on'
+
+
+def _listing_rows():
+    products = Product.__table__
+    categories = Category.__table__
+    return (
+        select(*[products.c[name] for name in _PRODUCT_COLUMNS], categories.c.name)
+        .select_from(products.outerjoin(categories, categories.c.id == products.c.category_id))
+    )
+
+
+def _replace_rows(connection, ids):
+    listings = ProductListing.__table__
+    products = Product.__table__
+    columns = [listings.c[name] for name in _PRODUCT_COLUMNS] + [listings.c.category_name]
+    connection.execute(listings.delete().where(listings.c.id.in_(ids)))
+    # Удалённые товары просто не найдутся в SELECT
+    connection.execute(listings.insert().from_select(columns, _listing_rows().where(products.c.id.in_(ids))))
+
+
+def refresh_listing(connection, ids=None, since=None):
+    """Пересобирает строки витрины из products и categories.
+
+    ids — только эти товары (в том числе удалённые); since — товары, изменённые
+    начиная с этого момента; без аргументов — вся витрина. Строки товаров,
+    удалённых в обход витрины, по since не найти — их чистит prune_listing().
+    Возвращает число обработанных id (None при полной пересборке).
+    """
+    listings = ProductListing.__table__
+    products = Product.__table__
+
+    if ids is None and since is None:
+        connection.execute(listings.delete())
+        columns = [listings.c[name] for name in _PRODUCT_COLUMNS] + [listings.c.category_name]
+        connection.execute(listings.insert().from_select(columns, _listing_rows()))
+        return None
+
+    if since is not None:
+        ids = list(connection.execute(select(products.c.id).where(products.c.updated_at >= since)).scalars())
+
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), REFRESH_CHUNK):
+        _replace_rows(connection, ids[start:start + REFRESH_CHUNK])
+    return len(ids)
+
+
+def prune_listing(connection):
+    """Удаляет строки витрины, товаров которых уже нет; возвращает их число.
+
+    Это anti-join обеих таблиц, поэтому он отдельный шаг (rebuild-listing --since),
+    а не часть каждого инкрементального обновления.
+    """
+    listings = ProductListing.__table__
+    products = Product.__table__
+    return connection.execute(listings.delete().where(listings.c.id.not_in(select(products.c.id)))).rowcount
+
+
+def _sync_listing(session, flush_context):
+    # Изменения товаров и категорий, сделанные через ORM, переносятся в витрину
+    # в той же транзакции — сразу после flush, одним пакетом на flush
+    if not listing_sync_enabled():
+        return
+
+    product_ids = set()
+    renamed, removed = {}, set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Product):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            product_ids.add(obj.id)
+        elif isinstance(obj, Category):
+            if obj in session.deleted:
+                removed.add(obj.id)
+            elif obj in session.dirty and session.is_modified(obj):
+                renamed[obj.id] = obj.name
+
+    if not (product_ids or renamed or removed):
+        return
+
+    connection = session.connection()
+    listings = ProductListing.__table__
+    for category_id, name in renamed.items():
+        connection.execute(listings.update().where(listings.c.category_id == category_id)
+                           .values(category_name=name))
+    if removed:
+        connection.execute(listings.update().where(listings.c.category_id.in_(removed))
+                           .values(category_name=None))
+    if product_ids:
+        refresh_listing(connection, ids=product_ids)
+
+
+def listing_load_options(fields):
+    """load_only колонок витрины под набор полей (category — id и имя категории)."""
+    if fields is None:
+        return []
+    columns = []
+    for field in fields:
+        if field == 'category':
+            columns.extend((ProductListing.category_id, ProductListing.category_name))
+        else:
+            columns.append(getattr(ProductListing, field))
+    return [load_only(*columns)]
+
+
+def build_listing_query(filters, fields=None):
+    """Запрос get-products к витрине: те же фильтры, сортировки и ответ, что у build_product_query.
+
+    Возвращает пару (query, keys).
+    """
+    query = ProductListing.query.filter(*filter_criteria(filters, ProductListing))
+    if filters['sort_by'] == 'category.name':
+        # Как и join к categories в build_product_query: товары без категории не попадают в выдачу
+        query = query.filter(ProductListing.category_name.is_not(None))
+    query = query.options(*listing_load_options(fields))
+
+    keys = sort_keys(filters, ProductListing)
+    query = query.order_by(*[key.order_by() for key in keys])
+    return query, keys
+
+
+event.listen(Session, 'after_flush', _sync_listing)
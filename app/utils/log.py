@@ -0,0 +1,195 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Поля, значения которых никогда не попадают в лог (в аргументах и extra)
+SENSITIVE_KEYS = frozenset({
+    'password', 'password_hash', 'new_password', 'old_password',
+    'access_token', 'refresh_token', 'token', 'authorization', 'secret', 'cookie',
+})
+REDACTED = '***'
+
+# Стандартные атрибуты LogRecord: всё остальное — поля из extra
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_state = {'listener': None, 'handler': None, 'lock': threading.Lock()}
+
+
+def parse_levels(value):
+    """'auth=WARNING,sqlalchemy.engine=INFO' -> {'auth': 'WARNING', ...}; словарь возвращается как есть."""
+    if isinstance(value, dict):
+        return dict(value)
+    result = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            result[name.strip()] = level.strip()
+    return result
+
+
+def redact(value):
+    """Копия значения, в которой чувствительные ключи словарей заменены на '***'."""
+    if isinstance(value, dict):
+        return {k: REDACTED if str(k).lower() in SENSITIVE_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(v) for v in value)
+    return value
+
+
+class RedactFilter(logging.Filter):
+    """Вычищает пароли и токены из аргументов сообщения и полей extra."""
+
+    def filter(self, record):
+        if isinstance(record.args, dict):
+            record.args = redact(record.args)
+        elif record.args:
+            record.args = tuple(redact(arg) for arg in record.args)
+        for key in set(vars(record)) - _RECORD_ATTRS:
+            value = getattr(record, key)
+            setattr(record, key, REDACTED if key.lower() in SENSITIVE_KEYS else redact(value))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает только долю событий ниже WARNING для шумных логгеров.
+
+    rates: {'имя логгера': доля 0..1}; правило логгера действует и на дочерние.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = {name: float(rate) for name, rate in rates.items()}
+
+    def _rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate is None or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на событие: время, уровень, логгер, сообщение и поля extra."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        for key in set(vars(record)) - _RECORD_ATTRS:
+            entry[key] = getattr(record, key)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler, который не ждёт при переполнении очереди, а отбрасывает событие."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+    def prepare(self, record):
+        # Сообщение и traceback собираются в потоке запроса (аргументы могут
+        # измениться до записи), сам вывод остаётся потоку QueueListener
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _output_handler(config):
+    handler = logging.StreamHandler(sys.stderr)
+    if config.get('LOG_FORMAT', 'json') == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+    return handler
+
+
+def configure_logging(app):
+    """Настраивает логирование процесса по конфигу приложения.
+
+    Корневой логгер пишет в очередь (запись в поток запроса не блокирует),
+    отдельный поток QueueListener выводит события в stderr. Повторный вызов
+    (ещё одно приложение в процессе, тесты) заменяет предыдущую настройку.
+    """
+    config = app.config
+    root = logging.getLogger()
+    with _state['lock']:
+        _shutdown()
+
+        handler = NonBlockingQueueHandler(queue.Queue(config.get('LOG_QUEUE_SIZE', 10000)))
+        handler.addFilter(RedactFilter())
+        rates = parse_levels(config.get('LOG_SAMPLING'))
+        if rates:
+            handler.addFilter(SamplingFilter(rates))
+        listener = QueueListener(handler.queue, _output_handler(config), respect_handler_level=False)
+
+        root.addHandler(handler)
+        root.setLevel(config.get('LOG_LEVEL', 'INFO'))
+        for name, level in parse_levels(config.get('LOG_LEVELS')).items():
+            logging.getLogger(name).setLevel(level.upper())
+
+        _state['handler'] = handler
+        _state['listener'] = listener
+        listener.start()
+
+
+def _shutdown():
+    listener, handler = _state['listener'], _state['handler']
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+    if handler is not None:
+        logging.getLogger().removeHandler(handler)
+    _state['listener'] = _state['handler'] = None
+
+
+def stop_logging():
+    """Дописывает очередь и останавливает поток вывода (при завершении процесса)."""
+    with _state['lock']:
+        _shutdown()
+
+
+def _restart_after_fork():
+    # Поток QueueListener не переживает fork: в дочернем процессе (воркер gunicorn
+    # при preload) создаём новую очередь и запускаем поток вывода заново
+    listener, handler = _state['listener'], _state['handler']
+    _state['lock'] = threading.Lock()
+    if listener is None:
+        return
+    handler.queue = listener.queue = queue.Queue(handler.queue.maxsize)
+    listener._thread = None
+    listener.start()
+
+
+atexit.register(stop_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,96 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+class CursorError(ValueError):
+    """Курсор повреждён или не соответствует параметрам запроса."""
+
+
+def filters_fingerprint(filters):
+    """Короткий хэш нормализованного фильтра (см. normalize_filters)."""
+    raw = json.dumps(filters, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and '$dt' in value:
+        return datetime.fromisoformat(value['$dt'])
+    return value
+
+
+def encode_cursor(filters, values):
+    """Упаковывает значения ключей сортировки последней строки в непрозрачный курсор."""
+    payload = {
+        'f': filters_fingerprint(filters),
+        'v': [_encode_value(value) for value in values],
+    }
+    raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, filters, keys):
+    """Распаковывает курсор и проверяет, что он выдан для тех же фильтров."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = [_decode_value(value) for value in payload['v']]
+        fingerprint = payload['f']
+    except (ValueError, TypeError, KeyError):
+        raise CursorError('Некорректный курсор')
+
+    if fingerprint != filters_fingerprint(filters) or len(values) != len(keys):
+        raise CursorError('Курсор не соответствует параметрам запроса')
+    return values
+
+
+def keyset_condition(keys, values):
+    """Условие WHERE (k1, ..., kn) > (v1, ..., vn) с учётом направлений и NULL.
+
+    Раскрывается в OR-цепочку, чтобы работать одинаково на Postgres и SQLite.
+    """
+    branches = []
+    prefix = []
+    for key, value in zip(keys, values):
+        after = key.after(value)
+        if after is not None:
+            branches.append(and_(*prefix, after))
+        prefix.append(key.equals(value))
+
+    condition = or_(*branches)
+    first, first_value = keys[0], values[0]
+    if not first.nullable and first_value is not None:
+        # Явная граница по первому ключу помогает планировщику использовать индекс
+        bound = first.expr <= first_value if first.descending else first.expr >= first_value
+        condition = and_(bound, condition)
+    return condition
+
+
+def paginate_keyset(query, keys, filters, cursor, limit):
+    """Страница в режиме keyset-пагинации.
+
+    Возвращает (items, next_cursor); next_cursor равен None на последней странице.
+    """
+    if cursor:
+        values = decode_cursor(cursor, filters, keys)
+        query = query.filter(keyset_condition(keys, values))
+
+    labeled = [key.expr.label(f'_k{i}') for i, key in enumerate(keys)]
+    rows = query.add_columns(*labeled).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [row[0] for row in rows]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(filters, list(rows[-1][1:]))
+    return items, next_cursor
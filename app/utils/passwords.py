@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Очередь хэширования переполнена — клиенту отдаётся быстрый 429."""
+
+
+class HasherTimeout(Exception):
+    """Хэширование не уложилось в PASSWORD_HASH_TIMEOUT — клиенту отдаётся 503."""
+
+
+class PasswordHasher:
+    """Хэширование и проверка паролей вне потока запроса.
+
+    Медленный хэш werkzeug выполняется в ограниченном пуле процессов
+    (PASSWORD_HASH_WORKERS, 0 — прямо в потоке запроса). Одновременно в работе
+    не больше PASSWORD_HASH_QUEUE_LIMIT операций, остальные сразу получают
+    HasherBusy вместо ожидания. Пул создаётся лениво в каждом процессе,
+    поэтому безопасен для preload + fork в gunicorn.
+    """
+
+    def __init__(self, app=None):
+        self._pool = None
+        self._pool_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'in_flight': 0,
+            'in_flight_peak': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'hash_count': 0,
+            'hash_seconds': 0.0,
+            'verify_count': 0,
+            'verify_seconds': 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_QUEUE_LIMIT', 8)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 5)
+        app.extensions['password_hasher'] = self
+
+    def _executor(self, workers):
+        # Под блокировкой: два первых запроса в потоках gthread не должны создать по пулу
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                # spawn, а не fork: дочерние процессы не наследуют потоки и соединения воркера
+                self._pool = ProcessPoolExecutor(max_workers=workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _acquire(self, limit):
+        with self._lock:
+            if self._slots is None or self._slots[0] != limit:
+                self._slots = (limit, threading.BoundedSemaphore(limit))
+            slots = self._slots[1]
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HasherBusy()
+        with self._lock:
+            self._stats['in_flight'] += 1
+            self._stats['in_flight_peak'] = max(self._stats['in_flight_peak'], self._stats['in_flight'])
+        return slots
+
+    def _release(self, slots):
+        slots.release()
+        with self._lock:
+            self._stats['in_flight'] -= 1
+
+    def _run(self, kind, fn, *args):
+        config = current_app.config
+        slots = self._acquire(config['PASSWORD_HASH_QUEUE_LIMIT'])
+        started = time.perf_counter()
+        submitted = False
+        try:
+            workers = config['PASSWORD_HASH_WORKERS']
+            if not workers:
+                return fn(*args)
+            future = self._executor(workers).submit(fn, *args)
+            # Слот занят, пока задача в пуле: после таймаута она может ещё выполняться,
+            # и новый запрос не должен встать в очередь пула сверх PASSWORD_HASH_QUEUE_LIMIT
+            future.add_done_callback(lambda _: self._release(slots))
+            submitted = True
+            try:
+                return future.result(timeout=config['PASSWORD_HASH_TIMEOUT'])
+            except FutureTimeout:
+                # Ещё не начатая задача снимается с очереди (и сразу освобождает слот)
+                future.cancel()
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise HasherTimeout()
+        finally:
+            elapsed = time.perf_counter() - started
+            if not submitted:
+                self._release(slots)
+            with self._lock:
+                self._stats[f'{kind}_count'] += 1
+                self._stats[f'{kind}_seconds'] += elapsed
+
+    def hash(self, plaintext):
+        return self._run('hash', generate_password_hash, plaintext, current_app.config['PASSWORD_HASH_METHOD'])
+
+    def verify(self, pwhash, plaintext):
+        return self._run('verify', check_password_hash, pwhash, plaintext)
+
+    def needs_rehash(self, pwhash):
+        """Хэш создан другим методом или с другими параметрами, чем PASSWORD_HASH_METHOD."""
+        method = current_app.config['PASSWORD_HASH_METHOD']
+        stored = pwhash.split('$', 1)[0]
+        return stored != method and not stored.startswith(method + ':')
+
+    def stats(self):
+        """Снимок метрик: задержки хэширования и глубина очереди."""
+        with self._lock:
+            return dict(self._stats)
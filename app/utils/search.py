@@ -0,0 +1,127 @@
+import logging
+from flask import current_app
+from sqlalchemy import case, func, literal_column, or_, text
+from .. import db
+
+logger = logging.getLogger('search')
+
+# Конфигурация полнотекстового поиска; должна совпадать с миграцией b7e3c1d2a4f5
+TS_CONFIG = 'simple'
+
+
+class BasicSearch:
+    """Переносимый поиск через ILIKE (SQLite в тестах, Postgres без миграции b7e3c1d2a4f5).
+
+    Ищет по названию и описанию; релевантность — совпадение в начале названия,
+    затем в названии, затем в описании.
+    """
+
+    name = 'basic'
+
+    def text_criteria(self, source, search_query):
+        return or_(
+            source.name.icontains(search_query, autoescape=True),
+            source.description.icontains(search_query, autoescape=True)
+        )
+
+    def rank(self, source, search_query):
+        """Выражение релевантности: чем больше, тем выше в выдаче."""
+        return case(
+            (source.name.istartswith(search_query, autoescape=True), 3),
+            (source.name.icontains(search_query, autoescape=True), 2),
+            else_=1
+        )
+
+    def criteria(self, source, search_query):
+        """Условие WHERE для поискового запроса.
+
+        Запрос из одних цифр дополнительно ищется по первичному ключу,
+        поэтому точное совпадение по ID не требует сканирования таблицы.
+        """
+        text = self.text_criteria(source, search_query)
+        if search_query.isdigit():
+            return or_(source.id == int(search_query), text)
+        return text
+
+    def sort_keys(self, source, search_query, by_relevance):
+        """Выражения для ORDER BY: (выражение, по убыванию)."""
+        keys = []
+        if search_query.isdigit():
+            # Точное совпадение по ID всегда первое
+            keys.append((case((source.id == int(search_query), 0), else_=1), False))
+        if by_relevance:
+            keys.append((self.rank(source, search_query), True))
+        return keys
+
+
+class PostgresSearch(BasicSearch):
+    """Поиск по tsvector-колонке search_vector и pg_trgm-индексу по названию.
+
+    Колонку и расширение создают миграции b7e3c1d2a4f5 и a7c2e4f6b8d0 (у витрины),
+    а не модели: в базе из db.create_all() их нет, см. postgres_search_ready().
+    """
+
+    name = 'postgres'
+
+    def _vector(self, source):
+        return literal_column(f'{source.__tablename__}.search_vector')
+
+    def _tsquery(self, search_query):
+        return func.websearch_to_tsquery(TS_CONFIG, search_query)
+
+    def text_criteria(self, source, search_query):
+        # ILIKE и оператор % обслуживаются GIN-индексом gin_trgm_ops, @@ — GIN по tsvector
+        return or_(
+            self._vector(source).op('@@')(self._tsquery(search_query)),
+            source.name.icontains(search_query, autoescape=True),
+            source.name.op('%')(search_query)
+        )
+
+    def rank(self, source, search_query):
+        return (
+            func.ts_rank_cd(self._vector(source), self._tsquery(search_query))
+            + func.similarity(source.name, search_query)
+        )
+
+
+SEARCH_BACKENDS = {
+    'basic': BasicSearch,
+    'postgres': PostgresSearch,
+}
+
+
+def postgres_search_ready(connection):
+    """Есть ли в базе pg_trgm и колонка search_vector у products и у витрины (если она создана)."""
+    if not connection.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")):
+        return False
+    rows = connection.execute(text(
+        "SELECT table_name, bool_or(column_name = 'search_vector') FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name IN ('products', 'product_listings') "
+        "GROUP BY table_name"
+    )).all()
+    tables = dict(rows)
+    return tables.get('products', False) and all(tables.values())
+
+
+def get_search_backend():
+    """Поисковый движок для текущего приложения (SEARCH_BACKEND в конфиге).
+
+    'auto' выбирает Postgres-поиск на PostgreSQL с применёнными миграциями поиска
+    и переносимый ILIKE на остальных СУБД. Схема проверяется один раз на приложение.
+    """
+    backend = current_app.extensions.get('search')
+    if backend is None:
+        name = current_app.config.get('SEARCH_BACKEND', 'auto')
+        if name == 'auto':
+            name = 'basic'
+            if db.engine.dialect.name == 'postgresql':
+                with db.engine.connect() as connection:
+                    ready = postgres_search_ready(connection)
+                if ready:
+                    name = 'postgres'
+                else:
+                    logger.warning("search_vector or pg_trgm is missing, falling back to ILIKE search; "
+                                   "run `flask db upgrade`")
+        backend = SEARCH_BACKENDS[name]()
+        current_app.extensions['search'] = backend
+    return backend
@@ -0,0 +1,56 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy.dialects import postgresql, sqlite
+from .. import db
+from ..models.product import Category
+from .cache import mark_catalog_changed
+
+# Базовый справочник категорий (тот же список добавляет миграция f3a1c5e7d9b2)
+BASE_CATEGORIES = (
+    'Электроника',
+    'Одежда',
+    'Обувь',
+    'Аксессуары',
+    'Книги',
+    'Продукты питания',
+    'Бытовая техника',
+    'Мебель',
+    'Спортивные товары',
+)
+
+
+def seed_categories(names=BASE_CATEGORIES):
+    """Добавляет недостающие категории одним INSERT ... ON CONFLICT DO NOTHING.
+
+    Идемпотентна и безопасна при одновременном запуске. Возвращает число добавленных.
+    """
+    rows = [{'name': name} for name in names]
+    if not rows:
+        return 0
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(Category.__table__).values(rows).on_conflict_do_nothing(index_elements=['name'])
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(Category.__table__).values(rows).on_conflict_do_nothing(index_elements=['name'])
+    else:
+        # Без ON CONFLICT: вставляем только отсутствующие (одним запросом на чтение)
+        existing = set(db.session.scalars(db.select(Category.name).where(Category.name.in_(names))))
+        rows = [row for row in rows if row['name'] not in existing]
+        if not rows:
+            return 0
+        stmt = db.insert(Category.__table__).values(rows)
+
+    inserted = db.session.execute(stmt).rowcount
+    if inserted:
+        mark_catalog_changed(db.session, 'categories')
+    db.session.commit()
+    return inserted
+
+
+@click.command('seed-categories')
+@with_appcontext
+def seed_categories_command():
+    """Добавляет базовые категории, которых ещё нет в базе."""
+    inserted = seed_categories()
+    click.echo(f'Категорий добавлено: {inserted}')
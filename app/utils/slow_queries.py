@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Параметры, имена которых содержат эти части, в журнал не попадают
+SENSITIVE_PARAM_PARTS = ('password', 'token', 'secret', 'email')
+MAX_PARAM_LENGTH = 64
+
+# Списки плейсхолдеров IN (?, ?, ?) / (%(id_1_1)s, ...) сворачиваются в один
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%\([^)]+\)s|%s)(?:\s*,\s*(?:\?|%\([^)]+\)s|%s))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_EXPLAINABLE = ('select', 'with', 'update', 'delete', 'insert')
+
+
+def normalize_statement(statement):
+    """Текст запроса без различий в пробелах и длине IN-списков — основа отпечатка."""
+    statement = _WHITESPACE.sub(' ', statement.strip())
+    return _PLACEHOLDER_LIST.sub('(?...)', statement)
+
+
+def statement_fingerprint(statement):
+    return hashlib.sha1(normalize_statement(statement).encode('utf-8')).hexdigest()[:16]
+
+
+def redact_parameters(parameters):
+    """Параметры запроса для журнала: чувствительные скрыты, длинные строки обрезаны."""
+    redacted = {}
+    for name, value in (parameters or {}).items():
+        if any(part in name.lower() for part in SENSITIVE_PARAM_PARTS):
+            value = '***'
+        elif isinstance(value, str) and len(value) > MAX_PARAM_LENGTH:
+            value = value[:MAX_PARAM_LENGTH] + '…'
+        elif isinstance(value, (bytes, bytearray)):
+            value = f'<{len(value)} bytes>'
+        elif not isinstance(value, (int, float, bool, type(None), str)):
+            value = str(value)
+        redacted[name] = value
+    return redacted
+
+
+class SlowQueryStore:
+    """Журнал медленных запросов в локальном файле SQLite с вытеснением старых записей."""
+
+    def __init__(self, path, max_entries=5000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # Соединение на поток и на процесс (после fork создаётся заново)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS slow_queries ('
+                         'id INTEGER PRIMARY KEY AUTOINCREMENT, logged_at REAL NOT NULL, '
+                         'fingerprint TEXT NOT NULL, endpoint TEXT, method TEXT, path TEXT, '
+                         'statement TEXT NOT NULL, parameters TEXT, filters TEXT, '
+                         'duration_ms REAL NOT NULL, explain TEXT, pid INTEGER)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_slow_queries_fingerprint ON slow_queries (fingerprint)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add(self, entry):
+        conn = self._connection()
+        conn.execute(
+            'INSERT INTO slow_queries (logged_at, fingerprint, endpoint, method, path, statement, '
+            'parameters, filters, duration_ms, explain, pid) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (entry['logged_at'], entry['fingerprint'], entry['endpoint'], entry['method'], entry['path'],
+             entry['statement'], json.dumps(entry['parameters'], ensure_ascii=False, default=str),
+             json.dumps(entry['filters'], ensure_ascii=False, default=str) if entry['filters'] else None,
+             entry['duration_ms'], entry['explain'], os.getpid())
+        )
+        self._writes += 1
+        if self._writes % 50 == 0:
+            self.rotate()
+
+    def rotate(self):
+        self._connection().execute(
+            'DELETE FROM slow_queries WHERE id <= (SELECT MAX(id) FROM slow_queries) - ?', (self.max_entries,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM slow_queries')
+
+    def top(self, limit=20, order_by='total', endpoint=None, since=None):
+        """Самые дорогие запросы, сгруппированные по отпечатку."""
+        order = {'total': 'total_ms', 'max': 'max_ms', 'count': 'calls', 'avg': 'avg_ms'}[order_by]
+        where, params = [], []
+        if endpoint:
+            where.append('endpoint = ?')
+            params.append(endpoint)
+        if since is not None:
+            where.append('logged_at >= ?')
+            params.append(since)
+        sql = (
+            'SELECT fingerprint, COUNT(*) AS calls, SUM(duration_ms) AS total_ms, MAX(duration_ms) AS max_ms, '
+            'AVG(duration_ms) AS avg_ms, MAX(logged_at) AS last_seen, MAX(id) AS last_id '
+            'FROM slow_queries' + (' WHERE ' + ' AND '.join(where) if where else '') +
+            f' GROUP BY fingerprint ORDER BY {order} DESC LIMIT ?'
+        )
+        conn = self._connection()
+        groups = conn.execute(sql, params + [limit]).fetchall()
+
+        result = []
+        for fingerprint, calls, total_ms, max_ms, avg_ms, last_seen, last_id in groups:
+            # Пример — последний записанный запрос группы, с его планом и фильтром
+            sample = conn.execute(
+                'SELECT endpoint, statement, parameters, filters, explain, duration_ms FROM slow_queries '
+                'WHERE id = ?', (last_id,)).fetchone()
+            endpoints = [row[0] for row in conn.execute(
+                'SELECT DISTINCT endpoint FROM slow_queries WHERE fingerprint = ?', (fingerprint,))]
+            result.append({
+                'fingerprint': fingerprint,
+                'calls': calls,
+                'total_ms': round(total_ms, 3),
+                'max_ms': round(max_ms, 3),
+                'avg_ms': round(avg_ms, 3),
+                'last_seen': last_seen,
+                'endpoints': endpoints,
+                'statement': sample[1],
+                'sample': {
+                    'endpoint': sample[0],
+                    'duration_ms': round(sample[5], 3),
+                    'parameters': json.loads(sample[2]) if sample[2] else None,
+                    'filters': json.loads(sample[3]) if sample[3] else None,
+                    'explain': sample[4],
+                },
+            })
+        return result
+
+
+def note_filters(filters):
+    """Запоминает нормализованный фильтр запроса, чтобы приложить его к медленным запросам."""
+    if has_request_context():
+        g.slow_query_filters = filters
+
+
+def slow_query_store():
+    # Хранилище открывается лениво: путь можно поменять после create_app,
+    # а файл открывается уже в воркере, после fork
+    state = current_app.extensions['slow_queries']
+    if state['store'] is None:
+        config = current_app.config
+        state['store'] = SlowQueryStore(config['SLOW_QUERY_PATH'], config['SLOW_QUERY_MAX_ENTRIES'])
+    return state['store']
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('slow_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('slow_query_started')
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    if not has_request_context() or g.get('slow_query_explaining'):
+        return
+    config = current_app.config
+    if not config.get('SLOW_QUERY_ENABLED') or elapsed * 1000 < config['SLOW_QUERY_THRESHOLD_MS']:
+        return
+
+    compiled = context.compiled_parameters[0] if context is not None and context.compiled_parameters else {}
+    g.setdefault('slow_queries', []).append({
+        'engine': conn.engine,
+        'statement': statement,
+        # Исходные параметры нужны только для EXPLAIN и в журнал не пишутся
+        'raw_parameters': None if executemany else parameters,
+        'parameters': redact_parameters(compiled),
+        'duration_ms': elapsed * 1000,
+    })
+
+
+def _handle_error(context):
+    stack = context.connection.info.get('slow_query_started') if context.connection is not None else None
+    if stack:
+        stack.pop()
+
+
+def _explain_mode(config):
+    mode = (config['SLOW_QUERY_EXPLAIN'] or 'off').lower()
+    if mode == 'analyze' and not config['SLOW_QUERY_ALLOW_ANALYZE']:
+        # EXPLAIN ANALYZE выполняет запрос повторно: в production только план
+        return 'plan'
+    return mode
+
+
+def explain(engine, statement, parameters, mode):
+    """План запроса текстом; None, если запрос не объясним или EXPLAIN не удался."""
+    if mode == 'off' or parameters is None or not statement.lstrip().lower().startswith(_EXPLAINABLE):
+        return None
+    dialect = engine.dialect.name
+    if dialect == 'postgresql':
+        analyze = mode == 'analyze' and statement.lstrip().lower().startswith(('select', 'with'))
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze else 'EXPLAIN '
+    elif dialect == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+
+    try:
+        with engine.connect() as conn:
+            # Отдельная транзакция с откатом: ANALYZE не должен ничего менять
+            with conn.begin() as transaction:
+                rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+                transaction.rollback()
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+
+    if dialect == 'sqlite':
+        # (id, parent, notused, detail)
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+def _teardown_request(exc):
+    captured = g.pop('slow_queries', None)
+    if not captured:
+        return
+    mode = _explain_mode(current_app.config)
+    store = slow_query_store()
+    filters = g.get('slow_query_filters')
+
+    g.slow_query_explaining = True
+    try:
+        for item in captured:
+            store.add({
+                'logged_at': time.time(),
+                'fingerprint': statement_fingerprint(item['statement']),
+                'endpoint': request.endpoint or 'unmatched',
+                'method': request.method,
+                'path': request.path,
+                'statement': item['statement'],
+                'parameters': item['parameters'],
+                'filters': filters,
+                'duration_ms': round(item['duration_ms'], 3),
+                'explain': explain(item['engine'], item['statement'], item['raw_parameters'], mode),
+            })
+    except Exception:
+        current_app.logger.exception('Slow query log write failed')
+    finally:
+        g.slow_query_explaining = False
+
+
+class SlowQueryLog:
+    """Журнал медленных SQL-запросов (включается SLOW_QUERY_ENABLED).
+
+    Запросы дольше SLOW_QUERY_THRESHOLD_MS запоминаются во время запроса вместе с
+    эндпоинтом и нормализованным фильтром, а в teardown записываются в локальный
+    файл SQLite вместе с EXPLAIN (SLOW_QUERY_EXPLAIN: off, plan или analyze).
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_ENABLED', False)
+        app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 200)
+        app.config.setdefault('SLOW_QUERY_EXPLAIN', 'plan')
+        app.config.setdefault('SLOW_QUERY_ALLOW_ANALYZE', False)
+        app.config.setdefault('SLOW_QUERY_MAX_ENTRIES', 5000)
+        if not app.config.get('SLOW_QUERY_PATH'):
+            app.config['SLOW_QUERY_PATH'] = os.path.join(app.instance_path, 'slow-queries.sqlite3')
+
+        app.extensions['slow_queries'] = {'log': self, 'store': None}
+        if not event.contains(Engine, 'after_cursor_execute', _after_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+        app.teardown_request(_teardown_request)
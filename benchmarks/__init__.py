@@ -0,0 +1 @@
+"""Бенчмарки API каталога (запуск: python -m benchmarks.<модуль>)."""
@@ -0,0 +1,124 @@
+"""Детерминированный синтетический каталог для бенчмарков.
+
+Один и тот же seed даёт одинаковые категории, пользователей и товары, поэтому
+результаты разных прогонов и разных СУБД сравнимы. Товары пишутся пачками
+через Core (executemany), миллион строк на SQLite занимает порядка минуты.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, insert, text
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models.product import Product, Category
+from app.models.user import User
+from app.utils.listing import refresh_listing
+from app.utils.seed import seed_categories
+
+CATEGORY_NAMES = (
+    'Электроника', 'Одежда', 'Обувь', 'Аксессуары', 'Книги', 'Продукты питания',
+    'Бытовая техника', 'Мебель', 'Спортивные товары', 'Игрушки', 'Косметика', 'Автотовары',
+)
+
+ADJECTIVES = ('Компактный', 'Беспроводной', 'Классический', 'Умный', 'Лёгкий', 'Прочный',
+              'Складной', 'Детский', 'Профессиональный', 'Бюджетный', 'Премиальный', 'Водонепроницаемый')
+NOUNS = ('ноутбук', 'телефон', 'рюкзак', 'чайник', 'кроссовки', 'куртка', 'наушники', 'стул',
+         'роман', 'мяч', 'фонарь', 'пылесос', 'часы', 'планшет', 'самокат', 'свитер')
+WORDS = ('надёжный', 'гарантия', 'доставка', 'новинка', 'хит', 'скидка', 'материал', 'цвет',
+         'размер', 'комплект', 'подарок', 'качество', 'удобный', 'современный', 'оригинал')
+
+# Общие для всех сгенерированных пользователей учётные данные
+USER_PASSWORD = 'benchmark-password'
+ADMIN_EMAIL = 'admin@bench.local'
+
+
+def _product_rows(rng, count, category_ids, start):
+    epoch = datetime(2023, 1, 1)
+    for i in range(count):
+        created_at = epoch + timedelta(minutes=rng.randrange(60 * 24 * 365 * 2))
+        name = f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {start + i}'
+        yield {
+            'name': name,
+            'price': round(rng.lognormvariate(7, 1.2), 2),
+            'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 40))),
+            'image_url': f'https://cdn.example.com/products/{start + i}.jpg',
+            # Неравномерное распределение: первые категории крупнее
+            'category_id': category_ids[min(int(rng.expovariate(0.35)), len(category_ids) - 1)],
+            'in_stock': rng.random() < 0.8,
+            'external_id': f'BENCH-{start + i:08d}',
+            'created_at': created_at,
+            'updated_at': created_at + timedelta(days=rng.randrange(30)),
+        }
+
+
+def generate_catalog(products=10_000, users=1_000, seed=42, batch_size=10_000, log=print):
+    """Заполняет пустую базу категориями, пользователями и товарами; возвращает сводку."""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    # Часть категорий уже добавила миграция f3a1c5e7d9b2: вставляем недостающие и берём
+    # id по имени в порядке CATEGORY_NAMES, чтобы распределение товаров не зависело от СУБД
+    seed_categories(CATEGORY_NAMES)
+    ids_by_name = dict(db.session.query(Category.name, Category.id).filter(Category.name.in_(CATEGORY_NAMES)))
+    category_ids = [ids_by_name[name] for name in CATEGORY_NAMES]
+
+    # Хэш считается один раз (генерация не должна упираться в pbkdf2) и тем же методом,
+    # что и при входе, иначе первый вход каждого пользователя перехэширует пароль
+    password_hash = generate_password_hash(USER_PASSWORD, method=current_app.config['PASSWORD_HASH_METHOD'])
+    now = datetime.utcnow()
+    user_rows = [{'username': 'bench-admin', 'email': ADMIN_EMAIL, 'password_hash': password_hash,
+                  'role': 'admin', 'created_at': now, 'updated_at': now, 'token_version': 1}]
+    user_rows += [{'username': f'buyer{i}', 'email': f'buyer{i}@bench.local', 'password_hash': password_hash,
+                   'role': 'buyer', 'created_at': now, 'updated_at': now, 'token_version': 1}
+                  for i in range(users)]
+    db.session.execute(insert(User.__table__), user_rows)
+    db.session.commit()
+
+    written = 0
+    while written < products:
+        count = min(batch_size, products - written)
+        db.session.execute(insert(Product.__table__), list(_product_rows(rng, count, category_ids, written)))
+        db.session.commit()
+        written += count
+        log(f'  товаров: {written}/{products}')
+
+    # Витрина заполняется всегда: сравнить чтение из неё можно и с --reuse
+    refresh_listing(db.session.connection())
+    db.session.commit()
+    log('  витрина product_listings заполнена')
+
+    if db.engine.dialect.name in ('postgresql', 'sqlite'):
+        # Статистика планировщика для свежих данных
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+
+    return {
+        'seed': seed,
+        'categories': len(category_ids),
+        'users': len(user_rows),
+        'products': written,
+        'elapsed_sec': round(time.perf_counter() - started, 1),
+    }
+
+
+def catalog_size():
+    """Сколько товаров уже в базе (0, если таблиц ещё нет)."""
+    try:
+        return db.session.query(func.count(Product.id)).scalar()
+    except Exception:
+        db.session.rollback()
+        return 0
+
+
+def reset_schema(log=print):
+    """Пересоздаёт схему: на Postgres миграциями (с поисковыми индексами), иначе create_all()."""
+    db.drop_all()
+    if db.engine.dialect.name == 'postgresql':
+        from flask_migrate import upgrade
+        db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+        db.session.commit()
+        log('  применяем миграции')
+        upgrade()
+    else:
+        db.create_all()
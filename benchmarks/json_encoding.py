@@ -0,0 +1,101 @@
+"""Пропускная способность сериализации страницы каталога разными JSON-провайдерами.
+
+    python -m benchmarks.json_encoding --items 100 --repeat 500
+
+Для каждого провайдера собирается ответ jsonify() со страницей из --items товаров
+(как в /api/products/get-products): полный путь to_dict() + кодирование и только
+кодирование готового словаря. Байты в секунду считаются по размеру тела; orjson
+пишет кириллицу в UTF-8, а не \\uXXXX, поэтому его тело заметно меньше.
+«flask-default» — стандартный провайдер Flask, с которого мы переходим.
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from flask.json.provider import DefaultJSONProvider
+
+os.environ.setdefault('TEST_DATABASE_URL', 'sqlite://')
+
+from app import create_app  # noqa: E402
+from app.models.product import Product, Category  # noqa: E402
+from app.utils.json_provider import StdlibJSONProvider, OrjsonProvider, orjson  # noqa: E402
+
+
+def make_page(items):
+    """Страница товаров в формате ответа get-products (без обращения к БД)."""
+    categories = [Category(name=name) for name in ('Электроника', 'Одежда', 'Книги')]
+    for index, category in enumerate(categories, start=1):
+        category.id = index
+    now = datetime(2024, 1, 1, 12, 0, 0, 123456)
+    products = []
+    for i in range(items):
+        product = Product(
+            name=f'Товар {i}',
+            price=round(10 + i * 1.37, 2),
+            description='Описание товара для витрины, ' * 4,
+            image_url=f'https://cdn.example.com/products/{i}.jpg',
+            category_id=categories[i % 3].id,
+            in_stock=i % 5 != 0,
+            external_id=f'SKU-{i:06d}',
+        )
+        product.id = i + 1
+        product.category = categories[i % 3]
+        product.created_at = now - timedelta(days=i)
+        product.updated_at = now
+        products.append(product)
+    return products
+
+
+def payload(products):
+    return {
+        'products': [p.to_dict() for p in products],
+        'total': len(products),
+        'pages': 1,
+        'current_page': 1,
+    }
+
+
+def _timed(fn, repeat):
+    fn()  # прогрев
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def measure(app, provider, products, repeat):
+    app.json = provider
+    prepared = payload(products)
+    with app.test_request_context():
+        size = len(app.json.response(prepared).get_data())
+        full = _timed(lambda: app.json.response(payload(products)).get_data(), repeat)
+        encode = _timed(lambda: app.json.response(prepared).get_data(), repeat)
+    return {'size': size, 'full': full, 'encode': encode}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=100, help='товаров на странице')
+    parser.add_argument('--repeat', type=int, default=500, help='ответов на провайдер')
+    args = parser.parse_args(argv)
+
+    app = create_app('testing')
+    products = make_page(args.items)
+
+    providers = [('flask-default', DefaultJSONProvider(app)), ('stdlib', StdlibJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider(app)))
+    else:
+        print('orjson не установлен: сравниваются только стандартные провайдеры')
+
+    baseline = None
+    print(f'{"provider":<14} {"bytes":>8} {"full ms":>9} {"encode ms":>10} {"encode MB/s":>12} {"speedup":>8}')
+    for name, provider in providers:
+        result = measure(app, provider, products, args.repeat)
+        baseline = baseline or result['encode']
+        print(f'{name:<14} {result["size"]:>8} {result["full"] * 1000:>9.3f} {result["encode"] * 1000:>10.3f} '
+              f'{result["size"] / result["encode"] / 1e6:>12.1f} {baseline / result["encode"]:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Запуск сценариев бенчмарка против синтетического каталога.
+
+    python -m benchmarks.runner --products 100000 --requests 200
+    python -m benchmarks.runner --group list --scenario 'list/*/price*' --reuse
+    BENCH_DATABASE_URL=postgresql://.../bench python -m benchmarks.runner --products 1000000
+
+По умолчанию используется файл SQLite в instance/; с --database-url или
+BENCH_DATABASE_URL — указанная база (она будет ОЧИЩЕНА и заполнена заново,
+если не задан --reuse и размер каталога не совпадает). Для каждого сценария
+выводятся перцентили задержки, среднее число SQL-запросов на запрос и
+пропускная способность в один поток.
+"""
+import argparse
+import fnmatch
+import json
+import math
+import os
+import random
+import sys
+import time
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values, p):
+    """Перцентиль по методу ближайшего ранга."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(name, latencies, queries, sizes, errors, elapsed):
+    latencies = sorted(latencies)
+    result = {
+        'scenario': name,
+        'requests': len(latencies),
+        'errors': errors,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+        'queries_per_request': round(sum(queries) / len(queries), 2),
+        'bytes_per_response': round(sum(sizes) / len(sizes)),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+    }
+    for p in PERCENTILES:
+        result[f'p{p}_ms'] = round(percentile(latencies, p) * 1000, 3)
+    return result
+
+
+def run_scenario(scenario, ctx, statements, requests, warmup):
+    for _ in range(warmup):
+        scenario(ctx)
+
+    latencies, queries, sizes, errors = [], [], [], 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        before = statements[0]
+        request_started = time.perf_counter()
+        response = scenario(ctx)
+        body = response.get_data()
+        latencies.append(time.perf_counter() - request_started)
+        queries.append(statements[0] - before)
+        sizes.append(len(body))
+        if response.status_code not in scenario.expect:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    return summarize(scenario.name, latencies, queries, sizes, errors, elapsed)
+
+
+def print_table(results, out=sys.stdout):
+    columns = ['scenario', 'p50_ms', 'p90_ms', 'p95_ms', 'p99_ms', 'queries_per_request',
+               'throughput_rps', 'bytes_per_response', 'errors']
+    headers = ['scenario', 'p50 ms', 'p90 ms', 'p95 ms', 'p99 ms', 'q/req', 'req/s', 'bytes', 'err']
+    width = max([len(r['scenario']) for r in results] + [8])
+    out.write(f'{headers[0]:<{width}} ' + ' '.join(f'{h:>9}' for h in headers[1:]) + '\n')
+    for result in results:
+        out.write(f'{result["scenario"]:<{width}} ' + ' '.join(f'{result[c]:>9}' for c in columns[1:]) + '\n')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарк API каталога на синтетических данных')
+    parser.add_argument('--products', type=int, default=10_000, help='товаров в каталоге (10k–1M)')
+    parser.add_argument('--users', type=int, default=1_000, help='покупателей в базе')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=100, help='замеряемых запросов на сценарий')
+    parser.add_argument('--warmup', type=int, default=10, help='прогревочных запросов на сценарий')
+    parser.add_argument('--scenario', action='append', help='шаблон имени сценария (можно несколько)')
+    parser.add_argument('--group', action='append',
+                        choices=('list', 'search', 'detail', 'auth', 'admin'), help='группа сценариев')
+    parser.add_argument('--database-url', help='база для бенчмарка (по умолчанию BENCH_DATABASE_URL или SQLite)')
+    parser.add_argument('--reuse', action='store_true', help='не пересоздавать каталог, если он уже заполнен')
+    parser.add_argument('--cache', default='null', help='RESULT_CACHE_BACKEND на время прогона (null, memory, sqlite)')
+    parser.add_argument('--listing', choices=('off', 'on'), default='off',
+                        help='читать get-products из витрины product_listings (LISTING_READ_MODEL)')
+    parser.add_argument('--columnar', choices=('off', 'on'), default='off',
+                        help='отвечать на get-products из колоночного каталога в памяти (COLUMNAR_CATALOG)')
+    parser.add_argument('--json', dest='json_path', help='сохранить результаты в JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.database_url:
+        os.environ['BENCH_DATABASE_URL'] = args.database_url
+
+    # Импорт после выбора базы: конфиг читает переменные окружения при импорте
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event, func
+    from app import create_app, db
+    from app.models.product import Product, Category
+    from app.models.user import User
+    from .generator import ADMIN_EMAIL, catalog_size, generate_catalog, reset_schema
+    from .scenarios import BenchContext, build_scenarios
+
+    app = create_app('benchmark')
+    app.config['RESULT_CACHE_BACKEND'] = args.cache
+    app.config['LISTING_READ_MODEL'] = args.listing
+    app.config['COLUMNAR_CATALOG'] = args.columnar == 'on'
+
+    with app.app_context():
+        engine = db.engine
+        print(f'База: {engine.url.render_as_string(hide_password=True)}')
+        if not (args.reuse and catalog_size() == args.products):
+            print(f'Генерация каталога: {args.products} товаров, seed={args.seed}')
+            reset_schema()
+            print(f'  готово: {generate_catalog(args.products, args.users, args.seed)}')
+
+        product_ids = db.session.query(func.min(Product.id), func.max(Product.id)).one()
+        category_ids = [row[0] for row in db.session.query(Category.id)]
+        users = db.session.query(func.count(User.id)).filter(User.role == 'buyer').scalar()
+        admin = User.query.filter_by(email=ADMIN_EMAIL).one()
+        admin_token = create_access_token(identity=str(admin.id), additional_claims=admin.token_claims())
+        db.session.remove()
+
+    # Запросы идут без внешнего контекста приложения, как в рабочем процессе:
+    # у каждого запроса своя сессия, закрываемая в teardown
+    statements = [0]
+
+    def count_statement(conn, cursor, statement, *rest):
+        statements[0] += 1
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+
+    ctx = BenchContext(app.test_client(), random.Random(args.seed), tuple(product_ids),
+                       category_ids, users, admin_token)
+    scenarios = [s for s in build_scenarios()
+                 if (not args.group or s.group in args.group)
+                 and (not args.scenario or any(fnmatch.fnmatch(s.name, p) for p in args.scenario))]
+
+    results = []
+    for scenario in scenarios:
+        result = run_scenario(scenario, ctx, statements, args.requests, args.warmup)
+        results.append(result)
+        print(f'  {scenario.name}: p50={result["p50_ms"]} ms, {result["queries_per_request"]} q/req')
+
+    print()
+    print_table(results)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'database': engine.dialect.name,
+                'products': args.products,
+                'seed': args.seed,
+                'cache': args.cache,
+                'listing': args.listing,
+                'requests': args.requests,
+                'results': results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f'Результаты сохранены в {args.json_path}')
+
+
+if __name__ == '__main__':
+    main()
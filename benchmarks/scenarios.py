@@ -0,0 +1,167 @@
+"""Сценарии бенчмарка: один сценарий — один HTTP-запрос через тестовый клиент Flask.
+
+Сценарий получает BenchContext (клиент, генератор случайных чисел, сведения о
+каталоге и токены) и возвращает ответ. Параметры выбираются случайно, но из
+генератора с фиксированным seed, так что последовательность запросов воспроизводима.
+"""
+import itertools
+from .generator import USER_PASSWORD
+
+
+class BenchContext:
+    def __init__(self, client, rng, product_ids, category_ids, users, admin_token):
+        self.client = client
+        self.rng = rng
+        self.product_ids = product_ids
+        self.category_ids = category_ids
+        self.users = users
+        self.admin_token = admin_token
+        self.etags = {}
+        self.cursor = None
+        self.created = []
+
+    def product_id(self):
+        low, high = self.product_ids
+        return self.rng.randint(low, high)
+
+    def admin_headers(self):
+        return {'Authorization': f'Bearer {self.admin_token}'}
+
+
+class Scenario:
+    def __init__(self, name, group, run, expect=(200,)):
+        self.name = name
+        self.group = group
+        self.run = run
+        self.expect = expect
+
+    def __call__(self, ctx):
+        return self.run(ctx)
+
+
+def _listing(body, query=''):
+    def run(ctx):
+        data = body(ctx) if callable(body) else body
+        return ctx.client.post(f'/api/products/get-products?{query}', json=data)
+    return run
+
+
+# Матрица каталога: фильтр x сортировка (первая страница, offset-пагинация)
+LIST_FILTERS = {
+    'all': {},
+    'category': lambda ctx: {'category_id': ctx.rng.choice(ctx.category_ids)},
+    'price': {'min_price': 500, 'max_price': 2000},
+    'in_stock': {'in_stock': True},
+    'created': {'created_from': '2024-01-01T00:00:00', 'created_to': '2024-03-01T00:00:00'},
+    'combined': lambda ctx: {'category_id': ctx.rng.choice(ctx.category_ids),
+                             'min_price': 500, 'max_price': 5000, 'in_stock': True},
+}
+
+LIST_SORTS = {
+    'default': {},
+    'price': {'sort_by': 'price'},
+    'price_desc': {'sort_by': 'price', 'sort_order': 'desc'},
+    'name': {'sort_by': 'name'},
+    'created_desc': {'sort_by': 'created_at', 'sort_order': 'desc'},
+    'category': {'sort_by': 'category.name'},
+}
+
+SEARCHES = {
+    'word': {'search_query': 'ноутбук'},
+    'phrase': {'search_query': 'умный телефон'},
+    'word_price': {'search_query': 'чайник', 'sort_by': 'price'},
+    'word_category': lambda ctx: {'search_query': 'куртка', 'category_id': ctx.rng.choice(ctx.category_ids)},
+    'id': lambda ctx: {'search_query': str(ctx.product_id())},
+}
+
+
+def _merge(filter_body, sort_body):
+    def body(ctx):
+        data = dict(filter_body(ctx) if callable(filter_body) else filter_body)
+        data.update(sort_body)
+        return data
+    return body
+
+
+def _cursor_walk(ctx):
+    # Листание до пятой страницы, затем с начала
+    query = 'pagination=cursor&limit=20'
+    if ctx.cursor:
+        query += f'&cursor={ctx.cursor[1]}'
+    response = ctx.client.post(f'/api/products/get-products?{query}', json={'sort_by': 'price'})
+    page = ctx.cursor[0] + 1 if ctx.cursor else 1
+    next_cursor = response.get_json().get('next_cursor') if response.status_code == 200 else None
+    ctx.cursor = (page, next_cursor) if next_cursor and page < 5 else None
+    return response
+
+
+def _detail(ctx):
+    return ctx.client.get(f'/api/products/{ctx.product_id()}')
+
+
+def _detail_conditional(ctx):
+    # Небольшой «горячий» набор карточек: повторные запросы получают 304
+    product_id = ctx.product_ids[0] + ctx.rng.randrange(20)
+    headers = {'If-None-Match': ctx.etags[product_id]} if product_id in ctx.etags else {}
+    response = ctx.client.get(f'/api/products/{product_id}', headers=headers)
+    if response.headers.get('ETag'):
+        ctx.etags[product_id] = response.headers['ETag']
+    return response
+
+
+def _batch(ctx):
+    ids = ','.join(str(ctx.product_id()) for _ in range(20))
+    return ctx.client.get(f'/api/products/batch?ids={ids}')
+
+
+def _login(ctx):
+    email = f'buyer{ctx.rng.randrange(ctx.users)}@bench.local'
+    return ctx.client.post('/api/auth/login', json={'email': email, 'password': USER_PASSWORD})
+
+
+def _create(ctx):
+    response = ctx.client.post('/api/products/create', headers=ctx.admin_headers(), json={
+        'name': f'Новый товар {ctx.rng.randrange(10 ** 9)}',
+        'price': round(ctx.rng.uniform(10, 10000), 2),
+        'description': 'Создан бенчмарком',
+        'category': ctx.rng.choice(ctx.category_ids),
+    })
+    if response.status_code == 201:
+        ctx.created.append(response.get_json()['product']['id'])
+    return response
+
+
+def _update(ctx):
+    return ctx.client.put(f'/api/products/{ctx.product_id()}', headers=ctx.admin_headers(),
+                          json={'price': round(ctx.rng.uniform(10, 10000), 2)})
+
+
+def _delete(ctx):
+    # Удаляем только то, что создал сам бенчмарк, чтобы каталог не «худел»
+    if not ctx.created:
+        _create(ctx)
+    return ctx.client.delete(f'/api/products/{ctx.created.pop()}', headers=ctx.admin_headers())
+
+
+def build_scenarios():
+    scenarios = []
+    for (filter_name, filter_body), (sort_name, sort_body) in itertools.product(LIST_FILTERS.items(),
+                                                                                  LIST_SORTS.items()):
+        scenarios.append(Scenario(f'list/{filter_name}/{sort_name}', 'list',
+                                  _listing(_merge(filter_body, sort_body), 'limit=20')))
+    for name, body in SEARCHES.items():
+        scenarios.append(Scenario(f'search/{name}', 'search', _listing(body, 'limit=20')))
+    scenarios += [
+        Scenario('list/page_deep', 'list', _listing({'sort_by': 'price'}, 'limit=20&page=200')),
+        Scenario('list/cursor_walk', 'list', _cursor_walk),
+        Scenario('list/fields_list', 'list', _listing({}, 'limit=100&fields=list')),
+        Scenario('list/limit_100', 'list', _listing({}, 'limit=100')),
+        Scenario('detail/random', 'detail', _detail, expect=(200, 404)),
+        Scenario('detail/conditional', 'detail', _detail_conditional, expect=(200, 304, 404)),
+        Scenario('detail/batch_20', 'detail', _batch),
+        Scenario('auth/login', 'auth', _login),
+        Scenario('admin/create', 'admin', _create, expect=(201,)),
+        Scenario('admin/update', 'admin', _update, expect=(200, 404)),
+        Scenario('admin/delete', 'admin', _delete),
+    ]
+    return scenarios
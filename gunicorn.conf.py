@@ -0,0 +1,108 @@
+"""Конфигурация gunicorn для production (подхватывается автоматически из текущего каталога).
+
+    gunicorn                                # wsgi:app, preload, gthread
+    WEB_WORKER_CLASS=sync gunicorn          # sync-воркеры, 2 × CPU + 1
+    WEB_CONCURRENCY=4 GUNICORN_THREADS=8 gunicorn
+
+Приложение создаётся в мастере до fork (preload_app): код и данные модулей
+делятся воркерами copy-on-write. Унаследованные соединения пулов в post_fork
+сбрасываются без закрытия, очередь логов и метрики перезапускаются своими
+хуками os.register_at_fork.
+
+Размеры: WEB_CONCURRENCY и GUNICORN_THREADS задают их явно; иначе воркеры —
+по числу CPU, потоки (gthread) или гринлеты (gevent) — по размеру пула БД,
+чтобы запросы не стояли в очереди за соединением. DB_MAX_CONNECTIONS
+ограничивает число воркеров так, чтобы все пулы вместе уместились в лимит базы.
+"""
+import glob
+import importlib.util
+import logging
+import multiprocessing
+import os
+
+from app.config import Config
+
+WORKER_CLASSES = ('sync', 'gthread', 'gevent')
+
+
+def _env_int(name, default=None):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _worker_class(name):
+    name = name.lower()
+    if name not in WORKER_CLASSES:
+        raise ValueError(f'WEB_WORKER_CLASS должен быть одним из: {", ".join(WORKER_CLASSES)}')
+    if name == 'gevent' and importlib.util.find_spec('gevent') is None:
+        # Без gevent воркер не стартует: откатываемся на потоки, а не падаем при деплое
+        logging.getLogger('gunicorn.error').warning('gevent не установлен, используется gthread')
+        return 'gthread'
+    return name
+
+
+def worker_sizing(worker_class, cpus, pool_size, max_overflow, max_connections=None):
+    """(workers, threads, worker_connections) по числу CPU и параметрам пула."""
+    connections_per_worker = pool_size + max_overflow
+    if worker_class == 'sync':
+        # Один запрос на процесс за раз: классическая формула для CPU + ожидания I/O
+        workers, threads, greenlets = 2 * cpus + 1, 1, None
+    elif worker_class == 'gthread':
+        # Поток на соединение из основного пула; переполнение остаётся на всплески
+        workers, threads, greenlets = cpus, max(pool_size, 1), None
+    else:
+        # Гринлетов не больше, чем соединений: лишние только ждали бы pool_timeout
+        workers, threads, greenlets = cpus, 1, max(connections_per_worker, 1)
+
+    if max_connections:
+        workers = min(workers, max(max_connections // connections_per_worker, 1))
+    return max(workers, 1), threads, greenlets
+
+
+worker_class = _worker_class(os.environ.get('WEB_WORKER_CLASS', 'gthread'))
+_workers, _threads, _greenlets = worker_sizing(
+    worker_class,
+    multiprocessing.cpu_count(),
+    Config.DB_POOL_SIZE,
+    Config.DB_MAX_OVERFLOW,
+    _env_int('DB_MAX_CONNECTIONS'),
+)
+
+wsgi_app = 'wsgi:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+workers = _env_int('WEB_CONCURRENCY', _workers)
+threads = _env_int('GUNICORN_THREADS', _threads)
+if _greenlets is not None:
+    worker_connections = _env_int('GUNICORN_WORKER_CONNECTIONS', _greenlets)
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+# Периодический перезапуск воркеров ограничивает рост памяти; jitter разносит рестарты
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 10000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 1000)
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+# Заголовки временных файлов воркеров — в памяти, а не на диске контейнера
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def on_starting(server):
+    # Снимки метрик прошлого запуска (другие pid) иначе попали бы в суммы счётчиков
+    directory = Config.METRICS_MULTIPROC_DIR
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            os.remove(path)
+
+
+def post_fork(server, worker):
+    if server.cfg.worker_class_str == 'gevent' and importlib.util.find_spec('psycogreen'):
+        # psycopg2 — C-расширение: без этого запросы к Postgres блокировали бы весь воркер
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+    if server.cfg.preload_app:
+        from app.utils.db_routing import dispose_engines
+        from wsgi import app
+        dispose_engines(app, close=False)
@@ -0,0 +1,82 @@
+"""Product listings read model
+
+Revision ID: a7c2e4f6b8d0
+Revises: f3a1c5e7d9b2
+Create Date: 2026-10-18 17:25:10.083214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c2e4f6b8d0'
+down_revision = 'f3a1c5e7d9b2'
+branch_labels = None
+depends_on = None
+
+
+# (имя, колонки, условие частичного индекса для postgresql и sqlite)
+INDEXES = [
+    ('ix_product_listings_category_stock_price', ['category_id', 'in_stock', 'price'], None),
+    ('ix_product_listings_price_id', ['price', 'id'], None),
+    ('ix_product_listings_name_id', ['name', 'id'], None),
+    ('ix_product_listings_created_at_id', ['created_at', 'id'], None),
+    ('ix_product_listings_updated_at_id', ['updated_at', 'id'], None),
+    ('ix_product_listings_category_name_id', ['category_name', 'id'], None),
+    ('ix_product_listings_in_stock_price_id', ['price', 'id'], ('in_stock', 'in_stock = 1')),
+]
+
+COLUMNS = ('id', 'name', 'price', 'description', 'image_url', 'created_at', 'updated_at',
+           'in_stock', 'external_id', 'category_id')
+
+
+def upgrade():
+    op.create_table(
+        'product_listings',
+        sa.Column('id', sa.Integer(), sa.ForeignKey('products.id', ondelete='CASCADE'),
+                  primary_key=True, autoincrement=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('image_url', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('in_stock', sa.Boolean(), nullable=True),
+        sa.Column('external_id', sa.String(length=64), nullable=True),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('category_name', sa.String(length=100), nullable=True),
+    )
+
+    # Начальное заполнение; дальше витрину ведёт приложение (LISTING_READ_MODEL=sync|on)
+    columns = ', '.join(COLUMNS)
+    selected = ', '.join(f'p.{column}' for column in COLUMNS)
+    op.execute(
+        f'INSERT INTO product_listings ({columns}, category_name) '
+        f'SELECT {selected}, c.name FROM products p LEFT JOIN categories c ON c.id = p.category_id'
+    )
+
+    for name, columns, where in INDEXES:
+        op.create_index(
+            name, 'product_listings', columns,
+            postgresql_where=sa.text(where[0]) if where else None,
+            sqlite_where=sa.text(where[1]) if where else None,
+        )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # Тот же поисковый вектор, что у products (b7e3c1d2a4f5): результаты поиска совпадают
+        op.execute(
+            "ALTER TABLE product_listings ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+            ") STORED"
+        )
+        op.create_index('ix_product_listings_search_vector', 'product_listings', ['search_vector'],
+                        postgresql_using='gin')
+        op.create_index('ix_product_listings_name_trgm', 'product_listings', ['name'],
+                        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_table('product_listings')
@@ -0,0 +1,47 @@
+"""Product search: pg_trgm and tsvector indexes
+
+Revision ID: b7e3c1d2a4f5
+Revises: 659aa71fd2d5
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3c1d2a4f5'
+down_revision = '659aa71fd2d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Индексы поиска есть только на PostgreSQL; на остальных СУБД
+    # используется переносимый ILIKE-поиск (app/utils/search.py)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Конфигурация 'simple' должна совпадать с TS_CONFIG в app/utils/search.py
+    op.execute(
+        "ALTER TABLE products ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+        ") STORED"
+    )
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'],
+                    postgresql_using='gin')
+    op.create_index('ix_products_name_trgm', 'products', ['name'],
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_products_name_trgm', table_name='products')
+    op.drop_index('ix_products_search_vector', table_name='products')
+    op.drop_column('products', 'search_vector')
@@ -0,0 +1,60 @@
+"""Indexes for get-products filters and sorts
+
+Revision ID: c4d8e2f1a9b3
+Revises: b7e3c1d2a4f5
+Create Date: 2026-10-18 11:40:07.552310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e2f1a9b3'
+down_revision = 'b7e3c1d2a4f5'
+branch_labels = None
+depends_on = None
+
+
+# (имя, колонки, условие частичного индекса для postgresql и sqlite)
+INDEXES = [
+    ('ix_products_category_stock_price', ['category_id', 'in_stock', 'price'], None),
+    ('ix_products_price_id', ['price', 'id'], None),
+    ('ix_products_name_id', ['name', 'id'], None),
+    ('ix_products_created_at_id', ['created_at', 'id'], None),
+    ('ix_products_updated_at_id', ['updated_at', 'id'], None),
+    ('ix_products_in_stock_price_id', ['price', 'id'], ('in_stock', 'in_stock = 1')),
+]
+
+
+def upgrade():
+    # Даты всегда заполняются приложением; NOT NULL позволяет сортировать
+    # по ним без NULLS LAST и использовать индекс в обоих направлениях
+    products = sa.table('products', sa.column('created_at'), sa.column('updated_at'))
+    op.execute(products.update().where(products.c.created_at.is_(None)).values(created_at=sa.func.now()))
+    op.execute(products.update().where(products.c.updated_at.is_(None)).values(updated_at=products.c.created_at))
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+    # На PostgreSQL индексы строятся CONCURRENTLY, не блокируя запись в products
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.create_index(
+                name, 'products', columns,
+                postgresql_concurrently=postgresql,
+                postgresql_where=sa.text(where[0]) if where else None,
+                sqlite_where=sa.text(where[1]) if where else None,
+            )
+
+
+def downgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block():
+        for name, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name='products', postgresql_concurrently=postgresql)
+
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=True)
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,28 @@
+"""Product external_id for supplier imports
+
+Revision ID: d2f6a8c0b1e7
+Revises: c4d8e2f1a9b3
+Create Date: 2026-10-18 13:05:22.170944
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6a8c0b1e7'
+down_revision = 'c4d8e2f1a9b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('external_id', sa.String(length=64), nullable=True))
+        batch_op.create_unique_constraint('uq_products_external_id', ['external_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_constraint('uq_products_external_id', type_='unique')
+        batch_op.drop_column('external_id')
@@ -0,0 +1,26 @@
+"""User token_version for JWT role claims
+
+Revision ID: e5b9c3d7f2a1
+Revises: d2f6a8c0b1e7
+Create Date: 2026-10-18 14:31:48.906115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9c3d7f2a1'
+down_revision = 'd2f6a8c0b1e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
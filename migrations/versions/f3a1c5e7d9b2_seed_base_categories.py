@@ -0,0 +1,39 @@
+"""Seed base categories
+
+Revision ID: f3a1c5e7d9b2
+Revises: e5b9c3d7f2a1
+Create Date: 2026-10-18 16:02:37.412905
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a1c5e7d9b2'
+down_revision = 'e5b9c3d7f2a1'
+branch_labels = None
+depends_on = None
+
+# Копия списка на момент миграции: app.utils.seed.BASE_CATEGORIES может меняться позже
+BASE_CATEGORIES = (
+    'Электроника',
+    'Одежда',
+    'Обувь',
+    'Аксессуары',
+    'Книги',
+    'Продукты питания',
+    'Бытовая техника',
+    'Мебель',
+    'Спортивные товары',
+)
+
+
+def upgrade():
+    # ON CONFLICT DO NOTHING поддерживают и PostgreSQL, и SQLite (3.24+)
+    values = ', '.join(f"('{name}')" for name in BASE_CATEGORIES)
+    op.execute(f'INSERT INTO categories (name) VALUES {values} ON CONFLICT (name) DO NOTHING')
+
+
+def downgrade():
+    # Категории могли появиться до миграции и уже использоваться товарами: не удаляем
+    pass
@@ -1,4 +1,5 @@
 from app import create_app, db  
+from app.utils.seed import seed_categories  
 
 # Создаем экземпляр приложения  
 app = create_app()  
@@ -6,6 +7,7 @@ app = create_app()
 
 if __name__ == '__main__': 
     with app.app_context():  
-        db.create_all()
+        db.create_all()  
+        seed_categories()  
     # Запускаем приложение для разработки  
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,4 @@
+"""Точка входа WSGI для production: gunicorn (см. gunicorn.conf.py) загружает wsgi:app."""
+from app import create_app
+
+app = create_app()